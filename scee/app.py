@@ -6,59 +6,102 @@
 # ROBERTO VINICIUS DE MORAIS ALCANTARA
 
 import os
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+from datetime import datetime
+from flask import (Flask, render_template, request, redirect, url_for, session, flash, jsonify,
+                   Response, stream_with_context)
+from markupsafe import Markup
+from werkzeug.middleware.proxy_fix import ProxyFix
 from database import Database
-from controllers.auth_controller import AuthController
+from cache import cache_paginas
+from carrinho_store import criar_carrinho_store
+from limites import LimiteExcedido
+from senhas import PoolSenhasSaturado, pool_senhas
+from controllers.auth_controller import AuthController, emails_desconhecidos
 from controllers.cliente_controller import ClienteController
 from controllers.produto_controller import ProdutoController
-from controllers.carrinho_controller import CarrinhoController
 from controllers.pedido_controller import PedidoController
+from controllers.importacao_controller import ImportacaoController
 from repositories.categoria_repository import CategoriaRepository
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+# Com vários workers a chave precisa ser a mesma em todos (SCEE_SECRET_KEY).
+app.secret_key = os.environ.get('SCEE_SECRET_KEY') or os.urandom(24)
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max
 
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-db = Database()
+# Proxies reversos à frente do app (SCEE_PROXIES_CONFIAVEIS, padrão 0): só esse número
+# de saltos em X-Forwarded-For/-Proto é aceito. Sem proxy configurado os cabeçalhos são
+# ignorados e request.remote_addr (chave do limite de login por IP) é o IP da conexão.
+PROXIES_CONFIAVEIS = int(os.environ.get('SCEE_PROXIES_CONFIAVEIS', '0'))
+if PROXIES_CONFIAVEIS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXIES_CONFIAVEIS, x_proto=PROXIES_CONFIAVEIS)
+
+# Perfis: 'padrao', 'sqlite-prod' ou 'postgres-prod' (ver database.PERFIS_ENGINE).
+# Réplicas de leitura (listagens do catálogo e do admin): URLs separadas por vírgula.
+db = Database(os.environ.get('SCEE_DATABASE_URL', 'sqlite:///scee_loja.db'),
+              perfil=os.environ.get('SCEE_DB_PERFIL', 'padrao'),
+              replicas=[url for url in os.environ.get('SCEE_DATABASE_REPLICAS', '').split(',') if url])
 db.create_tables()
 
-carrinhos = {}
+# Carrinhos no servidor: 'memoria' (um processo), 'sqlite:///arquivo.db' ou 'redis://host:porta/db'.
+carrinhos = criar_carrinho_store(os.environ.get('SCEE_CARRINHO_STORE', 'sqlite:///scee_carrinhos.db'))
 
 
-def get_carrinho():
-    """Obtém o carrinho da sessão atual."""
+@app.teardown_appcontext
+def encerrar_sessao_banco(exc):
+    """Fecha a sessão do banco da requisição e devolve a conexão ao pool."""
+    db.close_session()
+
+
+@app.errorhandler(PoolSenhasSaturado)
+@app.errorhandler(LimiteExcedido)
+def muitas_requisicoes(exc):
+    """Pool de senhas saturado ou limite de tentativas excedido: recusa a requisição com 429."""
+    retry_after = getattr(exc, 'retry_after', 5)
+    flash(f'Muitas tentativas. Tente novamente em {retry_after} segundos.', 'error')
+    templates = {'login': 'login.html', 'registro': 'registro.html', 'alterar_senha': 'alterar_senha.html'}
+    return render_template(templates.get(request.endpoint, 'login.html')), 429, {'Retry-After': str(retry_after)}
+
+
+def get_session_id():
+    """Obtém (ou cria) o identificador da sessão atual."""
     session_id = session.get('session_id')
     if not session_id:
         session_id = os.urandom(16).hex()
         session['session_id'] = session_id
-    
-    if session_id not in carrinhos:
-        carrinhos[session_id] = CarrinhoController()
-    
-    return carrinhos[session_id]
+    return session_id
+
+
+def get_carrinho():
+    """Obtém o carrinho da sessão atual."""
+    return carrinhos.carregar(get_session_id())
+
+
+def salvar_carrinho(carrinho_obj):
+    """Salva o carrinho da sessão atual."""
+    carrinhos.salvar(get_session_id(), carrinho_obj)
 
 
 @app.route('/')
 def index():
     """Página inicial."""
+    conteudo = cache_paginas.obter(('index',))
+    if conteudo is not None:
+        return render_template('index.html', conteudo=conteudo)
+    
     db_session = db.get_session()
     produto_controller = ProdutoController(db_session, app.config['UPLOAD_FOLDER'])
-    produtos, total, total_pages = produto_controller.listar_produtos(page=1, per_page=12)
+    produtos, total, total_pages = produto_controller.listar_produtos(page=1, per_page=12, load='catalogo')
     
     categoria_repo = CategoriaRepository(db_session)
-    categorias = categoria_repo.get_all()
+    categorias = categoria_repo.get_all_cached()
     
-    # Carregar relacionamentos antes de fechar sessão
-    for produto in produtos:
-        _ = produto.categoria
-        _ = produto.imagens
-    
-    db_session.close()
-    return render_template('index.html', produtos=produtos, categorias=categorias, 
-                         total_pages=total_pages, current_page=1)
+    conteudo = Markup(render_template('fragmentos/index.html', produtos=produtos, categorias=categorias,
+                                      total_pages=total_pages, current_page=1))
+    cache_paginas.guardar(('index',), conteudo, tags=['catalogo'])
+    return render_template('index.html', conteudo=conteudo)
 
 
 @app.route('/registro', methods=['GET', 'POST'])
@@ -101,14 +144,14 @@ def login():
         auth_controller = AuthController(db_session)
         
         if tipo == 'admin':
-            sucesso, mensagem, admin = auth_controller.login_admin(email, senha)
+            sucesso, mensagem, admin = auth_controller.login_admin(email, senha, request.remote_addr)
             if sucesso:
                 session['admin_id'] = admin.id
                 session['admin_nome'] = admin.nome
                 flash(mensagem, 'success')
                 return redirect(url_for('admin_dashboard'))
         else:
-            sucesso, mensagem, cliente = auth_controller.login_cliente(email, senha)
+            sucesso, mensagem, cliente = auth_controller.login_cliente(email, senha, request.remote_addr)
             if sucesso:
                 session['cliente_id'] = cliente.id
                 session['cliente_nome'] = cliente.nome
@@ -153,51 +196,83 @@ def minha_conta():
 def produtos():
     """Listagem de produtos."""
     page = request.args.get('page', 1, type=int)
+    after = request.args.get('after')
     categoria_id = request.args.get('categoria', type=int)
     busca = request.args.get('q', '')
     min_preco = request.args.get('min_preco', type=float)
     max_preco = request.args.get('max_preco', type=float)
     
+    # O fragmento é renderizado só a partir destes valores já convertidos (nunca de
+    # request.args): variações da URL com a mesma chave produzem o mesmo HTML.
+    chave = ('produtos', page if 'page' in request.args else None, after, categoria_id, busca, min_preco, max_preco)
+    conteudo = cache_paginas.obter(chave)
+    if conteudo is not None:
+        return render_template('produtos.html', conteudo=conteudo)
+    
     db_session = db.get_session()
     produto_controller = ProdutoController(db_session, app.config['UPLOAD_FOLDER'])
     categoria_repo = CategoriaRepository(db_session)
-    categorias = categoria_repo.get_all()
+    categorias = categoria_repo.get_all_cached()
+    proximo_cursor = None
+    tags = ['catalogo']
+    cacheavel = True
     
     # Aplicar filtros combinados
     if busca:
-        produtos_list = produto_controller.buscar_produtos(busca, page=page)
-        total_pages = 1
+        produtos_list, total, total_pages = produto_controller.buscar_produtos(busca, page=page, load='catalogo')
     elif categoria_id and (min_preco is not None and max_preco is not None):
         # Filtro combinado: categoria + preço
         produtos_list = produto_controller.filtrar_por_categoria_e_preco(
-            categoria_id, min_preco, max_preco, page=page
+            categoria_id, min_preco, max_preco, page=page, load='catalogo'
         )
         total_pages = 1
+        tags = [f'categoria:{categoria_id}']
     elif min_preco is not None and max_preco is not None:
         # Apenas filtro de preço
-        produtos_list = produto_controller.filtrar_por_preco(min_preco, max_preco, page=page)
+        produtos_list = produto_controller.filtrar_por_preco(min_preco, max_preco, page=page,
+                                                            load='catalogo')
         total_pages = 1
     elif categoria_id:
         # Apenas filtro de categoria
-        produtos_list, total, total_pages = produto_controller.listar_por_categoria(categoria_id, page=page)
+        produtos_list, total, total_pages = produto_controller.listar_por_categoria(
+            categoria_id, page=page, load='catalogo'
+        )
+        tags = [f'categoria:{categoria_id}']
+    elif 'page' in request.args:
+        # Sem filtros, paginação por número de página (fallback)
+        produtos_list, total, total_pages = produto_controller.listar_produtos(page=page, load='catalogo')
     else:
-        # Sem filtros
-        produtos_list, total, total_pages = produto_controller.listar_produtos(page=page)
-    
-    # Carregar categorias de todos os produtos antes de fechar sessão
-    for produto in produtos_list:
-        _ = produto.categoria
-        _ = produto.imagens
-    
-    db_session.close()
-    return render_template('produtos.html', produtos=produtos_list, categorias=categorias,
-                         total_pages=total_pages, current_page=page, 
-                         categoria_selecionada=categoria_id, min_preco=min_preco, max_preco=max_preco)
+        # Sem filtros, paginação por cursor (?after=)
+        try:
+            produtos_list, total, total_pages, proximo_cursor = produto_controller.listar_produtos_apos(
+                after, load='catalogo'
+            )
+        except ValueError as e:
+            flash(str(e), 'error')
+            produtos_list, total, total_pages, proximo_cursor = produto_controller.listar_produtos_apos(
+                load='catalogo'
+            )
+            after = None
+            cacheavel = False
+        page = None if after else 1
+    
+    conteudo = Markup(render_template(
+        'fragmentos/produtos.html', produtos=produtos_list, categorias=categorias,
+        total_pages=total_pages, current_page=page, proximo_cursor=proximo_cursor,
+        categoria_selecionada=categoria_id, busca=busca, min_preco=min_preco, max_preco=max_preco
+    ))
+    if cacheavel:
+        cache_paginas.guardar(chave, conteudo, tags=tags)
+    return render_template('produtos.html', conteudo=conteudo)
 
 
 @app.route('/produto/<int:produto_id>')
 def produto_detalhe(produto_id):
     """Detalhes de um produto."""
+    pagina = cache_paginas.obter(('produto', produto_id))
+    if pagina is not None:
+        return render_template('produto_detalhe.html', **pagina)
+    
     db_session = db.get_session()
     from repositories.produto_repository import ProdutoRepository
     produto_repo = ProdutoRepository(db_session)
@@ -205,15 +280,18 @@ def produto_detalhe(produto_id):
     
     if not produto:
         flash('Produto não encontrado', 'error')
-        db_session.close()
         return redirect(url_for('produtos'))
     
     # Carregar relacionamentos antes de fechar a sessão (eager loading)
     _ = produto.imagens  # Força carregamento das imagens
     _ = produto.categoria  # Força carregamento da categoria
     
-    db_session.close()
-    return render_template('produto_detalhe.html', produto=produto)
+    pagina = {
+        'titulo': produto.nome,
+        'conteudo': Markup(render_template('fragmentos/produto_detalhe.html', produto=produto))
+    }
+    cache_paginas.guardar(('produto', produto_id), pagina, tags=[f'produto:{produto_id}'])
+    return render_template('produto_detalhe.html', **pagina)
 
 
 @app.route('/carrinho')
@@ -238,23 +316,21 @@ def adicionar_carrinho(produto_id):
     
     if not produto:
         flash('Produto não encontrado', 'error')
-        db_session.close()
         return redirect(url_for('produtos'))
     
     if produto.estoque == 0:
         flash('❌ Este produto está SEM ESTOQUE e não pode ser adicionado ao carrinho', 'error')
-        db_session.close()
         return redirect(url_for('produto_detalhe', produto_id=produto_id))
     
     if produto.estoque < quantidade:
         flash(f'❌ Estoque insuficiente! Disponível: {produto.estoque} unidades', 'error')
-        db_session.close()
         return redirect(url_for('produto_detalhe', produto_id=produto_id))
     
     carrinho_obj = get_carrinho()
     sucesso, mensagem = carrinho_obj.adicionar_item(produto.id, produto.nome, produto.preco, quantidade)
+    if sucesso:
+        salvar_carrinho(carrinho_obj)
     flash(mensagem, 'success' if sucesso else 'error')
-    db_session.close()
     
     return redirect(url_for('carrinho'))
 
@@ -264,6 +340,8 @@ def remover_carrinho(produto_id):
     """Remover produto do carrinho."""
     carrinho_obj = get_carrinho()
     sucesso, mensagem = carrinho_obj.remover_item(produto_id)
+    if sucesso:
+        salvar_carrinho(carrinho_obj)
     flash(mensagem, 'success' if sucesso else 'error')
     
     return redirect(url_for('carrinho'))
@@ -276,6 +354,8 @@ def atualizar_carrinho(produto_id):
     
     carrinho_obj = get_carrinho()
     sucesso, mensagem = carrinho_obj.atualizar_quantidade(produto_id, quantidade)
+    if sucesso:
+        salvar_carrinho(carrinho_obj)
     flash(mensagem, 'success' if sucesso else 'error')
     
     return redirect(url_for('carrinho'))
@@ -315,18 +395,87 @@ def checkout():
         
         if sucesso:
             carrinho_obj.limpar()
+            salvar_carrinho(carrinho_obj)
             flash(f'✅ Pedido #{pedido.id} criado com sucesso! Frete: {tipo_frete}', 'success')
-            db_session.close()
             return redirect(url_for('minha_conta'))
         else:
             flash(mensagem, 'error')
-            db_session.close()
     
     itens = carrinho_obj.obter_itens()
     total = carrinho_obj.calcular_total()
-    db_session.close()
     
-    return render_template('checkout.html', enderecos=enderecos, itens=itens, total=total)
+    # Cotação de todos os fretes para o primeiro endereço (o selecionado por padrão)
+    cotacoes = {}
+    if enderecos:
+        cotacoes = PedidoController(db_session).cotar_fretes(session['cliente_id'], enderecos[0].id, itens)
+    
+    return render_template('checkout.html', enderecos=enderecos, itens=itens, total=total, cotacoes=cotacoes)
+
+
+@app.route('/checkout/frete/<int:endereco_id>')
+def checkout_cotar_frete(endereco_id):
+    """Cotação de todos os fretes para um endereço do cliente (JSON)."""
+    if 'cliente_id' not in session:
+        return jsonify({'success': False, 'message': 'Faça login para continuar'}), 403
+    
+    db_session = db.get_session()
+    pedido_controller = PedidoController(db_session)
+    cotacoes = pedido_controller.cotar_fretes(session['cliente_id'], endereco_id, get_carrinho().obter_itens())
+    
+    return jsonify({
+        'success': bool(cotacoes),
+        'cotacoes': {tipo: {'valor': valor, 'prazo': prazo} for tipo, (valor, prazo) in cotacoes.items()}
+    })
+
+
+@app.route('/checkout/pagamento', methods=['POST'])
+def checkout_iniciar_pagamento():
+    """Cria o pedido do carrinho e inicia a cobrança em segundo plano (JSON, 202 + job id)."""
+    if 'cliente_id' not in session:
+        return jsonify({'success': False, 'message': 'Faça login para continuar'}), 403
+    
+    dados_pagamento = {campo: request.form.get(campo, '')
+                       for campo in ('numero_cartao', 'cvv', 'validade', 'titular', 'cpf_pagador')}
+    
+    db_session = db.get_session()
+    pedido_controller = PedidoController(db_session)
+    carrinho_obj = get_carrinho()
+    sucesso, mensagem, pedido, job_id = pedido_controller.iniciar_pagamento(
+        cliente_id=session['cliente_id'],
+        itens_carrinho=carrinho_obj.obter_itens(),
+        endereco_id=request.form.get('endereco_id', type=int),
+        metodo_pagamento=request.form.get('metodo_pagamento'),
+        tipo_frete=request.form.get('tipo_frete', 'Fixo'),
+        dados_pagamento=dados_pagamento
+    )
+    if not sucesso:
+        return jsonify({'success': False, 'message': mensagem}), 400
+    
+    # O pedido já existe e reservou o estoque, como no checkout síncrono
+    carrinho_obj.limpar()
+    salvar_carrinho(carrinho_obj)
+    
+    return jsonify({
+        'success': True,
+        'message': mensagem,
+        'pedido_id': pedido.id,
+        'job_id': job_id,
+        'status_url': url_for('checkout_consultar_pagamento', job_id=job_id)
+    }), 202
+
+
+@app.route('/checkout/pagamento/<job_id>')
+def checkout_consultar_pagamento(job_id):
+    """Andamento de um pagamento iniciado em /checkout/pagamento (JSON, polling)."""
+    if 'cliente_id' not in session:
+        return jsonify({'success': False, 'message': 'Faça login para continuar'}), 403
+    
+    db_session = db.get_session()
+    estado = PedidoController(db_session).consultar_pagamento(session['cliente_id'], job_id)
+    if estado is None:
+        return jsonify({'success': False, 'message': 'Pagamento não encontrado'}), 404
+    
+    return jsonify({'success': True, **estado})
 
 
 @app.route('/admin')
@@ -339,6 +488,24 @@ def admin_dashboard():
     return render_template('admin/dashboard.html')
 
 
+@app.route('/admin/banco/pool')
+def admin_pool_banco():
+    """Estatísticas do pool de conexões do banco (admin, JSON)."""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Acesso negado'}), 403
+    
+    return jsonify(db.estatisticas_pool())
+
+
+@app.route('/admin/senhas/pool')
+def admin_pool_senhas():
+    """Estatísticas do pool de hash de senhas: fila e latências (admin, JSON)."""
+    if 'admin_id' not in session:
+        return jsonify({'success': False, 'message': 'Acesso negado'}), 403
+    
+    return jsonify(pool_senhas.estatisticas())
+
+
 @app.route('/admin/produtos')
 def admin_produtos():
     """Gerenciamento de produtos (admin)."""
@@ -350,16 +517,11 @@ def admin_produtos():
     
     db_session = db.get_session()
     produto_controller = ProdutoController(db_session, app.config['UPLOAD_FOLDER'])
-    produtos_list, total, total_pages = produto_controller.listar_produtos(page=page)
+    produtos_list, total, total_pages = produto_controller.listar_produtos(page=page, load='admin')
     
     categoria_repo = CategoriaRepository(db_session)
-    categorias = categoria_repo.get_all()
+    categorias = categoria_repo.get_all_cached()
     
-    # Carregar categorias antes de fechar sessão
-    for produto in produtos_list:
-        _ = produto.categoria
-    
-    db_session.close()
     return render_template('admin/produtos.html', produtos=produtos_list, categorias=categorias,
                          total_pages=total_pages, current_page=page)
 
@@ -373,7 +535,7 @@ def admin_criar_produto():
     
     db_session = db.get_session()
     categoria_repo = CategoriaRepository(db_session)
-    categorias = categoria_repo.get_all()
+    categorias = categoria_repo.get_all_cached()
     
     if request.method == 'POST':
         nome = request.form.get('nome')
@@ -414,7 +576,7 @@ def admin_editar_produto(produto_id):
         return redirect(url_for('admin_produtos'))
     
     categoria_repo = CategoriaRepository(db_session)
-    categorias = categoria_repo.get_all()
+    categorias = categoria_repo.get_all_cached()
     
     if request.method == 'POST':
         nome = request.form.get('nome')
@@ -433,7 +595,6 @@ def admin_editar_produto(produto_id):
         )
         
         flash(mensagem, 'success' if sucesso else 'error')
-        db_session.close()
         if sucesso:
             return redirect(url_for('admin_produtos'))
         return redirect(url_for('admin_editar_produto', produto_id=produto_id))
@@ -441,7 +602,6 @@ def admin_editar_produto(produto_id):
     # Carregar imagens antes de fechar a sessão (eager loading)
     _ = produto.imagens  # Força o carregamento das imagens
     
-    db_session.close()
     return render_template('admin/produto_form.html', categorias=categorias, produto=produto)
 
 
@@ -454,7 +614,6 @@ def admin_remover_imagem(imagem_id):
     db_session = db.get_session()
     produto_controller = ProdutoController(db_session, app.config['UPLOAD_FOLDER'])
     sucesso, mensagem = produto_controller.remover_imagem(imagem_id)
-    db_session.close()
     
     return jsonify({'success': sucesso, 'message': mensagem})
 
@@ -469,7 +628,6 @@ def admin_deletar_produto(produto_id):
     db_session = db.get_session()
     produto_controller = ProdutoController(db_session, app.config['UPLOAD_FOLDER'])
     sucesso, mensagem = produto_controller.remover_produto(produto_id)
-    db_session.close()
     
     flash(mensagem, 'success' if sucesso else 'error')
     return redirect(url_for('admin_produtos'))
@@ -483,17 +641,34 @@ def admin_pedidos():
         return redirect(url_for('login'))
     
     page = request.args.get('page', 1, type=int)
+    after = request.args.get('after')
     status = request.args.get('status', '')
+    proximo_cursor = None
     
     db_session = db.get_session()
     pedido_controller = PedidoController(db_session)
     
-    if status:
-        pedidos_list, total, total_pages = pedido_controller.filtrar_por_status(status, page=page)
+    if 'page' in request.args:
+        # Paginação por número de página (fallback)
+        if status:
+            pedidos_list, total, total_pages = pedido_controller.filtrar_por_status(status, page=page)
+        else:
+            pedidos_list, total, total_pages = pedido_controller.listar_todos_pedidos(page=page)
     else:
-        pedidos_list, total, total_pages = pedido_controller.listar_todos_pedidos(page=page)
-    
-    return render_template('admin/pedidos.html', pedidos=pedidos_list,
+        # Paginação por cursor (?after=)
+        try:
+            pedidos_list, total, total_pages, proximo_cursor = pedido_controller.listar_pedidos_apos(
+                after, status=status
+            )
+        except ValueError as e:
+            flash(str(e), 'error')
+            pedidos_list, total, total_pages, proximo_cursor = pedido_controller.listar_pedidos_apos(
+                status=status
+            )
+            after = None
+        page = None if after else 1
+    
+    return render_template('admin/pedidos.html', pedidos=pedidos_list, proximo_cursor=proximo_cursor,
                          total_pages=total_pages, current_page=page, status_filtro=status)
 
 
@@ -514,6 +689,50 @@ def admin_atualizar_status_pedido(pedido_id):
     return redirect(url_for('admin_pedidos'))
 
 
+def _resposta_csv(gerador, nome_arquivo: str) -> Response:
+    """Envia um CSV em streaming; a sessão é fechada no teardown, ao final da transmissão."""
+    return Response(
+        stream_with_context(gerador),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+    )
+
+
+@app.route('/admin/exportar/produtos')
+def admin_exportar_produtos():
+    """Exportar produtos em CSV (admin)."""
+    if 'admin_id' not in session:
+        flash('Acesso negado', 'error')
+        return redirect(url_for('login'))
+    
+    db_session = db.get_session()
+    importacao_controller = ImportacaoController(db_session)
+    return _resposta_csv(importacao_controller.gerar_produtos_csv(), 'produtos.csv')
+
+
+@app.route('/admin/exportar/pedidos')
+def admin_exportar_pedidos():
+    """Exportar pedidos em CSV (admin). Aceita ?data_inicio= e ?data_fim= (AAAA-MM-DD)."""
+    if 'admin_id' not in session:
+        flash('Acesso negado', 'error')
+        return redirect(url_for('login'))
+    
+    try:
+        data_inicio = request.args.get('data_inicio')
+        data_fim = request.args.get('data_fim')
+        data_inicio = datetime.strptime(data_inicio, '%Y-%m-%d') if data_inicio else None
+        data_fim = datetime.strptime(data_fim, '%Y-%m-%d').replace(hour=23, minute=59, second=59) if data_fim else None
+    except ValueError:
+        flash('Data inválida (use AAAA-MM-DD)', 'error')
+        return redirect(url_for('admin_pedidos'))
+    
+    db_session = db.get_session()
+    importacao_controller = ImportacaoController(db_session)
+    return _resposta_csv(
+        importacao_controller.gerar_pedidos_csv(data_inicio, data_fim), 'pedidos.csv'
+    )
+
+
 # ==================== ROTAS DE EDIÇÃO DE PERFIL ====================
 
 @app.route('/perfil/editar', methods=['GET', 'POST'])
@@ -543,6 +762,8 @@ def editar_perfil():
         
         try:
             cliente_repo.update(cliente)
+            # O novo e-mail pode estar no cache negativo do login
+            emails_desconhecidos.remover(('cliente', email))
             session['cliente_nome'] = nome
             flash('Perfil atualizado com sucesso!', 'success')
             return redirect(url_for('minha_conta'))
@@ -570,10 +791,7 @@ def alterar_senha():
         cliente = cliente_repo.get_by_id(session['cliente_id'])
         
         # Verificar senha atual
-        ph = PasswordHasher()
-        try:
-            ph.verify(cliente.senha_hash, senha_atual)
-        except:
+        if not pool_senhas.verificar(cliente.senha_hash, senha_atual or ''):
             flash('Senha atual incorreta', 'error')
             return render_template('alterar_senha.html')
         
@@ -587,7 +805,7 @@ def alterar_senha():
             return render_template('alterar_senha.html')
         
         # Atualizar senha
-        cliente.senha_hash = ph.hash(nova_senha)
+        cliente.senha_hash = pool_senhas.hash(nova_senha)
         cliente_repo.update(cliente)
         
         flash('Senha alterada com sucesso!', 'success')
@@ -677,7 +895,6 @@ def deletar_endereco(endereco_id):
     
     if not endereco or endereco.cliente_id != session['cliente_id']:
         flash('Endereço não encontrado', 'error')
-        db_session.close()
         return redirect(url_for('minha_conta'))
     
     try:
@@ -685,8 +902,6 @@ def deletar_endereco(endereco_id):
         flash('Endereço removido com sucesso!', 'success')
     except Exception as e:
         flash(f'Erro ao remover endereço: {str(e)}', 'error')
-    finally:
-        db_session.close()
     
     return redirect(url_for('minha_conta'))
 
@@ -702,8 +917,7 @@ def admin_categorias():
     
     db_session = db.get_session()
     categoria_repo = CategoriaRepository(db_session)
-    categorias = categoria_repo.get_all()
-    db_session.close()
+    categorias = categoria_repo.get_all_cached()
     
     return render_template('admin/categorias.html', categorias=categorias)
 
@@ -732,12 +946,9 @@ def admin_criar_categoria():
         try:
             categoria_repo.create(nova_categoria)
             flash('Categoria criada com sucesso!', 'success')
-            db_session.close()
             return redirect(url_for('admin_categorias'))
         except Exception as e:
             flash(f'Erro ao criar categoria: {str(e)}', 'error')
-        finally:
-            db_session.close()
     
     return render_template('admin/categoria_form.html', categoria=None)
 
@@ -755,7 +966,6 @@ def admin_editar_categoria(categoria_id):
     
     if not categoria:
         flash('Categoria não encontrada', 'error')
-        db_session.close()
         return redirect(url_for('admin_categorias'))
     
     if request.method == 'POST':
@@ -765,7 +975,6 @@ def admin_editar_categoria(categoria_id):
         categoria_existente = categoria_repo.get_by_nome(nome)
         if categoria_existente and categoria_existente.id != categoria_id:
             flash('Já existe uma categoria com este nome', 'error')
-            db_session.close()
             return render_template('admin/categoria_form.html', categoria=categoria)
         
         categoria.nome = nome
@@ -773,17 +982,13 @@ def admin_editar_categoria(categoria_id):
         try:
             categoria_repo.update(categoria)
             flash('Categoria atualizada com sucesso!', 'success')
-            db_session.close()
             return redirect(url_for('admin_categorias'))
         except Exception as e:
             flash(f'Erro ao atualizar categoria: {str(e)}', 'error')
-        finally:
-            db_session.close()
             return render_template('admin/categoria_form.html', categoria=categoria)
     
     # GET request
     result = render_template('admin/categoria_form.html', categoria=categoria)
-    db_session.close()
     return result
 
 
@@ -806,8 +1011,6 @@ def admin_deletar_categoria(categoria_id):
             flash('Categoria removida com sucesso!', 'success')
     except Exception as e:
         flash(f'Erro ao remover categoria: {str(e)}', 'error')
-    finally:
-        db_session.close()
     
     return redirect(url_for('admin_categorias'))
 
@@ -0,0 +1,158 @@
+"""Cache em memória com expiração (TTL), descarte LRU e invalidação por tags."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Set
+
+
+class CacheLRU:
+    """
+    Cache em memória, seguro para múltiplas threads.
+    
+    Cada entrada expira após o TTL e, quando a capacidade é atingida, a entrada
+    usada há mais tempo é descartada. Entradas podem receber tags (por exemplo
+    'produto:10' ou 'categoria:3') para serem invalidadas em grupo.
+    
+    Attributes:
+        capacidade (int): Número máximo de entradas.
+        ttl (float): Tempo de vida padrão das entradas, em segundos.
+        hits (int): Leituras atendidas pelo cache.
+        misses (int): Leituras sem entrada válida.
+    """
+    
+    def __init__(self, capacidade: int = 1024, ttl: float = 60.0,
+                 relogio: Callable[[], float] = time.monotonic):
+        """
+        Inicializa o cache.
+        
+        Args:
+            capacidade: Número máximo de entradas.
+            ttl: Tempo de vida padrão das entradas, em segundos.
+            relogio: Função que retorna o tempo atual (monotônico).
+        """
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._tags: Dict[str, Set[Hashable]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def obter(self, chave: Hashable, padrao: Any = None) -> Any:
+        """
+        Busca uma entrada válida no cache.
+        
+        Args:
+            chave: Chave da entrada.
+            padrao: Valor retornado se não houver entrada válida.
+            
+        Returns:
+            Valor armazenado ou o padrão.
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or entrada[0] <= self._relogio():
+                if entrada is not None:
+                    self._remover(chave)
+                self.misses += 1
+                return padrao
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return entrada[1]
+    
+    def guardar(self, chave: Hashable, valor: Any, tags: Iterable[str] = (), ttl: float = None) -> None:
+        """
+        Armazena uma entrada no cache.
+        
+        Args:
+            chave: Chave da entrada.
+            valor: Valor a armazenar.
+            tags: Tags usadas para invalidação em grupo.
+            ttl: Tempo de vida em segundos (padrão: ttl do cache).
+        """
+        tags = frozenset(tags)
+        expira_em = self._relogio() + (self.ttl if ttl is None else ttl)
+        
+        with self._lock:
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (expira_em, valor, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(chave)
+            
+            while len(self._entradas) > self.capacidade:
+                self._remover(next(iter(self._entradas)))
+    
+    def remover(self, chave: Hashable) -> bool:
+        """
+        Remove uma entrada pela chave.
+        
+        Args:
+            chave: Chave da entrada.
+            
+        Returns:
+            True se a entrada existia.
+        """
+        with self._lock:
+            if chave not in self._entradas:
+                return False
+            self._remover(chave)
+            return True
+    
+    def invalidar(self, *tags: str) -> int:
+        """
+        Remove todas as entradas marcadas com alguma das tags.
+        
+        Args:
+            tags: Tags a invalidar.
+            
+        Returns:
+            Quantidade de entradas removidas.
+        """
+        with self._lock:
+            chaves = set()
+            for tag in tags:
+                chaves |= self._tags.get(tag, set())
+            for chave in chaves:
+                self._remover(chave)
+            return len(chaves)
+    
+    def limpar(self) -> None:
+        """
+        Remove todas as entradas.
+        """
+        with self._lock:
+            self._entradas.clear()
+            self._tags.clear()
+    
+    def estatisticas(self) -> Dict[str, int]:
+        """
+        Retorna os contadores do cache.
+        
+        Returns:
+            Dicionário com entradas, hits e misses.
+        """
+        with self._lock:
+            return {'entradas': len(self._entradas), 'hits': self.hits, 'misses': self.misses}
+    
+    def _remover(self, chave: Hashable) -> None:
+        """
+        Remove uma entrada e suas referências de tags (chamar com o lock adquirido).
+        
+        Args:
+            chave: Chave da entrada.
+        """
+        _, _, tags = self._entradas.pop(chave)
+        for tag in tags:
+            chaves = self._tags.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._tags[tag]
+
+
+# Fragmentos HTML das páginas de catálogo (grade de produtos e detalhe).
+# Tags: 'catalogo' (listagens sem filtro de categoria), 'categoria:<id>' e 'produto:<id>'.
+cache_paginas = CacheLRU(capacidade=512, ttl=60.0)
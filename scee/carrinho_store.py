@@ -0,0 +1,339 @@
+"""Armazenamento dos carrinhos de compras no servidor (memória, SQLite ou Redis)."""
+
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+from urllib.parse import urlparse
+
+from cache import CacheLRU
+from controllers.carrinho_controller import CarrinhoController
+
+
+class CarrinhoStoreBase(ABC):
+    """
+    Classe base abstrata para armazenamento de carrinhos.
+    
+    Os carrinhos são guardados serializados (CarrinhoController.serializar),
+    então qualquer processo da aplicação pode ler o carrinho de uma sessão.
+    
+    Attributes:
+        ttl (float): Tempo em segundos sem uso após o qual o carrinho expira.
+    """
+    
+    def __init__(self, ttl: float = 7 * 24 * 3600):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            ttl: Tempo em segundos sem uso após o qual o carrinho expira.
+        """
+        self.ttl = ttl
+    
+    def carregar(self, session_id: str) -> CarrinhoController:
+        """
+        Carrega o carrinho de uma sessão (vazio se não existir ou tiver expirado).
+        
+        Args:
+            session_id: Identificador da sessão.
+            
+        Returns:
+            Carrinho da sessão.
+        """
+        dados = self._ler(session_id)
+        if dados is None:
+            return CarrinhoController()
+        return CarrinhoController.desserializar(dados)
+    
+    def salvar(self, session_id: str, carrinho: CarrinhoController) -> None:
+        """
+        Salva o carrinho de uma sessão; carrinhos vazios são removidos.
+        
+        Args:
+            session_id: Identificador da sessão.
+            carrinho: Carrinho a salvar.
+        """
+        if carrinho.quantidade_itens() == 0:
+            self.remover(session_id)
+        else:
+            self._escrever(session_id, carrinho.serializar())
+    
+    @abstractmethod
+    def _ler(self, session_id: str) -> Optional[bytes]:
+        """
+        Lê o carrinho serializado e renova seu tempo de expiração.
+        
+        Args:
+            session_id: Identificador da sessão.
+            
+        Returns:
+            Carrinho serializado ou None.
+        """
+        pass
+    
+    @abstractmethod
+    def _escrever(self, session_id: str, dados: bytes) -> None:
+        """
+        Grava o carrinho serializado.
+        
+        Args:
+            session_id: Identificador da sessão.
+            dados: Carrinho serializado.
+        """
+        pass
+    
+    @abstractmethod
+    def remover(self, session_id: str) -> None:
+        """
+        Remove o carrinho de uma sessão.
+        
+        Args:
+            session_id: Identificador da sessão.
+        """
+        pass
+
+
+class CarrinhoStoreMemoria(CarrinhoStoreBase):
+    """
+    Carrinhos na memória do processo, com descarte LRU e expiração por inatividade.
+    
+    Serve para um único processo (desenvolvimento); com vários workers cada um
+    teria seus próprios carrinhos.
+    """
+    
+    def __init__(self, capacidade: int = 10000, ttl: float = 24 * 3600):
+        """
+        Inicializa o armazenamento em memória.
+        
+        Args:
+            capacidade: Número máximo de carrinhos mantidos.
+            ttl: Tempo em segundos sem uso após o qual o carrinho expira.
+        """
+        super().__init__(ttl)
+        self._cache = CacheLRU(capacidade=capacidade, ttl=ttl)
+    
+    def _ler(self, session_id: str) -> Optional[bytes]:
+        """
+        Lê o carrinho do cache, renovando seu tempo de expiração.
+        
+        Args:
+            session_id: Identificador da sessão.
+            
+        Returns:
+            Carrinho serializado ou None.
+        """
+        dados = self._cache.obter(session_id)
+        if dados is not None:
+            self._cache.guardar(session_id, dados)
+        return dados
+    
+    def _escrever(self, session_id: str, dados: bytes) -> None:
+        """
+        Grava o carrinho no cache.
+        
+        Args:
+            session_id: Identificador da sessão.
+            dados: Carrinho serializado.
+        """
+        self._cache.guardar(session_id, dados)
+    
+    def remover(self, session_id: str) -> None:
+        """
+        Remove o carrinho do cache.
+        
+        Args:
+            session_id: Identificador da sessão.
+        """
+        self._cache.remover(session_id)
+
+
+class CarrinhoStoreSQLite(CarrinhoStoreBase):
+    """
+    Carrinhos em uma tabela SQLite, compartilhada entre os processos da máquina.
+    
+    Carrinhos expirados são ignorados na leitura e apagados periodicamente.
+    """
+    
+    EXPURGO_A_CADA = 500  # escritas entre duas limpezas de carrinhos expirados
+    
+    def __init__(self, caminho: str = 'scee_carrinhos.db', ttl: float = 7 * 24 * 3600):
+        """
+        Inicializa o armazenamento e cria a tabela se necessário.
+        
+        Args:
+            caminho: Arquivo do banco SQLite.
+            ttl: Tempo em segundos sem uso após o qual o carrinho expira.
+        """
+        super().__init__(ttl)
+        self.caminho = caminho
+        self._local = threading.local()
+        self._escritas = 0
+        with self._conexao() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS carrinhos ('
+                'session_id TEXT PRIMARY KEY, dados BLOB NOT NULL, expira_em REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_carrinhos_expira_em ON carrinhos (expira_em)')
+    
+    def _conexao(self) -> sqlite3.Connection:
+        """
+        Retorna a conexão da thread atual (sqlite3 não compartilha conexões entre threads).
+        
+        Returns:
+            Conexão SQLite.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=10)
+            self._local.conn = conn
+        return conn
+    
+    def _ler(self, session_id: str) -> Optional[bytes]:
+        """
+        Lê o carrinho da tabela, renovando seu tempo de expiração.
+        
+        Args:
+            session_id: Identificador da sessão.
+            
+        Returns:
+            Carrinho serializado ou None.
+        """
+        agora = time.time()
+        with self._conexao() as conn:
+            linha = conn.execute(
+                'SELECT dados FROM carrinhos WHERE session_id = ? AND expira_em > ?',
+                (session_id, agora)
+            ).fetchone()
+            if linha:
+                conn.execute(
+                    'UPDATE carrinhos SET expira_em = ? WHERE session_id = ?',
+                    (agora + self.ttl, session_id)
+                )
+        return linha[0] if linha else None
+    
+    def _escrever(self, session_id: str, dados: bytes) -> None:
+        """
+        Grava o carrinho na tabela (insere ou substitui).
+        
+        Args:
+            session_id: Identificador da sessão.
+            dados: Carrinho serializado.
+        """
+        with self._conexao() as conn:
+            conn.execute(
+                'INSERT INTO carrinhos (session_id, dados, expira_em) VALUES (?, ?, ?) '
+                'ON CONFLICT(session_id) DO UPDATE SET dados = excluded.dados, expira_em = excluded.expira_em',
+                (session_id, dados, time.time() + self.ttl)
+            )
+        
+        self._escritas += 1
+        if self._escritas % self.EXPURGO_A_CADA == 0:
+            self.expurgar()
+    
+    def remover(self, session_id: str) -> None:
+        """
+        Remove o carrinho da tabela.
+        
+        Args:
+            session_id: Identificador da sessão.
+        """
+        with self._conexao() as conn:
+            conn.execute('DELETE FROM carrinhos WHERE session_id = ?', (session_id,))
+    
+    def expurgar(self) -> int:
+        """
+        Apaga os carrinhos expirados.
+        
+        Returns:
+            Quantidade de carrinhos apagados.
+        """
+        with self._conexao() as conn:
+            return conn.execute('DELETE FROM carrinhos WHERE expira_em <= ?', (time.time(),)).rowcount
+
+
+class CarrinhoStoreRedis(CarrinhoStoreBase):
+    """
+    Carrinhos em um servidor Redis (ou compatível), com expiração nativa (EX).
+    
+    Aceita qualquer cliente com a interface get/set(ex=)/getex(ex=)/delete do
+    redis-py, o que permite usar um substituto local (ex.: fakeredis).
+    """
+    
+    def __init__(self, cliente, ttl: float = 7 * 24 * 3600, prefixo: str = 'scee:carrinho:'):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            cliente: Cliente Redis.
+            ttl: Tempo em segundos sem uso após o qual o carrinho expira.
+            prefixo: Prefixo das chaves.
+        """
+        super().__init__(ttl)
+        self.cliente = cliente
+        self.prefixo = prefixo
+    
+    def _ler(self, session_id: str) -> Optional[bytes]:
+        """
+        Lê o carrinho (GETEX), renovando seu tempo de expiração.
+        
+        Args:
+            session_id: Identificador da sessão.
+            
+        Returns:
+            Carrinho serializado ou None.
+        """
+        return self.cliente.getex(self.prefixo + session_id, ex=int(self.ttl))
+    
+    def _escrever(self, session_id: str, dados: bytes) -> None:
+        """
+        Grava o carrinho (SET com EX).
+        
+        Args:
+            session_id: Identificador da sessão.
+            dados: Carrinho serializado.
+        """
+        self.cliente.set(self.prefixo + session_id, dados, ex=int(self.ttl))
+    
+    def remover(self, session_id: str) -> None:
+        """
+        Remove o carrinho (DEL).
+        
+        Args:
+            session_id: Identificador da sessão.
+        """
+        self.cliente.delete(self.prefixo + session_id)
+
+
+def criar_carrinho_store(url: str) -> CarrinhoStoreBase:
+    """
+    Cria o armazenamento de carrinhos a partir de uma URL.
+    
+    Formatos aceitos: 'memoria', 'sqlite:///caminho.db' e 'redis://host:porta/db'.
+    
+    Args:
+        url: URL do armazenamento.
+        
+    Returns:
+        Armazenamento de carrinhos.
+        
+    Raises:
+        ValueError: Se o esquema da URL não for suportado.
+    """
+    esquema = urlparse(url).scheme or url
+    
+    if esquema == 'memoria':
+        return CarrinhoStoreMemoria()
+    
+    if esquema == 'sqlite':
+        return CarrinhoStoreSQLite(url[len('sqlite:///'):] or 'scee_carrinhos.db')
+    
+    if esquema in ('redis', 'rediss'):
+        try:
+            import redis
+        except ImportError as e:
+            raise ValueError("Armazenamento Redis requer o pacote 'redis' (pip install redis)") from e
+        return CarrinhoStoreRedis(redis.Redis.from_url(url))
+    
+    raise ValueError(f"Armazenamento de carrinho não suportado: {url}")
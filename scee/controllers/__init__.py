@@ -12,7 +12,10 @@ from .integracao_controller import (
     CalculadoraFreteBase,
     FreteFixo,
     FreteCorreios,
-    IntegracaoController
+    FreteExpresso,
+    IntegracaoController,
+    CheckoutAssincrono,
+    CotacaoFrete
 )
 from .importacao_controller import ImportacaoController
 
@@ -29,6 +32,9 @@ __all__ = [
     'CalculadoraFreteBase',
     'FreteFixo',
     'FreteCorreios',
+    'FreteExpresso',
     'IntegracaoController',
+    'CheckoutAssincrono',
+    'CotacaoFrete',
     'ImportacaoController'
 ]
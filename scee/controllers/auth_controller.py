@@ -1,31 +1,50 @@
 """Módulo contendo o controlador de autenticação."""
 
 import re
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from models.cliente import Cliente
 from models.admin import Admin
 from repositories.cliente_repository import ClienteRepository
 from repositories.admin_repository import AdminRepository
+from cache import CacheLRU
+from limites import LimitadorJanela
+from senhas import PoolSenhas, pool_senhas
+
+# Tentativas de login por IP (todas) e por conta (apenas as que falharam).
+limite_login_ip = LimitadorJanela(limite=30, janela=60.0)
+limite_login_conta = LimitadorJanela(limite=10, janela=15 * 60.0)
+
+# E-mails sem conta, por tipo ('cliente'/'admin'): tentativas repetidas não vão ao banco.
+emails_desconhecidos = CacheLRU(capacidade=100000, ttl=60.0)
 
 
 class AuthController:
     """
     Controlador para autenticação e gerenciamento de contas.
+    
+    Hash e verificação de senhas rodam no pool de senhas; se ele estiver
+    saturado, os métodos levantam PoolSenhasSaturado (a rota responde 429).
+    Após um login, hashes gerados com parâmetros Argon2 antigos são refeitos
+    em segundo plano com os parâmetros atuais.
+    
+    Logins são limitados por IP e por conta (LimiteExcedido, 429). E-mails sem
+    conta ficam em cache negativo e recebem uma espera equivalente à de uma
+    verificação real, sem consulta ao banco nem hash.
     """
     
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, senhas: PoolSenhas = None):
         """
         Inicializa o controlador de autenticação.
         
         Args:
             session: Sessão do SQLAlchemy.
+            senhas: Pool de hash de senhas (padrão: pool compartilhado da aplicação).
         """
         self.session = session
         self.cliente_repo = ClienteRepository(session)
         self.admin_repo = AdminRepository(session)
-        self.ph = PasswordHasher()
+        self.senhas = senhas or pool_senhas
     
     def validar_email(self, email: str) -> bool:
         """
@@ -117,13 +136,14 @@ class AuthController:
         if not valida_senha:
             return False, msg_senha, None
         
-        if self.cliente_repo.email_exists(email):
+        email_existe, cpf_existe = self.cliente_repo.email_cpf_exists(email, cpf)
+        if email_existe:
             return False, "E-mail já cadastrado", None
         
-        if self.cliente_repo.cpf_exists(cpf):
+        if cpf_existe:
             return False, "CPF já cadastrado", None
         
-        senha_hash = self.ph.hash(senha)
+        senha_hash = self.senhas.hash(senha)
         
         cliente = Cliente(
             nome=nome,
@@ -133,52 +153,111 @@ class AuthController:
         )
         
         cliente = self.cliente_repo.create(cliente)
+        emails_desconhecidos.remover(('cliente', email))
         return True, "Cliente registrado com sucesso", cliente
     
-    def login_cliente(self, email: str, senha: str) -> tuple[bool, str, Cliente]:
+    def login_cliente(self, email: str, senha: str, ip: str = None) -> tuple[bool, str, Cliente]:
         """
         Autentica um cliente.
         
         Args:
             email: E-mail do cliente.
             senha: Senha do cliente.
+            ip: Endereço IP da requisição (para o limite por IP).
             
         Returns:
             Tupla (sucesso, mensagem, cliente).
+            
+        Raises:
+            LimiteExcedido: Se o IP ou a conta excedeu o limite de tentativas.
         """
-        if not email or not senha:
-            return False, "E-mail e senha são obrigatórios", None
-        
-        cliente = self.cliente_repo.get_by_email(email)
-        if not cliente:
-            return False, "E-mail ou senha incorretos", None
-        
-        try:
-            self.ph.verify(cliente.senha_hash, senha)
-            return True, "Login realizado com sucesso", cliente
-        except VerifyMismatchError:
-            return False, "E-mail ou senha incorretos", None
+        return self._autenticar('cliente', self.cliente_repo, email, senha, ip)
     
-    def login_admin(self, email: str, senha: str) -> tuple[bool, str, Admin]:
+    def login_admin(self, email: str, senha: str, ip: str = None) -> tuple[bool, str, Admin]:
         """
         Autentica um administrador.
         
         Args:
             email: E-mail do admin.
             senha: Senha do admin.
+            ip: Endereço IP da requisição (para o limite por IP).
             
         Returns:
             Tupla (sucesso, mensagem, admin).
+            
+        Raises:
+            LimiteExcedido: Se o IP ou a conta excedeu o limite de tentativas.
+        """
+        return self._autenticar('admin', self.admin_repo, email, senha, ip)
+    
+    def _autenticar(self, tipo: str, repo, email: str, senha: str, ip: str = None) -> tuple:
+        """
+        Autentica um cliente ou admin, aplicando limites e o cache negativo.
+        
+        Args:
+            tipo: 'cliente' ou 'admin'.
+            repo: Repositório da conta (ClienteRepository ou AdminRepository).
+            email: E-mail informado.
+            senha: Senha informada.
+            ip: Endereço IP da requisição.
+            
+        Returns:
+            Tupla (sucesso, mensagem, conta).
+            
+        Raises:
+            LimiteExcedido: Se o IP ou a conta excedeu o limite de tentativas.
         """
         if not email or not senha:
             return False, "E-mail e senha são obrigatórios", None
         
-        admin = self.admin_repo.get_by_email(email)
-        if not admin:
+        if ip:
+            limite_login_ip.registrar(ip)
+        conta = (tipo, email.lower())
+        limite_login_conta.verificar(conta)
+        
+        chave = (tipo, email)
+        entidade = None
+        if emails_desconhecidos.obter(chave) is None:
+            entidade = repo.get_by_email(email)
+            if entidade is None:
+                emails_desconhecidos.guardar(chave, True)
+        
+        if entidade is None:
+            self.senhas.aguardar_verificacao_ficticia()
+            limite_login_conta.registrar(conta)
             return False, "E-mail ou senha incorretos", None
         
-        try:
-            self.ph.verify(admin.senha_hash, senha)
-            return True, "Login realizado com sucesso", admin
-        except VerifyMismatchError:
+        valida, precisa_rehash = self.senhas.verificar_com_rehash(entidade.senha_hash, senha)
+        if not valida:
+            limite_login_conta.registrar(conta)
             return False, "E-mail ou senha incorretos", None
+        
+        if precisa_rehash:
+            self._atualizar_hash(type(entidade), entidade.id, entidade.senha_hash, senha)
+        return True, "Login realizado com sucesso", entidade
+    
+    def _atualizar_hash(self, modelo, entidade_id: int, hash_atual: str, senha: str) -> None:
+        """
+        Refaz em segundo plano o hash de uma senha com os parâmetros Argon2 atuais.
+        
+        A gravação usa uma conexão própria (a sessão da requisição já terá sido
+        fechada) e só altera a linha se o hash ainda for o verificado, para não
+        sobrescrever uma troca de senha feita nesse meio-tempo.
+        
+        Args:
+            modelo: Classe do modelo (Cliente ou Admin).
+            entidade_id: ID do cliente ou admin.
+            hash_atual: Hash verificado no login.
+            senha: Senha em texto puro.
+        """
+        engine = self.session.get_bind()
+        
+        def gravar(novo_hash: str) -> None:
+            with engine.begin() as conn:
+                conn.execute(
+                    update(modelo)
+                    .where(modelo.id == entidade_id, modelo.senha_hash == hash_atual)
+                    .values(senha_hash=novo_hash)
+                )
+        
+        self.senhas.hash_em_segundo_plano(senha, gravar)
@@ -1,5 +1,6 @@
 """Módulo contendo o controlador de Carrinho."""
 
+import json
 from typing import Dict
 
 
@@ -7,6 +8,9 @@ class ItemCarrinho:
     """
     Representa um item no carrinho de compras.
     
+    Usa __slots__ (sem __dict__ por instância) para reduzir a memória de
+    cada carrinho mantido no servidor.
+    
     Attributes:
         produto_id (int): ID do produto.
         nome (str): Nome do produto.
@@ -15,6 +19,8 @@ class ItemCarrinho:
         subtotal (float): Subtotal do item.
     """
     
+    __slots__ = ('produto_id', 'nome', 'preco', 'quantidade')
+    
     def __init__(self, produto_id: int, nome: str, preco: float, quantidade: int):
         """
         Inicializa um item do carrinho.
@@ -29,29 +35,57 @@ class ItemCarrinho:
         self.nome = nome
         self.preco = preco
         self.quantidade = quantidade
-        self.subtotal = preco * quantidade
+    
+    @property
+    def subtotal(self) -> float:
+        """
+        Subtotal do item (preço unitário x quantidade).
+        
+        Returns:
+            Subtotal.
+        """
+        return self.preco * self.quantidade
     
     def atualizar_quantidade(self, quantidade: int) -> None:
         """
-        Atualiza a quantidade e recalcula o subtotal.
+        Atualiza a quantidade do item.
         
         Args:
             quantidade: Nova quantidade.
         """
         self.quantidade = quantidade
-        self.subtotal = self.preco * quantidade
 
 
 class CarrinhoController:
     """
     Controlador para gerenciamento do carrinho de compras.
+    
+    O total e a quantidade de itens são mantidos a cada alteração, então
+    calcular_total e quantidade_itens não percorrem os itens.
     """
     
+    __slots__ = ('itens', '_total', '_quantidade')
+    
     def __init__(self):
         """
         Inicializa o controlador de carrinho.
         """
         self.itens: Dict[int, ItemCarrinho] = {}
+        self._total = 0.0
+        self._quantidade = 0
+    
+    def _alterar_quantidade(self, item: ItemCarrinho, quantidade: int) -> None:
+        """
+        Altera a quantidade de um item e ajusta os totais do carrinho.
+        
+        Args:
+            item: Item do carrinho.
+            quantidade: Nova quantidade.
+        """
+        diferenca = quantidade - item.quantidade
+        item.atualizar_quantidade(quantidade)
+        self._quantidade += diferenca
+        self._total += item.preco * diferenca
     
     def adicionar_item(self, produto_id: int, nome: str, preco: float, quantidade: int = 1) -> tuple[bool, str]:
         """
@@ -69,12 +103,10 @@ class CarrinhoController:
         if quantidade <= 0:
             return False, "Quantidade deve ser maior que zero"
         
-        if produto_id in self.itens:
-            self.itens[produto_id].atualizar_quantidade(
-                self.itens[produto_id].quantidade + quantidade
-            )
-        else:
-            self.itens[produto_id] = ItemCarrinho(produto_id, nome, preco, quantidade)
+        item = self.itens.get(produto_id)
+        if item is None:
+            self.itens[produto_id] = item = ItemCarrinho(produto_id, nome, preco, 0)
+        self._alterar_quantidade(item, item.quantidade + quantidade)
         
         return True, "Item adicionado ao carrinho"
     
@@ -91,7 +123,9 @@ class CarrinhoController:
         if produto_id not in self.itens:
             return False, "Item não encontrado no carrinho"
         
-        del self.itens[produto_id]
+        self._alterar_quantidade(self.itens.pop(produto_id), 0)
+        if not self.itens:
+            self.limpar()
         return True, "Item removido do carrinho"
     
     def atualizar_quantidade(self, produto_id: int, quantidade: int) -> tuple[bool, str]:
@@ -111,7 +145,7 @@ class CarrinhoController:
         if quantidade <= 0:
             return False, "Quantidade deve ser maior que zero"
         
-        self.itens[produto_id].atualizar_quantidade(quantidade)
+        self._alterar_quantidade(self.itens[produto_id], quantidade)
         return True, "Quantidade atualizada"
     
     def calcular_total(self) -> float:
@@ -119,9 +153,9 @@ class CarrinhoController:
         Calcula o total do carrinho.
         
         Returns:
-            Valor total.
+            Valor total (arredondado em centavos, descartando o erro acumulado da soma incremental).
         """
-        return sum(item.subtotal for item in self.itens.values())
+        return round(self._total, 2)
     
     def obter_itens(self) -> list:
         """
@@ -137,6 +171,8 @@ class CarrinhoController:
         Limpa todos os itens do carrinho.
         """
         self.itens.clear()
+        self._total = 0.0
+        self._quantidade = 0
     
     def quantidade_itens(self) -> int:
         """
@@ -145,4 +181,30 @@ class CarrinhoController:
         Returns:
             Quantidade de itens.
         """
-        return sum(item.quantidade for item in self.itens.values())
+        return self._quantidade
+    
+    def serializar(self) -> bytes:
+        """
+        Serializa o carrinho em JSON compacto ([[produto_id, nome, preco, quantidade], ...]).
+        
+        Returns:
+            Carrinho serializado.
+        """
+        itens = [[item.produto_id, item.nome, item.preco, item.quantidade] for item in self.itens.values()]
+        return json.dumps(itens, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    @classmethod
+    def desserializar(cls, dados: bytes) -> 'CarrinhoController':
+        """
+        Reconstrói um carrinho serializado por serializar().
+        
+        Args:
+            dados: Carrinho serializado.
+            
+        Returns:
+            Carrinho reconstruído.
+        """
+        carrinho = cls()
+        for produto_id, nome, preco, quantidade in json.loads(dados):
+            carrinho.adicionar_item(produto_id, nome, preco, quantidade)
+        return carrinho
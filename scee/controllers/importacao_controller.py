@@ -2,11 +2,15 @@
 
 import csv
 import io
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from itertools import islice
+from typing import List, Dict, Any, Iterator, Iterable, Tuple
 from datetime import datetime
 from repositories.produto_repository import ProdutoRepository
 from repositories.categoria_repository import CategoriaRepository
 from repositories.pedido_repository import PedidoRepository
+from sqlalchemy.orm import joinedload
+from cache import cache_paginas
 from models.produto import Produto
 
 
@@ -17,6 +21,15 @@ class ImportacaoController:
     Atende ao requisito RNF01.3: Sincronização de dados sem travar o sistema.
     """
     
+    TAMANHO_LOTE = 1000
+    TAMANHO_BUFFER_EXPORTACAO = 64 * 1024  # 64KB por bloco enviado
+    
+    CABECALHO_PRODUTOS = ['SKU', 'Nome', 'Descrição', 'Preço', 'Estoque', 'Categoria']
+    CABECALHO_PEDIDOS = [
+        'ID Pedido', 'Data', 'Cliente', 'CPF', 'Status',
+        'Total', 'Método Pagamento', 'Endereço Entrega'
+    ]
+    
     def __init__(self, session):
         """
         Inicializa o controller de importação.
@@ -29,15 +42,75 @@ class ImportacaoController:
         self.categoria_repo = CategoriaRepository(session)
         self.pedido_repo = PedidoRepository(session)
     
-    def importar_produtos_csv(self, arquivo_csv: str) -> tuple[bool, str, Dict[str, int]]:
+    @staticmethod
+    @contextmanager
+    def _abrir_csv(arquivo_csv) -> Iterator[io.TextIOBase]:
+        """
+        Abre a origem do CSV como um fluxo de texto, sem ler o arquivo inteiro.
+        
+        Args:
+            arquivo_csv: Caminho do arquivo, conteúdo CSV (str com quebras de linha),
+                fluxo de texto/binário ou FileStorage de upload.
+                
+        Yields:
+            Fluxo de texto posicionado no início do CSV.
+        """
+        if isinstance(arquivo_csv, str) and '\n' in arquivo_csv:
+            # Conteúdo do arquivo
+            yield io.StringIO(arquivo_csv)
+        elif isinstance(arquivo_csv, str):
+            # Caminho do arquivo
+            with open(arquivo_csv, 'r', encoding='utf-8', newline='') as f:
+                yield f
+        else:
+            # FileStorage (werkzeug) expõe o fluxo binário em .stream
+            fluxo = getattr(arquivo_csv, 'stream', arquivo_csv)
+            if isinstance(fluxo, io.TextIOBase):
+                yield fluxo
+            else:
+                texto = io.TextIOWrapper(fluxo, encoding='utf-8', newline='')
+                try:
+                    yield texto
+                finally:
+                    # Não fechar o fluxo de quem chamou
+                    texto.detach()
+    
+    @staticmethod
+    def _janelas(linhas: Iterable, tamanho: int) -> Iterator[List[Tuple[int, Dict[str, str]]]]:
+        """
+        Agrupa as linhas do CSV em janelas de tamanho fixo, sob demanda.
+        
+        Args:
+            linhas: Iterável de linhas (dicionários) do csv.DictReader.
+            tamanho: Quantidade de linhas por janela.
+            
+        Yields:
+            Listas de tuplas (número da linha, linha do CSV).
+        """
+        numeradas = enumerate(linhas, start=2)  # linha 2 (1 é cabeçalho)
+        while True:
+            janela = list(islice(numeradas, tamanho))
+            if not janela:
+                return
+            yield janela
+    
+    def importar_produtos_csv(self, arquivo_csv, tamanho_lote: int = None) -> tuple[bool, str, Dict[str, int]]:
         """
-        Importa produtos de um arquivo CSV.
+        Importa produtos de um arquivo CSV em lotes, em streaming.
+        
+        O arquivo é lido em janelas de tamanho fixo, de modo que o consumo de
+        memória não depende do tamanho do arquivo. As categorias são carregadas
+        uma única vez, os SKUs existentes são resolvidos com uma consulta IN por
+        lote e as linhas são gravadas com create_many/update_many do repositório
+        (um INSERT e um UPDATE em lote), com um commit por lote.
         
         Formato esperado do CSV:
         sku,nome,descricao,preco,estoque,categoria_nome
         
         Args:
-            arquivo_csv: Caminho do arquivo CSV ou conteúdo do arquivo.
+            arquivo_csv: Caminho do arquivo CSV, conteúdo do arquivo, fluxo de
+                texto/binário ou FileStorage de upload.
+            tamanho_lote: Linhas por lote/commit (padrão: TAMANHO_LOTE).
             
         Returns:
             Tupla (sucesso, mensagem, estatisticas).
@@ -45,67 +118,22 @@ class ImportacaoController:
         """
         estatisticas = {'criados': 0, 'atualizados': 0, 'erros': 0}
         erros_detalhados = []
+        tamanho_lote = tamanho_lote or self.TAMANHO_LOTE
         
         try:
-            # Ler CSV
-            if isinstance(arquivo_csv, str) and '\n' in arquivo_csv:
-                # Conteúdo do arquivo
-                reader = csv.DictReader(io.StringIO(arquivo_csv))
-            else:
-                # Caminho do arquivo
-                with open(arquivo_csv, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    linhas = list(reader)
+            # Categorias carregadas uma única vez (nome -> id), do primário: uma réplica
+            # atrasada recusaria produtos de categorias recém-criadas
+            categorias = {categoria.nome: categoria.id for categoria in self.categoria_repo.get_all(primario=True)}
             
-            # Processar em lote
-            for idx, linha in enumerate(linhas, start=2):  # linha 2 (1 é cabeçalho)
-                try:
-                    # Validar campos obrigatórios
-                    campos_obrigatorios = ['sku', 'nome', 'preco', 'estoque', 'categoria_nome']
-                    for campo in campos_obrigatorios:
-                        if campo not in linha or not linha[campo].strip():
-                            raise ValueError(f"Campo obrigatório ausente: {campo}")
-                    
-                    # Buscar ou criar categoria
-                    categoria = self.categoria_repo.get_by_nome(linha['categoria_nome'].strip())
-                    if not categoria:
-                        erros_detalhados.append(f"Linha {idx}: Categoria '{linha['categoria_nome']}' não encontrada")
-                        estatisticas['erros'] += 1
-                        continue
-                    
-                    # Verificar se produto já existe (por SKU)
-                    produto_existente = self.produto_repo.get_by_sku(linha['sku'].strip())
-                    
-                    if produto_existente:
-                        # Atualizar produto existente
-                        produto_existente.nome = linha['nome'].strip()
-                        produto_existente.descricao = linha.get('descricao', '').strip()
-                        produto_existente.preco = float(linha['preco'])
-                        produto_existente.estoque = int(linha['estoque'])
-                        produto_existente.categoria_id = categoria.id
-                        
-                        self.produto_repo.update(produto_existente)
-                        estatisticas['atualizados'] += 1
-                    else:
-                        # Criar novo produto
-                        novo_produto = Produto(
-                            sku=linha['sku'].strip(),
-                            nome=linha['nome'].strip(),
-                            descricao=linha.get('descricao', '').strip(),
-                            preco=float(linha['preco']),
-                            estoque=int(linha['estoque']),
-                            categoria_id=categoria.id
-                        )
-                        
-                        self.produto_repo.create(novo_produto)
-                        estatisticas['criados'] += 1
-                
-                except ValueError as e:
-                    erros_detalhados.append(f"Linha {idx}: {str(e)}")
-                    estatisticas['erros'] += 1
-                except Exception as e:
-                    erros_detalhados.append(f"Linha {idx}: Erro inesperado - {str(e)}")
-                    estatisticas['erros'] += 1
+            # Ler e processar o CSV em janelas
+            with self._abrir_csv(arquivo_csv) as fluxo:
+                reader = csv.DictReader(fluxo)
+                for lote in self._janelas(reader, tamanho_lote):
+                    self._importar_lote(lote, categorias, estatisticas, erros_detalhados)
+            
+            # Produtos alterados em massa: descartar todas as páginas em cache
+            if estatisticas['criados'] or estatisticas['atualizados']:
+                cache_paginas.limpar()
             
             # Mensagem de resultado
             mensagem = f"Importação concluída: {estatisticas['criados']} criados, {estatisticas['atualizados']} atualizados, {estatisticas['erros']} erros"
@@ -120,48 +148,149 @@ class ImportacaoController:
         except Exception as e:
             return False, f"Erro ao processar arquivo CSV: {str(e)}", estatisticas
     
-    def atualizar_estoque_em_lote(self, atualizacoes: List[Dict[str, Any]]) -> tuple[bool, str, int]:
+    def _importar_lote(self, linhas, categorias: Dict[str, int], estatisticas: Dict[str, int],
+                       erros_detalhados: List[str]) -> None:
+        """
+        Valida e grava um lote de linhas do CSV em uma única transação.
+        
+        Args:
+            linhas: Lista de tuplas (número da linha, linha do CSV).
+            categorias: Mapa nome da categoria -> ID.
+            estatisticas: Contadores de criados/atualizados/erros (atualizados in-place).
+            erros_detalhados: Lista de mensagens de erro (atualizada in-place).
+        """
+        produtos_lote: Dict[str, Dict[str, Any]] = {}
+        numeros_linha = []
+        
+        for idx, linha in linhas:
+            try:
+                # Validar campos obrigatórios
+                campos_obrigatorios = ['sku', 'nome', 'preco', 'estoque', 'categoria_nome']
+                for campo in campos_obrigatorios:
+                    if campo not in linha or not linha[campo] or not linha[campo].strip():
+                        raise ValueError(f"Campo obrigatório ausente: {campo}")
+                
+                categoria_id = categorias.get(linha['categoria_nome'].strip())
+                if categoria_id is None:
+                    erros_detalhados.append(f"Linha {idx}: Categoria '{linha['categoria_nome']}' não encontrada")
+                    estatisticas['erros'] += 1
+                    continue
+                
+                sku = linha['sku'].strip()
+                dados = {
+                    'sku': sku,
+                    'nome': linha['nome'].strip(),
+                    'descricao': (linha.get('descricao') or '').strip(),
+                    'preco': float(linha['preco']),
+                    'estoque': int(linha['estoque']),
+                    'categoria_id': categoria_id
+                }
+                
+                # SKU repetido no mesmo lote: a última linha prevalece
+                if sku in produtos_lote:
+                    produtos_lote[sku].update(dados)
+                    produtos_lote[sku]['repeticoes'] += 1
+                else:
+                    dados['repeticoes'] = 0
+                    produtos_lote[sku] = dados
+                numeros_linha.append(idx)
+            
+            except ValueError as e:
+                erros_detalhados.append(f"Linha {idx}: {str(e)}")
+                estatisticas['erros'] += 1
+        
+        if not produtos_lote:
+            return
+        
+        try:
+            # Resolver SKUs existentes com uma consulta IN
+            existentes = self.produto_repo.get_ids_by_skus(produtos_lote.keys())
+            
+            novos = []
+            atualizados = []
+            quantidade_atualizada = 0
+            for sku, dados in produtos_lote.items():
+                repeticoes = dados.pop('repeticoes')
+                if sku in existentes:
+                    dados['id'] = existentes[sku]
+                    atualizados.append(dados)
+                    quantidade_atualizada += 1 + repeticoes
+                else:
+                    novos.append(dados)
+                    quantidade_atualizada += repeticoes
+            
+            self.produto_repo.create_many(novos, commit=False)
+            self.produto_repo.update_many(atualizados, commit=False)
+            self.session.commit()
+        
+        except Exception as e:
+            self.session.rollback()
+            for idx in numeros_linha:
+                erros_detalhados.append(f"Linha {idx}: Erro inesperado - {str(e)}")
+            estatisticas['erros'] += len(numeros_linha)
+            return
+        
+        estatisticas['criados'] += len(novos)
+        estatisticas['atualizados'] += quantidade_atualizada
+    
+    def atualizar_estoque_em_lote(self, atualizacoes: List[Dict[str, Any]]) -> tuple[bool, str, int, Dict[str, str]]:
         """
         Atualiza estoque de múltiplos produtos em lote.
         
         Atende ao requisito RNF01.3: Processar 1000 atualizações em < 60 segundos.
+        As entradas são validadas em memória e gravadas com um único UPDATE
+        executemany, em uma única transação. Um SKU com alguma entrada inválida
+        não é atualizado e fica como 'inválido', mesmo que tenha outra entrada
+        válida no lote (a planilha é contraditória para esse SKU).
         
         Args:
             atualizacoes: Lista de dicionários com formato:
                 [{'sku': 'ABC123', 'estoque': 50}, ...]
                 
         Returns:
-            Tupla (sucesso, mensagem, quantidade_atualizada).
+            Tupla (sucesso, mensagem, quantidade_atualizada, resultados).
+            resultados: {sku: 'atualizado' | 'não encontrado' | 'inválido'}
         """
         quantidade_atualizada = 0
         erros = []
+        resultados: Dict[str, str] = {}
+        estoques: Dict[str, int] = {}
         
         try:
             inicio = datetime.now()
             
             for atualizacao in atualizacoes:
-                try:
-                    sku = atualizacao.get('sku')
-                    novo_estoque = atualizacao.get('estoque')
-                    
-                    if not sku or novo_estoque is None:
-                        erros.append(f"SKU ou estoque ausente: {atualizacao}")
-                        continue
-                    
-                    # Buscar produto
-                    produto = self.produto_repo.get_by_sku(sku)
-                    
-                    if not produto:
-                        erros.append(f"Produto não encontrado: {sku}")
-                        continue
-                    
-                    # Atualizar estoque
-                    produto.estoque = int(novo_estoque)
-                    self.produto_repo.update(produto)
-                    quantidade_atualizada += 1
+                sku = atualizacao.get('sku')
+                novo_estoque = atualizacao.get('estoque')
+                
+                if not sku or novo_estoque is None:
+                    erros.append(f"SKU ou estoque ausente: {atualizacao}")
+                    if sku:
+                        resultados[sku] = 'inválido'
+                    continue
                 
-                except Exception as e:
+                try:
+                    estoques[sku] = int(novo_estoque)
+                except (TypeError, ValueError) as e:
                     erros.append(f"Erro ao atualizar {sku}: {str(e)}")
+                    resultados[sku] = 'inválido'
+            
+            # 'inválido' prevalece sobre entradas válidas do mesmo SKU
+            for sku, resultado in resultados.items():
+                if resultado == 'inválido':
+                    estoques.pop(sku, None)
+            
+            atualizados = self.produto_repo.update_estoque_by_sku(estoques)
+            
+            for sku in estoques:
+                if sku in atualizados:
+                    resultados[sku] = 'atualizado'
+                else:
+                    erros.append(f"Produto não encontrado: {sku}")
+                    resultados[sku] = 'não encontrado'
+            quantidade_atualizada = len(atualizados)
+            if atualizados:
+                cache_paginas.limpar()
             
             fim = datetime.now()
             tempo_decorrido = (fim - inicio).total_seconds()
@@ -171,10 +300,117 @@ class ImportacaoController:
             if erros:
                 mensagem += f"\n{len(erros)} erros encontrados"
             
-            return True, mensagem, quantidade_atualizada
+            return True, mensagem, quantidade_atualizada, resultados
         
         except Exception as e:
-            return False, f"Erro ao atualizar estoque em lote: {str(e)}", quantidade_atualizada
+            self.session.rollback()
+            return False, f"Erro ao atualizar estoque em lote: {str(e)}", 0, resultados
+    
+    def _gerar_csv(self, cabecalho: List[str], linhas: Iterable[list]) -> Iterator[str]:
+        """
+        Gera o CSV em blocos de texto usando um único buffer reaproveitado.
+        
+        O cabeçalho é emitido imediatamente; as linhas seguintes são agrupadas
+        em blocos de até TAMANHO_BUFFER_EXPORTACAO caracteres.
+        
+        Args:
+            cabecalho: Colunas do cabeçalho.
+            linhas: Iterável de linhas (listas de valores).
+            
+        Yields:
+            Blocos de texto CSV.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        writer.writerow(cabecalho)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        
+        for linha in linhas:
+            writer.writerow(linha)
+            if buffer.tell() >= self.TAMANHO_BUFFER_EXPORTACAO:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        if buffer.tell():
+            yield buffer.getvalue()
+        buffer.close()
+    
+    def _linhas_produtos(self) -> Iterator[list]:
+        """
+        Percorre os produtos em blocos no servidor (yield_per).
+        
+        Yields:
+            Linhas do CSV de produtos.
+        """
+        query = self.session.query(Produto).options(
+            joinedload(Produto.categoria)
+        ).order_by(Produto.id).yield_per(self.TAMANHO_LOTE)
+        
+        for produto in query:
+            yield [
+                produto.sku,
+                produto.nome,
+                produto.descricao,
+                f"{produto.preco:.2f}",
+                produto.estoque,
+                produto.categoria.nome if produto.categoria else ''
+            ]
+    
+    def _linhas_pedidos(self, data_inicio: datetime = None, data_fim: datetime = None) -> Iterator[list]:
+        """
+        Percorre os pedidos do período em blocos no servidor (yield_per).
+        
+        O filtro de data e o JOIN com clientes são feitos em uma única consulta.
+        
+        Args:
+            data_inicio: Data inicial do filtro (opcional).
+            data_fim: Data final do filtro (opcional).
+            
+        Yields:
+            Linhas do CSV de pedidos.
+        """
+        linhas = self.pedido_repo.get_export_rows(data_inicio, data_fim, chunk_size=self.TAMANHO_LOTE)
+        
+        for (pedido_id, data_pedido, cliente_nome, cliente_cpf,
+             status, total, metodo_pagamento, endereco_entrega) in linhas:
+            yield [
+                pedido_id,
+                data_pedido.strftime('%Y-%m-%d %H:%M:%S'),
+                cliente_nome,
+                cliente_cpf,
+                status,
+                f"{total:.2f}",
+                metodo_pagamento,
+                endereco_entrega
+            ]
+    
+    def gerar_produtos_csv(self) -> Iterator[str]:
+        """
+        Exporta todos os produtos em CSV como um gerador de blocos de texto.
+        
+        Adequado para respostas em streaming: a memória usada é constante.
+        
+        Yields:
+            Blocos de texto CSV.
+        """
+        return self._gerar_csv(self.CABECALHO_PRODUTOS, self._linhas_produtos())
+    
+    def gerar_pedidos_csv(self, data_inicio: datetime = None, data_fim: datetime = None) -> Iterator[str]:
+        """
+        Exporta pedidos em CSV como um gerador de blocos de texto.
+        
+        Args:
+            data_inicio: Data inicial do filtro (opcional).
+            data_fim: Data final do filtro (opcional).
+            
+        Yields:
+            Blocos de texto CSV.
+        """
+        return self._gerar_csv(self.CABECALHO_PEDIDOS, self._linhas_pedidos(data_inicio, data_fim))
     
     def exportar_produtos_csv(self) -> tuple[bool, str, str]:
         """
@@ -184,30 +420,10 @@ class ImportacaoController:
             Tupla (sucesso, mensagem, conteudo_csv).
         """
         try:
-            produtos = self.produto_repo.get_all()
-            
-            # Criar CSV em memória
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Cabeçalho
-            writer.writerow(['SKU', 'Nome', 'Descrição', 'Preço', 'Estoque', 'Categoria'])
-            
-            # Dados
-            for produto in produtos:
-                writer.writerow([
-                    produto.sku,
-                    produto.nome,
-                    produto.descricao,
-                    f"{produto.preco:.2f}",
-                    produto.estoque,
-                    produto.categoria.nome if produto.categoria else ''
-                ])
-            
-            conteudo_csv = output.getvalue()
-            output.close()
+            linhas = list(self._linhas_produtos())
+            conteudo_csv = ''.join(self._gerar_csv(self.CABECALHO_PRODUTOS, linhas))
             
-            return True, f"{len(produtos)} produtos exportados", conteudo_csv
+            return True, f"{len(linhas)} produtos exportados", conteudo_csv
         
         except Exception as e:
             return False, f"Erro ao exportar produtos: {str(e)}", ""
@@ -224,42 +440,10 @@ class ImportacaoController:
             Tupla (sucesso, mensagem, conteudo_csv).
         """
         try:
-            # Buscar todos os pedidos (em produção, filtrar por data)
-            pedidos = self.pedido_repo.get_all()
-            
-            # Filtrar por data se fornecido
-            if data_inicio:
-                pedidos = [p for p in pedidos if p.data_pedido >= data_inicio]
-            if data_fim:
-                pedidos = [p for p in pedidos if p.data_pedido <= data_fim]
-            
-            # Criar CSV em memória
-            output = io.StringIO()
-            writer = csv.writer(output)
-            
-            # Cabeçalho
-            writer.writerow([
-                'ID Pedido', 'Data', 'Cliente', 'CPF', 'Status',
-                'Total', 'Método Pagamento', 'Endereço Entrega'
-            ])
-            
-            # Dados
-            for pedido in pedidos:
-                writer.writerow([
-                    pedido.id,
-                    pedido.data_pedido.strftime('%Y-%m-%d %H:%M:%S'),
-                    pedido.cliente.nome,
-                    pedido.cliente.cpf,
-                    pedido.status,
-                    f"{pedido.total:.2f}",
-                    pedido.metodo_pagamento,
-                    pedido.endereco_entrega
-                ])
-            
-            conteudo_csv = output.getvalue()
-            output.close()
+            linhas = list(self._linhas_pedidos(data_inicio, data_fim))
+            conteudo_csv = ''.join(self._gerar_csv(self.CABECALHO_PEDIDOS, linhas))
             
-            return True, f"{len(pedidos)} pedidos exportados", conteudo_csv
+            return True, f"{len(linhas)} pedidos exportados", conteudo_csv
         
         except Exception as e:
             return False, f"Erro ao exportar pedidos: {str(e)}", ""
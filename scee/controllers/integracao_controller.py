@@ -1,7 +1,13 @@
 """Módulo de integração com serviços externos (Polimorfismo)."""
 
+import asyncio
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Any, Hashable, Optional
+from cache import CacheLRU
 
 
 class GatewayPagamentoBase(ABC):
@@ -10,8 +16,13 @@ class GatewayPagamentoBase(ABC):
     
     Demonstra o princípio de Polimorfismo da POO, permitindo que diferentes
     implementações de pagamento (PagSeguro, Stripe, etc.) compartilhem a mesma interface.
+    
+    Attributes:
+        timeout (float): Tempo máximo em segundos de uma chamada assíncrona ao gateway.
     """
     
+    timeout = 30.0
+    
     @abstractmethod
     def processar_pagamento(self, valor: float, dados_pagamento: Dict[str, Any]) -> tuple[bool, str]:
         """
@@ -38,6 +49,34 @@ class GatewayPagamentoBase(ABC):
             Tupla (valido: bool, mensagem: str).
         """
         pass
+    
+    async def processar_pagamento_async(self, valor: float, dados_pagamento: Dict[str, Any]) -> tuple[bool, str]:
+        """
+        Versão assíncrona de processar_pagamento.
+        
+        A implementação padrão executa a versão síncrona em uma thread; gateways
+        com cliente HTTP assíncrono devem sobrescrever este método.
+        
+        Args:
+            valor: Valor total do pagamento.
+            dados_pagamento: Dicionário com dados do pagamento.
+            
+        Returns:
+            Tupla (sucesso: bool, mensagem: str).
+        """
+        return await asyncio.to_thread(self.processar_pagamento, valor, dados_pagamento)
+    
+    async def validar_dados_pagamento_async(self, dados_pagamento: Dict[str, Any]) -> tuple[bool, str]:
+        """
+        Versão assíncrona de validar_dados_pagamento (mesma regra de processar_pagamento_async).
+        
+        Args:
+            dados_pagamento: Dicionário com dados do pagamento.
+            
+        Returns:
+            Tupla (valido: bool, mensagem: str).
+        """
+        return await asyncio.to_thread(self.validar_dados_pagamento, dados_pagamento)
 
 
 class PagamentoCartao(GatewayPagamentoBase):
@@ -152,8 +191,13 @@ class CalculadoraFreteBase(ABC):
     
     Demonstra Polimorfismo: permite diferentes estratégias de cálculo
     (frete fixo, Correios, transportadora) com a mesma interface.
+    
+    Attributes:
+        timeout (float): Tempo máximo em segundos de uma cotação assíncrona.
     """
     
+    timeout = 5.0
+    
     @abstractmethod
     def calcular_frete(self, cep_destino: str, peso_kg: float, valor_produtos: float) -> tuple[float, int]:
         """
@@ -168,6 +212,23 @@ class CalculadoraFreteBase(ABC):
             Tupla (valor_frete: float, prazo_dias: int).
         """
         pass
+    
+    async def calcular_frete_async(self, cep_destino: str, peso_kg: float, valor_produtos: float) -> tuple[float, int]:
+        """
+        Versão assíncrona de calcular_frete.
+        
+        A implementação padrão executa a versão síncrona em uma thread; calculadoras
+        que consultam APIs externas devem sobrescrever este método.
+        
+        Args:
+            cep_destino: CEP de destino (apenas números).
+            peso_kg: Peso total dos produtos em kg.
+            valor_produtos: Valor total dos produtos.
+            
+        Returns:
+            Tupla (valor_frete: float, prazo_dias: int).
+        """
+        return await asyncio.to_thread(self.calcular_frete, cep_destino, peso_kg, valor_produtos)
 
 
 class FreteFixo(CalculadoraFreteBase):
@@ -309,6 +370,184 @@ class FreteExpresso(CalculadoraFreteBase):
         return round(valor_base, 2), prazo
 
 
+class FreteCotado(CalculadoraFreteBase):
+    """
+    Frete já cotado e gravado em um pedido.
+    
+    Usado ao cobrar um pedido existente: o valor cobrado é o do pedido, mesmo
+    que a cotação da transportadora tenha mudado depois.
+    """
+    
+    def __init__(self, valor_frete: float, prazo_entrega: int):
+        """
+        Inicializa a calculadora com a cotação do pedido.
+        
+        Args:
+            valor_frete: Valor do frete do pedido.
+            prazo_entrega: Prazo de entrega do pedido, em dias.
+        """
+        self.valor_frete = valor_frete
+        self.prazo_entrega = prazo_entrega
+    
+    def calcular_frete(self, cep_destino: str, peso_kg: float, valor_produtos: float) -> tuple[float, int]:
+        """
+        Retorna a cotação gravada, independente dos argumentos.
+        
+        Args:
+            cep_destino: CEP de destino.
+            peso_kg: Peso total.
+            valor_produtos: Valor dos produtos.
+            
+        Returns:
+            Tupla (valor_frete, prazo_dias).
+        """
+        return self.valor_frete, self.prazo_entrega
+
+
+class CotacaoFrete:
+    """
+    Serviço de cotação que consulta todas as calculadoras de frete registradas
+    em paralelo (pool de threads), com cache LRU + TTL dos resultados.
+    
+    A chave do cache é (tipo, prefixo de 5 dígitos do CEP, peso exato em gramas,
+    faixa de valor) e cada cotação é calculada com esses mesmos valores: CEP
+    prefixo + '000' e o piso da faixa de valor. Isso pressupõe calculadoras que
+    dependem apenas do início do CEP e cujos limites de valor (ex.: frete grátis
+    a partir de R$ 500) coincidem com FAIXAS_VALOR; o peso não é arredondado,
+    pois Correios e Expresso cobram por kg excedente sobre o peso exato.
+    
+    Attributes:
+        calculadoras (dict): Tipo de frete -> calculadora registrada.
+    """
+    
+    FAIXAS_VALOR = (0, 100, 250, 500, 1000, 2500, 5000)
+    
+    def __init__(self, calculadoras: Optional[Dict[str, CalculadoraFreteBase]] = None,
+                 max_workers: int = 8, capacidade: int = 4096, ttl: float = 600.0):
+        """
+        Inicializa o serviço de cotação.
+        
+        Args:
+            calculadoras: Tipo de frete -> calculadora (padrão: Fixo, Correios e Expresso).
+            max_workers: Threads do pool de cotação.
+            capacidade: Número máximo de cotações em cache.
+            ttl: Tempo de vida das cotações em cache, em segundos.
+        """
+        if calculadoras is None:
+            calculadoras = {'Fixo': FreteFixo(), 'Correios': FreteCorreios(), 'Expresso': FreteExpresso()}
+        self.calculadoras = dict(calculadoras)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cotacao-frete')
+        self._cache = CacheLRU(capacidade=capacidade, ttl=ttl)
+    
+    def registrar(self, tipo: str, calculadora: CalculadoraFreteBase) -> None:
+        """
+        Registra (ou substitui) uma calculadora de frete.
+        
+        Args:
+            tipo: Nome do tipo de frete.
+            calculadora: Calculadora do tipo.
+        """
+        self.calculadoras[tipo] = calculadora
+        self._cache.limpar()
+    
+    def _faixa(self, cep_destino: str, peso_kg: float, valor_produtos: float) -> tuple:
+        """
+        Normaliza os parâmetros da cotação para os representantes da faixa.
+        
+        Args:
+            cep_destino: CEP de destino.
+            peso_kg: Peso total em kg.
+            valor_produtos: Valor total dos produtos.
+            
+        Returns:
+            Tupla (cep, peso, valor) usada tanto no cálculo quanto na chave do cache.
+        """
+        cep_limpo = cep_destino.replace('-', '').replace('.', '')
+        cep = cep_limpo[:5] + '000' if cep_limpo.isdigit() and len(cep_limpo) == 8 else ''
+        peso = round(peso_kg, 3)
+        valor = max((faixa for faixa in self.FAIXAS_VALOR if faixa <= valor_produtos), default=0)
+        return cep, peso, valor
+    
+    def cotar(self, cep_destino: str, peso_kg: float, valor_produtos: float,
+              tipos: Optional[list] = None) -> Dict[str, tuple[float, int]]:
+        """
+        Cota o frete em todas as calculadoras (ou nas indicadas) de uma vez.
+        
+        As cotações fora do cache rodam em paralelo, então o tempo total é o da
+        calculadora mais lenta. Cotações que falham ou excedem o timeout da
+        calculadora ficam de fora do resultado (e não vão para o cache).
+        
+        Args:
+            cep_destino: CEP de destino.
+            peso_kg: Peso total em kg.
+            valor_produtos: Valor total dos produtos.
+            tipos: Tipos de frete a cotar (padrão: todos os registrados).
+            
+        Returns:
+            Dicionário tipo de frete -> (valor_frete, prazo_dias).
+        """
+        faixa = self._faixa(cep_destino, peso_kg, valor_produtos)
+        cotacoes = {}
+        pendentes = {}
+        
+        for tipo in (tipos if tipos is not None else self.calculadoras):
+            calculadora = self.calculadoras.get(tipo)
+            if calculadora is None:
+                continue
+            cotacao = self._cache.obter((tipo,) + faixa)
+            if cotacao is not None:
+                cotacoes[tipo] = cotacao
+            else:
+                pendentes[tipo] = self._executor.submit(calculadora.calcular_frete, *faixa)
+        
+        inicio = time.monotonic()
+        for tipo, futuro in pendentes.items():
+            restante = self.calculadoras[tipo].timeout - (time.monotonic() - inicio)
+            try:
+                cotacao = futuro.result(timeout=max(restante, 0))
+            except FuturesTimeoutError:
+                futuro.cancel()
+                continue
+            except Exception:
+                continue
+            self._cache.guardar((tipo,) + faixa, cotacao)
+            cotacoes[tipo] = cotacao
+        
+        return cotacoes
+
+
+# Serviço compartilhado pelas requisições (pool de threads e cache únicos por processo).
+cotacao_frete = CotacaoFrete()
+
+
+class PagamentoPendente(Exception):
+    """
+    O gateway não respondeu a tempo e o resultado da cobrança ainda é desconhecido.
+    
+    A cobrança não é cancelada nem deve ser repetida: o chamador conclui o
+    pagamento aguardando a tarefa em `pagamento`.
+    
+    Attributes:
+        pagamento (asyncio.Future): Tarefa da cobrança, que resolve em (sucesso, mensagem).
+        valor_frete (float): Valor do frete já calculado.
+        prazo_entrega (int): Prazo de entrega já calculado.
+    """
+    
+    def __init__(self, pagamento: asyncio.Future, valor_frete: float, prazo_entrega: int):
+        """
+        Inicializa a exceção.
+        
+        Args:
+            pagamento: Tarefa da cobrança em andamento.
+            valor_frete: Valor do frete já calculado.
+            prazo_entrega: Prazo de entrega já calculado.
+        """
+        super().__init__("Pagamento em processamento no gateway")
+        self.pagamento = pagamento
+        self.valor_frete = valor_frete
+        self.prazo_entrega = prazo_entrega
+
+
 class IntegracaoController:
     """
     Controller para gerenciar integrações com serviços externos.
@@ -359,3 +598,220 @@ class IntegracaoController:
         sucesso, mensagem = self.gateway_pagamento.processar_pagamento(valor_total, dados_pagamento)
         
         return sucesso, mensagem, valor_frete, prazo_entrega
+    
+    async def processar_checkout_async(
+        self,
+        valor_produtos: float,
+        dados_pagamento: Dict[str, Any],
+        cep_destino: str,
+        peso_total_kg: float
+    ) -> tuple[bool, str, float, int]:
+        """
+        Versão assíncrona de processar_checkout.
+        
+        O cálculo do frete e a validação dos dados de pagamento não dependem um do
+        outro e rodam em paralelo; o pagamento, que precisa do valor do frete, vem
+        em seguida. Cada chamada respeita o timeout do respectivo provedor.
+        
+        Args:
+            valor_produtos: Valor total dos produtos.
+            dados_pagamento: Dados do pagamento.
+            cep_destino: CEP de entrega.
+            peso_total_kg: Peso total dos produtos.
+            
+        Returns:
+            Tupla (sucesso, mensagem, valor_frete, prazo_entrega).
+            
+        Raises:
+            PagamentoPendente: Se o gateway não respondeu dentro do timeout; o
+                resultado da cobrança fica em PagamentoPendente.pagamento.
+        """
+        frete, validacao = await asyncio.gather(
+            asyncio.wait_for(
+                self.calculadora_frete.calcular_frete_async(cep_destino, peso_total_kg, valor_produtos),
+                self.calculadora_frete.timeout
+            ),
+            asyncio.wait_for(
+                self.gateway_pagamento.validar_dados_pagamento_async(dados_pagamento),
+                self.gateway_pagamento.timeout
+            ),
+            return_exceptions=True
+        )
+        
+        if isinstance(frete, asyncio.TimeoutError):
+            return False, "Tempo esgotado no cálculo do frete", 0.0, 0
+        if isinstance(frete, Exception):
+            return False, f"Erro no cálculo do frete: {frete}", 0.0, 0
+        valor_frete, prazo_entrega = frete
+        
+        if isinstance(validacao, asyncio.TimeoutError):
+            return False, "Tempo esgotado no gateway de pagamento", valor_frete, prazo_entrega
+        if isinstance(validacao, Exception):
+            return False, f"Erro no gateway de pagamento: {validacao}", valor_frete, prazo_entrega
+        valido, mensagem = validacao
+        if not valido:
+            return False, mensagem, valor_frete, prazo_entrega
+        
+        # A cobrança síncrona roda em uma thread que não pode ser cancelada: um
+        # timeout aqui não significa que o pagamento falhou, então a tarefa é
+        # protegida (shield) e segue até o fim para ser conciliada.
+        pagamento = asyncio.ensure_future(
+            self.gateway_pagamento.processar_pagamento_async(valor_produtos + valor_frete, dados_pagamento)
+        )
+        try:
+            sucesso, mensagem = await asyncio.wait_for(asyncio.shield(pagamento), self.gateway_pagamento.timeout)
+        except asyncio.TimeoutError:
+            raise PagamentoPendente(pagamento, valor_frete, prazo_entrega)
+        
+        return sucesso, mensagem, valor_frete, prazo_entrega
+
+
+class CheckoutAssincrono:
+    """
+    Orquestrador de checkouts fora da thread da requisição.
+    
+    Os checkouts rodam em um loop asyncio próprio, em uma thread de fundo. Cada
+    checkout iniciado recebe um job id; o resultado fica disponível para consulta
+    (polling) por ttl_resultado segundos. Um job pode estar ligado a um pedido:
+    ao_concluir recebe o resultado final da cobrança para efetivar ou cancelar o
+    pedido, e roda em uma thread para não bloquear o loop com I/O de banco.
+    """
+    
+    def __init__(self, ttl_resultado: float = 3600.0, capacidade: int = 10000):
+        """
+        Inicializa o orquestrador e sua thread de eventos.
+        
+        Args:
+            ttl_resultado: Tempo em segundos que o estado de um job fica disponível.
+            capacidade: Número máximo de jobs guardados.
+        """
+        self._jobs = CacheLRU(capacidade=capacidade, ttl=ttl_resultado)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='checkout-async', daemon=True)
+        self._thread.start()
+    
+    def iniciar(self, integracao: IntegracaoController, valor_produtos: float,
+                dados_pagamento: Dict[str, Any], cep_destino: str, peso_total_kg: float,
+                dono: Optional[Hashable] = None, pedido_id: Optional[int] = None,
+                ao_concluir: Optional[Callable[[bool], None]] = None) -> str:
+        """
+        Agenda um checkout e retorna imediatamente.
+        
+        Args:
+            integracao: Controller com o gateway e a calculadora de frete.
+            valor_produtos: Valor total dos produtos.
+            dados_pagamento: Dados do pagamento.
+            cep_destino: CEP de entrega.
+            peso_total_kg: Peso total dos produtos.
+            dono: Quem pode consultar o job (ex.: ID do cliente).
+            pedido_id: Pedido cobrado pelo job, informado nas consultas.
+            ao_concluir: Chamada com True (cobrança aprovada) ou False (recusada ou
+                com erro) quando o resultado da cobrança é conhecido.
+                
+        Returns:
+            Job id para consulta em consultar().
+        """
+        job_id = uuid.uuid4().hex
+        self._jobs.guardar(job_id, (dono, {'status': 'processando', 'pedido_id': pedido_id}))
+        asyncio.run_coroutine_threadsafe(
+            self._executar(job_id, dono, pedido_id, ao_concluir, integracao.processar_checkout_async(
+                valor_produtos, dados_pagamento, cep_destino, peso_total_kg
+            )),
+            self._loop
+        )
+        return job_id
+    
+    async def _executar(self, job_id: str, dono: Optional[Hashable], pedido_id: Optional[int],
+                        ao_concluir: Optional[Callable[[bool], None]], checkout) -> None:
+        """
+        Executa um checkout e registra o resultado do job.
+        
+        Se o gateway estoura o timeout, o job passa a 'pendente' e é conciliado
+        com o resultado real da cobrança quando ela terminar; ao_concluir só é
+        chamada com o resultado definitivo, antes de o job deixar o estado atual.
+        
+        Args:
+            job_id: Identificador do job.
+            dono: Dono do job.
+            pedido_id: Pedido cobrado pelo job.
+            ao_concluir: Callback do resultado final (ver iniciar()).
+            checkout: Corrotina de processar_checkout_async.
+        """
+        try:
+            sucesso, mensagem, valor_frete, prazo_entrega = await checkout
+        except PagamentoPendente as pendente:
+            # Resultado desconhecido: o job fica pendente até a cobrança terminar
+            valor_frete, prazo_entrega = pendente.valor_frete, pendente.prazo_entrega
+            self._jobs.guardar(job_id, (dono, {
+                'status': 'pendente',
+                'mensagem': str(pendente),
+                'pedido_id': pedido_id,
+                'valor_frete': valor_frete,
+                'prazo_entrega': prazo_entrega,
+            }))
+            try:
+                sucesso, mensagem = await pendente.pagamento
+            except Exception as e:
+                await self._finalizar(job_id, dono, False, ao_concluir,
+                                      {'status': 'erro', 'mensagem': str(e), 'pedido_id': pedido_id})
+                return
+        except Exception as e:
+            await self._finalizar(job_id, dono, False, ao_concluir,
+                                  {'status': 'erro', 'mensagem': str(e), 'pedido_id': pedido_id})
+            return
+        
+        await self._finalizar(job_id, dono, sucesso, ao_concluir, {
+            'status': 'aprovado' if sucesso else 'recusado',
+            'mensagem': mensagem,
+            'pedido_id': pedido_id,
+            'valor_frete': valor_frete,
+            'prazo_entrega': prazo_entrega,
+        })
+    
+    async def _finalizar(self, job_id: str, dono: Optional[Hashable], aprovado: bool,
+                         ao_concluir: Optional[Callable[[bool], None]], estado: Dict[str, Any]) -> None:
+        """
+        Aplica o resultado final ao pedido (ao_concluir) e grava o estado do job.
+        
+        Args:
+            job_id: Identificador do job.
+            dono: Dono do job.
+            aprovado: Se a cobrança foi aprovada.
+            ao_concluir: Callback do resultado final, ou None.
+            estado: Estado final do job.
+        """
+        if ao_concluir is not None:
+            try:
+                await asyncio.to_thread(ao_concluir, aprovado)
+            except Exception as e:
+                estado['mensagem'] = f"{estado['mensagem']} (falha ao atualizar o pedido: {e})"
+        self._jobs.guardar(job_id, (dono, estado))
+    
+    def consultar(self, job_id: str, dono: Optional[Hashable] = None) -> Optional[Dict[str, Any]]:
+        """
+        Consulta o estado de um job.
+        
+        Args:
+            job_id: Identificador retornado por iniciar().
+            dono: Dono informado em iniciar().
+            
+        Returns:
+            Dicionário com 'status' (processando/pendente/aprovado/recusado/erro),
+            'pedido_id' e, ao final, mensagem, valor_frete e prazo_entrega; None se
+            o job não existe, expirou ou pertence a outro dono.
+        """
+        job = self._jobs.obter(job_id)
+        if job is None or job[0] != dono:
+            return None
+        return dict(job[1])
+    
+    def encerrar(self) -> None:
+        """
+        Para o loop de eventos e aguarda a thread terminar.
+        """
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+# Orquestrador compartilhado pelas requisições (um loop de eventos por processo).
+checkout_assincrono = CheckoutAssincrono()
@@ -2,13 +2,24 @@
 
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
+from cache import cache_paginas
+from controllers.integracao_controller import (FreteCotado, IntegracaoController, PagamentoCartao,
+                                                PagamentoPix, checkout_assincrono, cotacao_frete)
 from models.pedido import Pedido
 from models.item_pedido import ItemPedido
+from repositories.base_repository import BaseRepository
 from repositories.pedido_repository import PedidoRepository
 from repositories.produto_repository import ProdutoRepository
 from repositories.endereco_repository import EnderecoRepository
 
 
+# Peso estimado por unidade no cálculo do frete (simplificado).
+PESO_ESTIMADO_ITEM_KG = 0.5
+
+# Métodos com cobrança online (o boleto é pago fora da loja)
+GATEWAYS_PAGAMENTO = {'Cartão': PagamentoCartao, 'Pix': PagamentoPix}
+
+
 class PedidoController:
     """
     Controlador para gerenciamento de pedidos.
@@ -23,6 +34,7 @@ class PedidoController:
         """
         self.session = session
         self.pedido_repo = PedidoRepository(session)
+        self.item_repo = BaseRepository(ItemPedido, session)
         self.produto_repo = ProdutoRepository(session)
         self.endereco_repo = EnderecoRepository(session)
     
@@ -47,7 +59,7 @@ class PedidoController:
         if metodo_pagamento not in ['Cartão', 'Pix', 'Boleto']:
             return False, "Método de pagamento inválido", None
         
-        if tipo_frete not in ['Fixo', 'Correios', 'Expresso']:
+        if tipo_frete not in cotacao_frete.calculadoras:
             return False, "Tipo de frete inválido", None
         
         endereco = self.endereco_repo.get_by_id(endereco_id)
@@ -55,49 +67,46 @@ class PedidoController:
             return False, "Endereço inválido", None
         
         try:
-            self.session.begin_nested()
+            quantidades = {}
+            for item in itens_carrinho:
+                quantidades[item.produto_id] = quantidades.get(item.produto_id, 0) + item.quantidade
+            
+            # Preços, nomes e frete são resolvidos antes de qualquer escrita: a
+            # cotação pode esperar o timeout da transportadora e não deve rodar
+            # com o banco (SQLite) ou as linhas (PostgreSQL) travados.
+            produtos = self.produto_repo.get_many(quantidades)
+            if len(produtos) != len(quantidades):
+                return False, self._motivo_sem_estoque(itens_carrinho), None
             
             total = 0
             itens_pedido = []
             
             for item in itens_carrinho:
-                produto = self.produto_repo.get_by_id(item.produto_id)
-                
-                if not produto:
-                    self.session.rollback()
-                    return False, f"Produto {item.nome} não encontrado", None
-                
-                if produto.estoque < item.quantidade:
-                    self.session.rollback()
-                    return False, f"Estoque insuficiente para {produto.nome}", None
-                
-                produto.estoque -= item.quantidade
+                produto = produtos[item.produto_id]
                 
                 subtotal = produto.preco * item.quantidade
                 total += subtotal
                 
-                item_pedido = ItemPedido(
-                    produto_id=produto.id,
-                    produto_nome=produto.nome,
-                    quantidade=item.quantidade,
-                    preco_unitario=produto.preco,
-                    subtotal=subtotal
-                )
-                itens_pedido.append(item_pedido)
+                itens_pedido.append({
+                    'produto_id': produto.id,
+                    'produto_nome': produto.nome,
+                    'quantidade': item.quantidade,
+                    'preco_unitario': produto.preco,
+                    'subtotal': subtotal
+                })
             
             # Calcular frete
-            from controllers.integracao_controller import FreteFixo, FreteCorreios, FreteExpresso
-            
-            if tipo_frete == 'Fixo':
-                calculadora = FreteFixo()
-            elif tipo_frete == 'Correios':
-                calculadora = FreteCorreios()
-            else:  # Expresso
-                calculadora = FreteExpresso()
+            peso_total = sum(item.quantidade * PESO_ESTIMADO_ITEM_KG for item in itens_carrinho)
+            cotacao = cotacao_frete.cotar(endereco.cep, peso_total, total, tipos=[tipo_frete]).get(tipo_frete)
+            if cotacao is None:
+                return False, "Frete indisponível no momento, tente novamente", None
+            valor_frete, prazo_entrega = cotacao
             
-            # Peso estimado: 0.5kg por item (simplificado)
-            peso_total = sum(item.quantidade * 0.5 for item in itens_carrinho)
-            valor_frete, prazo_entrega = calculadora.calcular_frete(endereco.cep, peso_total, total)
+            # Baixa de estoque atômica: a partir daqui a transação de escrita fica
+            # aberta apenas pelos INSERTs do pedido e dos itens
+            if not self.produto_repo.decrement_stock(quantidades):
+                self.session.rollback()
+                return False, self._motivo_sem_estoque(itens_carrinho), None
             
             # Atualizar total com frete
             total_com_frete = total + valor_frete
@@ -117,20 +126,160 @@ class PedidoController:
                 prazo_entrega=prazo_entrega
             )
             
-            pedido = self.pedido_repo.create(pedido)
-            
-            for item in itens_pedido:
-                item.pedido_id = pedido.id
-                self.session.add(item)
-            
+            # Um INSERT do pedido e um INSERT em lote para todos os itens,
+            # independente do tamanho do carrinho, confirmados em um único commit
+            self.session.add(pedido)
+            self.session.flush()
+            for item_pedido in itens_pedido:
+                item_pedido['pedido_id'] = pedido.id
+            self.item_repo.create_many(itens_pedido, commit=False)
             self.session.commit()
             
-            return True, "Pedido criado com sucesso", pedido
+            # O estoque exibido nas páginas de detalhe mudou
+            cache_paginas.invalidar(*(f'produto:{produto_id}' for produto_id in quantidades))
             
+            return True, "Pedido criado com sucesso", pedido
+        
         except SQLAlchemyError as e:
             self.session.rollback()
             return False, f"Erro ao criar pedido: {str(e)}", None
     
+    def cotar_fretes(self, cliente_id: int, endereco_id: int, itens_carrinho: list) -> dict:
+        """
+        Cota todos os tipos de frete para um endereço do cliente.
+        
+        Args:
+            cliente_id: ID do cliente.
+            endereco_id: ID do endereço de entrega.
+            itens_carrinho: Lista de itens do carrinho.
+            
+        Returns:
+            Dicionário tipo de frete -> (valor_frete, prazo_dias); vazio se o
+            endereço não pertence ao cliente.
+        """
+        endereco = self.endereco_repo.get_by_id(endereco_id)
+        if not endereco or endereco.cliente_id != cliente_id:
+            return {}
+        
+        peso_total = sum(item.quantidade * PESO_ESTIMADO_ITEM_KG for item in itens_carrinho)
+        valor_produtos = sum(item.subtotal for item in itens_carrinho)
+        return cotacao_frete.cotar(endereco.cep, peso_total, valor_produtos)
+    
+    def iniciar_pagamento(self, cliente_id: int, itens_carrinho: list, endereco_id: int,
+                          metodo_pagamento: str, tipo_frete: str,
+                          dados_pagamento: dict) -> tuple[bool, str, Pedido, str]:
+        """
+        Cria o pedido e inicia a cobrança dele fora da requisição.
+        
+        O pedido é criado por criar_pedido em 'Pendente', com o estoque já
+        baixado; a cobrança é do total do pedido (produtos + frete cotado). Com
+        a cobrança aprovada o pedido passa a 'Processando'; recusada ou com erro,
+        o pedido é cancelado e o estoque devolvido. Se o gateway estoura o
+        timeout, o pedido continua 'Pendente' até a cobrança ser conciliada. O
+        andamento é consultado por consultar_pagamento com o job id retornado.
+        
+        Args:
+            cliente_id: ID do cliente.
+            itens_carrinho: Lista de itens do carrinho.
+            endereco_id: ID do endereço de entrega.
+            metodo_pagamento: Método de pagamento com cobrança online (Cartão/Pix).
+            tipo_frete: Tipo de frete (Fixo/Correios/Expresso).
+            dados_pagamento: Dados do pagamento exigidos pelo gateway.
+            
+        Returns:
+            Tupla (sucesso, mensagem, pedido, job_id).
+        """
+        if metodo_pagamento not in GATEWAYS_PAGAMENTO:
+            return False, "Método de pagamento sem cobrança online", None, None
+        
+        # Dados inválidos são recusados antes de reservar estoque
+        gateway = GATEWAYS_PAGAMENTO[metodo_pagamento]()
+        valido, mensagem = gateway.validar_dados_pagamento(dados_pagamento)
+        if not valido:
+            return False, mensagem, None, None
+        
+        sucesso, mensagem, pedido = self.criar_pedido(cliente_id, itens_carrinho, endereco_id,
+                                                      metodo_pagamento, tipo_frete)
+        if not sucesso:
+            return False, mensagem, None, None
+        
+        endereco = self.endereco_repo.get_by_id(endereco_id)
+        peso_total = sum(item.quantidade * PESO_ESTIMADO_ITEM_KG for item in itens_carrinho)
+        integracao = IntegracaoController(gateway, FreteCotado(pedido.valor_frete, pedido.prazo_entrega))
+        
+        job_id = checkout_assincrono.iniciar(
+            integracao, pedido.total - pedido.valor_frete, dados_pagamento, endereco.cep, peso_total,
+            dono=cliente_id, pedido_id=pedido.id, ao_concluir=self._concluir_pagamento(pedido.id)
+        )
+        return True, "Pagamento em processamento", pedido, job_id
+    
+    def _concluir_pagamento(self, pedido_id: int):
+        """
+        Monta o callback que aplica o resultado da cobrança ao pedido.
+        
+        O callback roda fora da requisição, com uma sessão própria no primário
+        (a sessão da requisição já terá sido fechada).
+        
+        Args:
+            pedido_id: ID do pedido cobrado.
+            
+        Returns:
+            Função que recebe True (aprovado) ou False (recusado/erro).
+        """
+        engine = self.session.get_bind()
+        
+        def concluir(aprovado: bool) -> None:
+            with Session(engine) as session:
+                pedido_repo = PedidoRepository(session)
+                if aprovado:
+                    pedido_repo.transition_status(pedido_id, 'Pendente', 'Processando')
+                    session.commit()
+                    return
+                
+                if not pedido_repo.transition_status(pedido_id, 'Pendente', 'Cancelado'):
+                    return
+                quantidades = {}
+                for item in session.query(ItemPedido).filter(ItemPedido.pedido_id == pedido_id):
+                    quantidades[item.produto_id] = quantidades.get(item.produto_id, 0) + item.quantidade
+                ProdutoRepository(session).increment_stock(quantidades)
+                session.commit()
+            
+            cache_paginas.invalidar(*(f'produto:{produto_id}' for produto_id in quantidades))
+        
+        return concluir
+    
+    def consultar_pagamento(self, cliente_id: int, job_id: str):
+        """
+        Consulta o andamento de um pagamento iniciado por iniciar_pagamento.
+        
+        Args:
+            cliente_id: ID do cliente que iniciou o pagamento.
+            job_id: Job id retornado por iniciar_pagamento.
+            
+        Returns:
+            Dicionário com o estado do job, ou None se não existe ou é de outro cliente.
+        """
+        return checkout_assincrono.consultar(job_id, dono=cliente_id)
+    
+    def _motivo_sem_estoque(self, itens_carrinho: list) -> str:
+        """
+        Identifica o item do carrinho que impediu a baixa de estoque.
+        
+        Args:
+            itens_carrinho: Lista de itens do carrinho.
+            
+        Returns:
+            Mensagem de erro para o cliente.
+        """
+        produtos = self.produto_repo.get_many(item.produto_id for item in itens_carrinho)
+        for item in itens_carrinho:
+            produto = produtos.get(item.produto_id)
+            if not produto:
+                return f"Produto {item.nome} não encontrado"
+            if produto.estoque < item.quantidade:
+                return f"Estoque insuficiente para {produto.nome}"
+        return "Estoque insuficiente"
+    
     def listar_pedidos_cliente(self, cliente_id: int):
         """
         Lista todos os pedidos de um cliente.
@@ -160,6 +309,29 @@ class PedidoController:
         total_pages = (total + per_page - 1) // per_page
         return pedidos, total, total_pages
     
+    def listar_pedidos_apos(self, after: str = None, status: str = None, per_page: int = 50):
+        """
+        Lista pedidos com paginação por cursor (admin), opcionalmente por status.
+        
+        Args:
+            after: Cursor da página anterior ou None para a primeira página.
+            status: Status do pedido (opcional).
+            per_page: Itens por página.
+            
+        Returns:
+            Tupla (pedidos, total, páginas, cursor da próxima página).
+            
+        Raises:
+            ValueError: Se o cursor for inválido.
+        """
+        pedidos, proximo_cursor = self.pedido_repo.get_page_after(after, limit=per_page, status=status)
+        if status:
+            total = self.pedido_repo.count_by_status(status)
+        else:
+            total = self.pedido_repo.count_all()
+        total_pages = (total + per_page - 1) // per_page
+        return pedidos, total, total_pages, proximo_cursor
+    
     def filtrar_por_status(self, status: str, page: int = 1, per_page: int = 50):
         """
         Filtra pedidos por status (admin).
@@ -3,8 +3,10 @@
 import os
 from werkzeug.utils import secure_filename
 from sqlalchemy.orm import Session
+from cache import cache_paginas
 from models.produto import Produto
 from models.imagem_produto import ImagemProduto
+from repositories.base_repository import BaseRepository
 from repositories.produto_repository import ProdutoRepository
 from repositories.categoria_repository import CategoriaRepository
 
@@ -28,6 +30,7 @@ class ProdutoController:
         """
         self.session = session
         self.produto_repo = ProdutoRepository(session)
+        self.imagem_repo = BaseRepository(ImagemProduto, session)
         self.categoria_repo = CategoriaRepository(session)
         self.upload_folder = upload_folder
     
@@ -43,6 +46,19 @@ class ProdutoController:
         """
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in self.ALLOWED_EXTENSIONS
     
+    def _invalidar_paginas(self, produto_id: int = None, categoria_ids: tuple = ()) -> None:
+        """
+        Invalida os fragmentos de página em cache afetados por um produto.
+        
+        Args:
+            produto_id: ID do produto alterado (página de detalhe).
+            categoria_ids: Categorias cujas listagens devem ser invalidadas.
+        """
+        tags = ['catalogo'] + [f'categoria:{categoria_id}' for categoria_id in categoria_ids]
+        if produto_id is not None:
+            tags.append(f'produto:{produto_id}')
+        cache_paginas.invalidar(*tags)
+    
     def criar_produto(self, nome: str, sku: str, descricao: str, preco: float,
                      estoque: int, categoria_id: int, imagens: list = None) -> tuple[bool, str, Produto]:
         """
@@ -90,6 +106,7 @@ class ProdutoController:
         if imagens:
             self._salvar_imagens(produto, imagens)
         
+        self._invalidar_paginas(produto.id, (categoria_id,))
         return True, "Produto criado com sucesso", produto
     
     def _salvar_imagens(self, produto: Produto, imagens: list) -> None:
@@ -100,6 +117,7 @@ class ProdutoController:
             produto: Produto.
             imagens: Lista de arquivos de imagem.
         """
+        registros = []
         for i, imagem in enumerate(imagens[:self.MAX_IMAGES]):
             if imagem and self.validar_extensao(imagem.filename):
                 filename = secure_filename(f"{produto.sku}_{i}_{imagem.filename}")
@@ -109,14 +127,9 @@ class ProdutoController:
                 # Salvar apenas o caminho relativo (uploads/filename)
                 caminho_relativo = f"uploads/{filename}"
                 
-                img_produto = ImagemProduto(
-                    produto_id=produto.id,
-                    caminho=caminho_relativo,
-                    ordem=i
-                )
-                self.session.add(img_produto)
+                registros.append({'produto_id': produto.id, 'caminho': caminho_relativo, 'ordem': i})
         
-        self.session.commit()
+        self.imagem_repo.create_many(registros)
     
     def atualizar_produto(self, produto_id: int, nome: str, descricao: str, preco: float,
                          estoque: int, categoria_id: int, novas_imagens: list = None) -> tuple[bool, str]:
@@ -152,6 +165,7 @@ class ProdutoController:
         if not categoria:
             return False, "Categoria não encontrada"
         
+        categoria_anterior = produto.categoria_id
         produto.nome = nome
         produto.descricao = descricao
         produto.preco = preco
@@ -164,6 +178,7 @@ class ProdutoController:
         if novas_imagens:
             self._adicionar_imagens(produto, novas_imagens)
         
+        self._invalidar_paginas(produto_id, (categoria_anterior, categoria_id))
         return True, "Produto atualizado com sucesso"
     
     def remover_produto(self, produto_id: int) -> tuple[bool, str]:
@@ -180,27 +195,50 @@ class ProdutoController:
         if not produto:
             return False, "Produto não encontrado"
         
+        categoria_id = produto.categoria_id
         self.produto_repo.delete(produto)
+        self._invalidar_paginas(produto_id, (categoria_id,))
         return True, "Produto removido com sucesso"
     
-    def listar_produtos(self, page: int = 1, per_page: int = 12):
+    def listar_produtos(self, page: int = 1, per_page: int = 12, load: str = None):
         """
         Lista produtos com paginação.
         
         Args:
             page: Número da página.
             per_page: Itens por página.
+            load: Perfil de carregamento dos relacionamentos (opcional).
             
         Returns:
             Tupla (produtos, total, páginas).
         """
         offset = (page - 1) * per_page
-        produtos = self.produto_repo.get_paginated(limit=per_page, offset=offset)
+        produtos = self.produto_repo.get_paginated(limit=per_page, offset=offset, load=load)
         total = self.produto_repo.count_all()
         total_pages = (total + per_page - 1) // per_page
         return produtos, total, total_pages
     
-    def listar_por_categoria(self, categoria_id: int, page: int = 1, per_page: int = 12):
+    def listar_produtos_apos(self, after: str = None, per_page: int = 12, load: str = None):
+        """
+        Lista produtos com paginação por cursor (custo constante em qualquer página).
+        
+        Args:
+            after: Cursor da página anterior ou None para a primeira página.
+            per_page: Itens por página.
+            load: Perfil de carregamento dos relacionamentos (opcional).
+            
+        Returns:
+            Tupla (produtos, total, páginas, cursor da próxima página).
+            
+        Raises:
+            ValueError: Se o cursor for inválido.
+        """
+        produtos, proximo_cursor = self.produto_repo.get_page_after(after, limit=per_page, load=load)
+        total = self.produto_repo.count_all()
+        total_pages = (total + per_page - 1) // per_page
+        return produtos, total, total_pages, proximo_cursor
+    
+    def listar_por_categoria(self, categoria_id: int, page: int = 1, per_page: int = 12, load: str = None):
         """
         Lista produtos por categoria com paginação.
         
@@ -208,17 +246,18 @@ class ProdutoController:
             categoria_id: ID da categoria.
             page: Número da página.
             per_page: Itens por página.
+            load: Perfil de carregamento dos relacionamentos (opcional).
             
         Returns:
             Tupla (produtos, total, páginas).
         """
         offset = (page - 1) * per_page
-        produtos = self.produto_repo.get_by_categoria(categoria_id, limit=per_page, offset=offset)
+        produtos = self.produto_repo.get_by_categoria(categoria_id, limit=per_page, offset=offset, load=load)
         total = self.produto_repo.count_by_categoria(categoria_id)
         total_pages = (total + per_page - 1) // per_page
         return produtos, total, total_pages
     
-    def buscar_produtos(self, query: str, page: int = 1, per_page: int = 12):
+    def buscar_produtos(self, query: str, page: int = 1, per_page: int = 12, load: str = None):
         """
         Busca produtos por texto.
         
@@ -226,14 +265,19 @@ class ProdutoController:
             query: Texto de busca.
             page: Número da página.
             per_page: Itens por página.
+            load: Perfil de carregamento dos relacionamentos (opcional).
             
         Returns:
-            Lista de produtos.
+            Tupla (produtos, total, páginas).
         """
         offset = (page - 1) * per_page
-        return self.produto_repo.search(query, limit=per_page, offset=offset)
+        produtos = self.produto_repo.search(query, limit=per_page, offset=offset, load=load)
+        total = self.produto_repo.count_search(query)
+        total_pages = (total + per_page - 1) // per_page
+        return produtos, total, total_pages
     
-    def filtrar_por_preco(self, min_price: float, max_price: float, page: int = 1, per_page: int = 12):
+    def filtrar_por_preco(self, min_price: float, max_price: float, page: int = 1, per_page: int = 12,
+                          load: str = None):
         """
         Filtra produtos por faixa de preço.
         
@@ -242,15 +286,17 @@ class ProdutoController:
             max_price: Preço máximo.
             page: Número da página.
             per_page: Itens por página.
+            load: Perfil de carregamento dos relacionamentos (opcional).
             
         Returns:
             Lista de produtos.
         """
         offset = (page - 1) * per_page
-        return self.produto_repo.filter_by_price_range(min_price, max_price, limit=per_page, offset=offset)
+        return self.produto_repo.filter_by_price_range(min_price, max_price, limit=per_page, offset=offset,
+                                                   load=load)
     
     def filtrar_por_categoria_e_preco(self, categoria_id: int, min_price: float, max_price: float, 
-                                      page: int = 1, per_page: int = 12):
+                                      page: int = 1, per_page: int = 12, load: str = None):
         """
         Filtra produtos por categoria E faixa de preço simultaneamente.
         
@@ -260,13 +306,14 @@ class ProdutoController:
             max_price: Preço máximo.
             page: Número da página.
             per_page: Itens por página.
+            load: Perfil de carregamento dos relacionamentos (opcional).
             
         Returns:
             Lista de produtos.
         """
         offset = (page - 1) * per_page
         return self.produto_repo.filter_by_categoria_and_price(
-            categoria_id, min_price, max_price, limit=per_page, offset=offset
+            categoria_id, min_price, max_price, limit=per_page, offset=offset, load=load
         )
     
     def _adicionar_imagens(self, produto: Produto, imagens: list) -> None:
@@ -287,6 +334,7 @@ class ProdutoController:
             return  # Já tem 5 imagens
         
         # Adicionar novas imagens
+        registros = []
         for i, imagem in enumerate(imagens[:espaco_disponivel]):
             if imagem and self.validar_extensao(imagem.filename):
                 ordem = imagens_existentes + i
@@ -296,14 +344,9 @@ class ProdutoController:
                 
                 caminho_relativo = f"uploads/{filename}"
                 
-                img_produto = ImagemProduto(
-                    produto_id=produto.id,
-                    caminho=caminho_relativo,
-                    ordem=ordem
-                )
-                self.session.add(img_produto)
+                registros.append({'produto_id': produto.id, 'caminho': caminho_relativo, 'ordem': ordem})
         
-        self.session.commit()
+        self.imagem_repo.create_many(registros)
     
     def remover_imagem(self, imagem_id: int) -> tuple[bool, str]:
         """
@@ -331,7 +374,9 @@ class ProdutoController:
             print(f"Erro ao remover arquivo: {e}")
         
         # Remover do banco
+        produto = imagem.produto
         self.session.delete(imagem)
         self.session.commit()
+        self._invalidar_paginas(produto.id, (produto.categoria_id,))
         
         return True, "Imagem removida com sucesso"
@@ -1,30 +1,250 @@
 """Configuração do banco de dados SQLAlchemy."""
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+import itertools
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session, sessionmaker, scoped_session
 from models.base import Base
 
+# Índice de busca textual (FTS5) espelhando produtos(nome, descricao, sku).
+# Tabela de conteúdo externo: o texto fica apenas em produtos e os gatilhos
+# mantêm o índice sincronizado, inclusive em bulk_insert_mappings.
+PRODUTOS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS produtos_fts USING fts5(
+        nome, descricao, sku,
+        content='produtos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS produtos_fts_ai AFTER INSERT ON produtos BEGIN
+        INSERT INTO produtos_fts(rowid, nome, descricao, sku)
+        VALUES (new.id, new.nome, new.descricao, new.sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS produtos_fts_ad AFTER DELETE ON produtos BEGIN
+        INSERT INTO produtos_fts(produtos_fts, rowid, nome, descricao, sku)
+        VALUES ('delete', old.id, old.nome, old.descricao, old.sku);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS produtos_fts_au AFTER UPDATE OF nome, descricao, sku ON produtos BEGIN
+        INSERT INTO produtos_fts(produtos_fts, rowid, nome, descricao, sku)
+        VALUES ('delete', old.id, old.nome, old.descricao, old.sku);
+        INSERT INTO produtos_fts(rowid, nome, descricao, sku)
+        VALUES (new.id, new.nome, new.descricao, new.sku);
+    END
+    """,
+]
+
+# Perfis de engine: parâmetros de create_engine e PRAGMAs aplicados a cada conexão SQLite.
+# 'padrao' mantém a configuração original; os perfis '-prod' dimensionam o pool.
+PERFIS_ENGINE = {
+    'padrao': {
+        'engine': {'pool_pre_ping': True, 'pool_recycle': 3600},
+        'pragmas': {},
+    },
+    'sqlite-prod': {
+        # Arquivo local: pre_ping é um round trip inútil a cada checkout
+        'engine': {'pool_size': 10, 'max_overflow': 20, 'pool_timeout': 30},
+        'pragmas': {
+            'journal_mode': 'WAL',          # leitores não bloqueiam o escritor
+            'synchronous': 'NORMAL',        # seguro com WAL, sem fsync a cada commit
+            'busy_timeout': 5000,           # espera o lock (ms) em vez de falhar com "database is locked"
+            'cache_size': -64000,           # 64 MB de cache de páginas por conexão
+            'mmap_size': 268435456,         # 256 MB de leitura via mmap
+            'temp_store': 'MEMORY',
+        },
+    },
+    'postgres-prod': {
+        'engine': {
+            'pool_size': 20,
+            'max_overflow': 10,
+            'pool_timeout': 30,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+            'pool_use_lifo': True,          # conexões ociosas excedentes expiram pelo pool_recycle
+        },
+        'pragmas': {},
+    },
+}
+
+# Opção de execução que marca uma consulta como leitura roteável a uma réplica
+# (ver BaseRepository._leitura).
+OPCAO_REPLICA = 'replica'
+
+
+class SessaoRoteada(Session):
+    """
+    Sessão que envia as consultas marcadas com OPCAO_REPLICA às réplicas de
+    leitura, em rodízio; todo o resto (escritas, flush, leituras não marcadas
+    como as do checkout) usa o banco primário.
+    """
+    
+    def __init__(self, *args, replicas=None, **kwargs):
+        """
+        Inicializa a sessão.
+        
+        Args:
+            replicas: Iterador infinito (itertools.cycle) de engines de réplica, ou None
+        """
+        super().__init__(*args, **kwargs)
+        self._replicas = replicas
+    
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        """
+        Escolhe o engine de cada instrução.
+        
+        Returns:
+            Engine de réplica para leituras marcadas, senão o primário
+        """
+        if (self._replicas is not None and clause is not None and not self._flushing
+                and clause.get_execution_options().get(OPCAO_REPLICA)):
+            return next(self._replicas)
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
 class Database:
     """Classe para gerenciar a conexão com o banco de dados."""
     
-    def __init__(self, db_url='sqlite:///scee_loja.db'):
+    def __init__(self, db_url='sqlite:///scee_loja.db', perfil='padrao', replicas=()):
         """
         Inicializa a conexão com o banco de dados.
         
+        Args:
+            db_url: URL de conexão do banco de dados (primário)
+            perfil: Nome do perfil de engine (chave de PERFIS_ENGINE)
+            replicas: URLs das réplicas de leitura (opcional)
+            
+        Raises:
+            ValueError: Se o perfil não existir.
+        """
+        if perfil not in PERFIS_ENGINE:
+            raise ValueError(f"Perfil de banco desconhecido: {perfil}")
+        
+        self.perfil = perfil
+        self._conexoes_abertas = 0
+        self._checkouts = 0
+        self.engine = self._criar_engine(db_url, PERFIS_ENGINE[perfil])
+        self.replicas = [self._criar_engine(url, PERFIS_ENGINE[perfil]) for url in replicas]
+        
+        self.Session = scoped_session(sessionmaker(
+            bind=self.engine,
+            class_=SessaoRoteada,
+            replicas=itertools.cycle(self.replicas) if self.replicas else None
+        ))
+    
+    def _criar_engine(self, db_url, config):
+        """
+        Cria um engine com a configuração do perfil e os listeners de estatísticas.
+        
         Args:
             db_url: URL de conexão do banco de dados
+            config: Entrada de PERFIS_ENGINE
+            
+        Returns:
+            Engine do SQLAlchemy
         """
-        self.engine = create_engine(
-            db_url,
-            echo=False,
-            pool_pre_ping=True,
-            pool_recycle=3600
-        )
-        self.Session = scoped_session(sessionmaker(bind=self.engine))
+        engine = create_engine(db_url, echo=False, **config['engine'])
+        event.listen(engine, 'checkout', self._ao_checkout)
+        
+        if config['pragmas'] and engine.dialect.name == 'sqlite':
+            event.listen(engine, 'connect', self._aplicar_pragmas(config['pragmas']))
+        event.listen(engine, 'connect', self._ao_conectar)
+        return engine
+    
+    @staticmethod
+    def _aplicar_pragmas(pragmas):
+        """
+        Cria o listener que aplica os PRAGMAs a cada nova conexão SQLite.
+        
+        Args:
+            pragmas: Dicionário {pragma: valor}
+            
+        Returns:
+            Função para o evento 'connect'
+        """
+        def aplicar(dbapi_conn, connection_record):
+            cursor = dbapi_conn.cursor()
+            for pragma, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={valor}")
+            cursor.close()
+        return aplicar
+    
+    def _ao_conectar(self, dbapi_conn, connection_record):
+        """Conta as conexões abertas pelo pool."""
+        self._conexoes_abertas += 1
+    
+    def _ao_checkout(self, dbapi_conn, connection_record, connection_proxy):
+        """Conta as retiradas de conexão do pool."""
+        self._checkouts += 1
+    
+    def estatisticas_pool(self):
+        """
+        Retorna o estado dos pools de conexões.
+        
+        Returns:
+            dict: Perfil, contadores de conexões abertas e checkouts (todos os
+            engines) e o estado do pool do primário e de cada réplica
+        """
+        estatisticas = {
+            'perfil': self.perfil,
+            'conexoes_abertas': self._conexoes_abertas,
+            'checkouts': self._checkouts,
+        }
+        estatisticas.update(self._estado_pool(self.engine.pool))
+        if self.replicas:
+            estatisticas['replicas'] = [self._estado_pool(engine.pool) for engine in self.replicas]
+        return estatisticas
+    
+    @staticmethod
+    def _estado_pool(pool):
+        """
+        Lê o estado de um pool de conexões.
+        
+        Args:
+            pool: Pool do engine
+            
+        Returns:
+            dict: Classe do pool e, se for um QueuePool, tamanho, conexões em uso/livres e overflow
+        """
+        estado = {'pool': type(pool).__name__}
+        if hasattr(pool, 'checkedout'):
+            estado.update({
+                'tamanho': pool.size(),
+                'em_uso': pool.checkedout(),
+                'livres': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+            })
+        return estado
     
     def create_tables(self):
-        """Cria todas as tabelas no banco de dados."""
+        """Cria todas as tabelas e os índices que ainda não existem no banco de dados."""
         Base.metadata.create_all(self.engine)
+        
+        # create_all não adiciona índices novos a tabelas já existentes
+        for tabela in Base.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                indice.create(self.engine, checkfirst=True)
+        
+        if self.engine.dialect.name == 'sqlite':
+            self._criar_busca_textual()
+    
+    def _criar_busca_textual(self):
+        """Cria o índice FTS5 de produtos e o popula quando ainda não existia."""
+        with self.engine.begin() as conn:
+            existia = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'produtos_fts'"
+            )).first() is not None
+            
+            for ddl in PRODUTOS_FTS_DDL:
+                conn.execute(text(ddl))
+            
+            if not existia:
+                conn.execute(text("INSERT INTO produtos_fts(produtos_fts) VALUES ('rebuild')"))
     
     def get_session(self):
         """
@@ -36,5 +256,24 @@ class Database:
         return self.Session()
     
     def close_session(self):
-        """Fecha a sessão atual."""
+        """Fecha a sessão atual e devolve sua conexão ao pool."""
         self.Session.remove()
+    
+    @contextmanager
+    def sessao(self):
+        """
+        Fornece a sessão atual dentro de um bloco with, garantindo o fechamento.
+        
+        Em caso de exceção a transação é desfeita antes de propagar o erro.
+        
+        Yields:
+            Session: Sessão do SQLAlchemy
+        """
+        session = self.get_session()
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self.close_session()
@@ -1,53 +1,208 @@
-"""Script para inicializar o banco de dados com dados de exemplo."""
+"""Script para inicializar o banco de dados com dados de exemplo.
 
+Uso:
+    python init_db.py                    # cria tabelas, categorias e admin padrão
+    python init_db.py auditar-indices    # EXPLAIN QUERY PLAN das consultas dos repositórios
+    python init_db.py calibrar-argon2    # parâmetros Argon2 para a latência alvo nesta máquina
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy import event
 from database import Database
 from models.categoria import Categoria
 from models.admin import Admin
-from argon2 import PasswordHasher
+from models.base import Base
+from repositories.admin_repository import AdminRepository
+from repositories.categoria_repository import CategoriaRepository
+from repositories.cliente_repository import ClienteRepository
+from repositories.endereco_repository import EnderecoRepository
+from repositories.pedido_repository import PedidoRepository
+from repositories.produto_repository import ProdutoRepository
+from senhas import calibrar_argon2, criar_hasher, parametros_argon2
+
+# Consultas dos repositórios verificadas por auditar_indices (nome, chamada).
+# get_all/count_all ficam de fora: percorrem a tabela inteira por definição.
+CONSULTAS_AUDITADAS = [
+    ('AdminRepository.get_by_email', lambda s: AdminRepository(s).get_by_email('admin@scee.com')),
+    ('CategoriaRepository.get_by_nome', lambda s: CategoriaRepository(s).get_by_nome('Notebooks')),
+    ('ClienteRepository.get_by_email', lambda s: ClienteRepository(s).get_by_email('cliente@scee.com')),
+    ('ClienteRepository.get_by_cpf', lambda s: ClienteRepository(s).get_by_cpf('00000000000')),
+    ('ClienteRepository.email_cpf_exists',
+     lambda s: ClienteRepository(s).email_cpf_exists('cliente@scee.com', '00000000000')),
+    ('EnderecoRepository.get_by_cliente', lambda s: EnderecoRepository(s).get_by_cliente(1)),
+    ('ProdutoRepository.get_by_sku', lambda s: ProdutoRepository(s).get_by_sku('SKU')),
+    ('ProdutoRepository.sku_exists', lambda s: ProdutoRepository(s).sku_exists('SKU')),
+    ('ProdutoRepository.get_ids_by_skus', lambda s: ProdutoRepository(s).get_ids_by_skus(['A', 'B'])),
+    ('ProdutoRepository.get_by_categoria', lambda s: ProdutoRepository(s).get_by_categoria(1)),
+    ('ProdutoRepository.count_by_categoria', lambda s: ProdutoRepository(s).count_by_categoria(1)),
+    ('ProdutoRepository.search', lambda s: ProdutoRepository(s).search('notebook')),
+    ('ProdutoRepository.count_search', lambda s: ProdutoRepository(s).count_search('notebook')),
+    ('ProdutoRepository.filter_by_price_range', lambda s: ProdutoRepository(s).filter_by_price_range(10, 100)),
+    ('ProdutoRepository.filter_by_categoria_and_price',
+     lambda s: ProdutoRepository(s).filter_by_categoria_and_price(1, 10, 100)),
+    ('ProdutoRepository.get_paginated', lambda s: ProdutoRepository(s).get_paginated(offset=12)),
+    ('ProdutoRepository.get_page_after',
+     lambda s: ProdutoRepository(s).get_page_after(ProdutoRepository.encode_cursor(12))),
+    ('PedidoRepository.get_by_cliente', lambda s: PedidoRepository(s).get_by_cliente(1)),
+    ('PedidoRepository.get_by_status', lambda s: PedidoRepository(s).get_by_status('Pendente')),
+    ('PedidoRepository.count_by_status', lambda s: PedidoRepository(s).count_by_status('Pendente')),
+    ('PedidoRepository.get_paginated', lambda s: PedidoRepository(s).get_paginated(offset=50)),
+    ('PedidoRepository.get_page_after',
+     lambda s: PedidoRepository(s).get_page_after(
+         PedidoRepository.encode_cursor(datetime(2024, 1, 1).isoformat(), 1), status='Pendente')),
+    ('PedidoRepository.get_export_rows',
+     lambda s: list(PedidoRepository(s).get_export_rows(datetime(2024, 1, 1), datetime(2024, 12, 31)))),
+]
 
-def init_database():
+# Varreduras aceitas por auditar_indices (nome -> motivo): são impressas, mas não contam
+# como problema. A paginação por OFFSET percorre em ordem de id as linhas puladas; o
+# caminho sem varredura é a paginação por cursor (get_page_after).
+VARREDURAS_ESPERADAS = {
+    'ProdutoRepository.get_paginated': 'OFFSET percorre as linhas puladas (use get_page_after)',
+}
+
+def init_database(db_url: str = 'sqlite:///scee_loja.db'):
     """
     Inicializa o banco de dados com categorias e admin padrão.
+    
+    Args:
+        db_url: URL de conexão do banco de dados.
     """
-    db = Database()
+    db = Database(db_url)
     db.create_tables()
     
-    session = db.get_session()
-    ph = PasswordHasher()
-    
-    # Criar categorias padrão
-    categorias = [
-        'Smartphones',
-        'Notebooks',
-        'Tablets',
-        'Acessórios',
-        'Áudio',
-        'Câmeras',
-        'Games',
-        'Smart Home'
-    ]
-    
-    for nome_categoria in categorias:
-        if not session.query(Categoria).filter(Categoria.nome == nome_categoria).first():
-            categoria = Categoria(nome=nome_categoria)
-            session.add(categoria)
-    
-    # Criar admin padrão
-    if not session.query(Admin).filter(Admin.email == 'admin@scee.com').first():
-        admin = Admin(
-            nome='Administrador',
-            email='admin@scee.com',
-            senha_hash=ph.hash('Admin@123')
-        )
-        session.add(admin)
-    
-    session.commit()
+    ph = criar_hasher()
+    
+    with db.sessao() as session:
+        # Criar categorias padrão
+        categorias = [
+            'Smartphones',
+            'Notebooks',
+            'Tablets',
+            'Acessórios',
+            'Áudio',
+            'Câmeras',
+            'Games',
+            'Smart Home'
+        ]
+        
+        for nome_categoria in categorias:
+            if not session.query(Categoria).filter(Categoria.nome == nome_categoria).first():
+                categoria = Categoria(nome=nome_categoria)
+                session.add(categoria)
+        
+        # Criar admin padrão
+        if not session.query(Admin).filter(Admin.email == 'admin@scee.com').first():
+            admin = Admin(
+                nome='Administrador',
+                email='admin@scee.com',
+                senha_hash=ph.hash('Admin@123')
+            )
+            session.add(admin)
+        
+        session.commit()
+    
     print("Banco de dados inicializado com sucesso!")
     print("\nCredenciais do Admin:")
     print("E-mail: admin@scee.com")
     print("Senha: Admin@123")
+
+
+def auditar_indices(db_url: str = 'sqlite:///scee_loja.db') -> int:
+    """
+    Executa EXPLAIN QUERY PLAN para cada consulta dos repositórios e aponta
+    varreduras completas de tabela (SCAN sem índice).
+    
+    As consultas em VARREDURAS_ESPERADAS são exibidas como esperadas e não
+    contam no total, de modo que o retorno pode barrar um pipeline de CI.
+    
+    Args:
+        db_url: URL de conexão do banco de dados (SQLite).
+        
+    Returns:
+        Quantidade de consultas com varredura completa não esperada.
+    """
+    db = Database(db_url)
+    db.create_tables()
+    session = db.get_session()
+    
+    # Apenas tabelas do modelo contam; subconsultas materializadas e o índice FTS não.
+    tabelas = [['SCAN', tabela.name] for tabela in Base.metadata.sorted_tables]
+    capturadas = []
+    
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        capturadas.append((statement, parameters))
     
+    problemas = 0
+    for nome, consulta in CONSULTAS_AUDITADAS:
+        capturadas.clear()
+        event.listen(db.engine, 'before_cursor_execute', capturar)
+        try:
+            consulta(session)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capturar)
+        
+        for statement, parameters in capturadas:
+            plano = session.connection().exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", parameters
+            ).all()
+            detalhes = [linha[-1] for linha in plano]
+            varreduras = [d for d in detalhes
+                          if d.split(' ')[:2] in tabelas and ' USING ' not in d]
+            
+            esperada = VARREDURAS_ESPERADAS.get(nome)
+            if not varreduras:
+                print(f"[OK] {nome}")
+            elif esperada:
+                print(f"[VARREDURA ESPERADA] {nome}: {esperada}")
+            else:
+                print(f"[VARREDURA COMPLETA] {nome}")
+                problemas += 1
+            for detalhe in detalhes:
+                print(f"    {detalhe}")
+    
+    session.rollback()
     db.close_session()
+    
+    print(f"\n{problemas} consulta(s) com varredura completa de tabela")
+    return problemas
+
+
+def calibrar(alvo_ms: float, memory_cost: int = None, parallelism: int = None) -> None:
+    """
+    Mede o Argon2 nesta máquina e imprime os parâmetros para a latência alvo.
+    
+    Args:
+        alvo_ms: Latência alvo de uma verificação, em milissegundos.
+        memory_cost: Memória em KiB (padrão: a atual da aplicação).
+        parallelism: Threads do Argon2 (padrão: o atual da aplicação).
+    """
+    print(f"Parâmetros atuais: {parametros_argon2()}")
+    parametros, medido = calibrar_argon2(alvo_ms, memory_cost, parallelism)
+    print(f"Verificação com {parametros}: {medido} ms (alvo {alvo_ms:g} ms)")
+    print("\nDefina no ambiente da aplicação:")
+    print(f"SCEE_ARGON2_TIME_COST={parametros['time_cost']}")
+    print(f"SCEE_ARGON2_MEMORY_COST={parametros['memory_cost']}")
+    print(f"SCEE_ARGON2_PARALLELISM={parametros['parallelism']}")
+    print("\nHashes existentes são atualizados no próximo login de cada usuário.")
+
 
 if __name__ == '__main__':
-    init_database()
+    parser = argparse.ArgumentParser(description='Inicialização e manutenção do banco de dados do SCEE.')
+    parser.add_argument('--db', default='sqlite:///scee_loja.db', help='URL do banco de dados')
+    subcomandos = parser.add_subparsers(dest='comando')
+    subcomandos.add_parser('auditar-indices', help='Aponta consultas dos repositórios que varrem tabelas inteiras')
+    calibracao = subcomandos.add_parser('calibrar-argon2', help='Calibra os parâmetros Argon2 para esta máquina')
+    calibracao.add_argument('--alvo-ms', type=float, default=250.0, help='Latência alvo de uma verificação')
+    calibracao.add_argument('--memoria-kib', type=int, help='Memória do Argon2 em KiB')
+    calibracao.add_argument('--paralelismo', type=int, help='Threads do Argon2')
+    args = parser.parse_args()
+    
+    if args.comando == 'auditar-indices':
+        sys.exit(1 if auditar_indices(args.db) else 0)
+    elif args.comando == 'calibrar-argon2':
+        calibrar(args.alvo_ms, args.memoria_kib, args.paralelismo)
+    else:
+        init_database(args.db)
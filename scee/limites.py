@@ -0,0 +1,124 @@
+"""Limitação de tentativas por janela deslizante, em memória do processo."""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Hashable
+
+from cache import CacheLRU
+
+
+class LimiteExcedido(Exception):
+    """
+    Limite de tentativas excedido; a requisição deve ser recusada (429).
+    
+    Attributes:
+        retry_after (int): Segundos até a próxima tentativa ser aceita.
+    """
+    
+    def __init__(self, mensagem: str, retry_after: int):
+        """
+        Inicializa a exceção.
+        
+        Args:
+            mensagem: Descrição do limite.
+            retry_after: Segundos até a próxima tentativa ser aceita.
+        """
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+
+
+class LimitadorJanela:
+    """
+    Limita eventos por chave (IP, conta) em uma janela deslizante.
+    
+    Guarda os instantes dos eventos de cada chave dentro da janela; as chaves
+    ficam em um CacheLRU, então a memória é limitada mesmo sob inundação de
+    chaves distintas e chaves inativas expiram junto com a janela.
+    
+    Attributes:
+        limite (int): Eventos permitidos por janela.
+        janela (float): Tamanho da janela, em segundos.
+    """
+    
+    def __init__(self, limite: int, janela: float, capacidade: int = 100000,
+                 relogio: Callable[[], float] = time.monotonic):
+        """
+        Inicializa o limitador.
+        
+        Args:
+            limite: Eventos permitidos por janela.
+            janela: Tamanho da janela, em segundos.
+            capacidade: Número máximo de chaves acompanhadas.
+            relogio: Função que retorna o tempo atual (monotônico).
+        """
+        self.limite = limite
+        self.janela = janela
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._eventos = CacheLRU(capacidade=capacidade, ttl=janela, relogio=relogio)
+    
+    def verificar(self, chave: Hashable) -> None:
+        """
+        Confere se a chave ainda pode agir, sem registrar evento.
+        
+        Args:
+            chave: Chave limitada.
+            
+        Raises:
+            LimiteExcedido: Se a chave atingiu o limite na janela.
+        """
+        with self._lock:
+            self._janela_atual(chave)
+    
+    def registrar(self, chave: Hashable) -> None:
+        """
+        Registra um evento da chave, se ainda estiver dentro do limite.
+        
+        Args:
+            chave: Chave limitada.
+            
+        Raises:
+            LimiteExcedido: Se a chave atingiu o limite na janela (o evento não é registrado).
+        """
+        with self._lock:
+            eventos = self._janela_atual(chave)
+            eventos.append(self._relogio())
+            self._eventos.guardar(chave, eventos)
+    
+    def limpar(self, chave: Hashable) -> None:
+        """
+        Esquece os eventos de uma chave.
+        
+        Args:
+            chave: Chave limitada.
+        """
+        self._eventos.remover(chave)
+    
+    def _janela_atual(self, chave: Hashable) -> deque:
+        """
+        Descarta eventos fora da janela e confere o limite (chamar com o lock adquirido).
+        
+        Args:
+            chave: Chave limitada.
+            
+        Returns:
+            Eventos da chave dentro da janela.
+            
+        Raises:
+            LimiteExcedido: Se a chave atingiu o limite na janela.
+        """
+        agora = self._relogio()
+        eventos = self._eventos.obter(chave)
+        if eventos is None:
+            return deque()
+        
+        while eventos and eventos[0] <= agora - self.janela:
+            eventos.popleft()
+        if len(eventos) >= self.limite:
+            raise LimiteExcedido(
+                "Limite de tentativas excedido",
+                math.ceil(eventos[0] + self.janela - agora)
+            )
+        return eventos
@@ -25,7 +25,7 @@ class Endereco(Base):
     __tablename__ = 'enderecos'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    cliente_id = Column(Integer, ForeignKey('clientes.id', ondelete='CASCADE'), nullable=False)
+    cliente_id = Column(Integer, ForeignKey('clientes.id', ondelete='CASCADE'), nullable=False, index=True)
     rua = Column(String(200), nullable=False)
     numero = Column(String(20), nullable=False)
     complemento = Column(String(100))
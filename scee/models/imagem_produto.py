@@ -20,7 +20,7 @@ class ImagemProduto(Base):
     __tablename__ = 'imagens_produto'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    produto_id = Column(Integer, ForeignKey('produtos.id', ondelete='CASCADE'), nullable=False)
+    produto_id = Column(Integer, ForeignKey('produtos.id', ondelete='CASCADE'), nullable=False, index=True)
     caminho = Column(String(500), nullable=False)
     ordem = Column(Integer, default=0)
     
@@ -24,7 +24,7 @@ class ItemPedido(Base):
     __tablename__ = 'itens_pedido'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    pedido_id = Column(Integer, ForeignKey('pedidos.id', ondelete='CASCADE'), nullable=False)
+    pedido_id = Column(Integer, ForeignKey('pedidos.id', ondelete='CASCADE'), nullable=False, index=True)
     produto_id = Column(Integer, ForeignKey('produtos.id'), nullable=False)
     produto_nome = Column(String(200), nullable=False)
     quantidade = Column(Integer, nullable=False)
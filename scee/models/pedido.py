@@ -1,6 +1,6 @@
 """Módulo contendo a classe Pedido."""
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
@@ -23,10 +23,14 @@ class Pedido(Base):
     """
     
     __tablename__ = 'pedidos'
+    __table_args__ = (
+        Index('ix_pedidos_cliente_data', 'cliente_id', 'data_pedido'),
+        Index('ix_pedidos_status_data', 'status', 'data_pedido'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     cliente_id = Column(Integer, ForeignKey('clientes.id'), nullable=False)
-    data_pedido = Column(DateTime, default=datetime.utcnow, nullable=False)
+    data_pedido = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
     status = Column(String(50), default='Pendente', nullable=False)
     total = Column(Float, nullable=False)
     endereco_entrega = Column(String(500), nullable=False)
@@ -1,6 +1,6 @@
 """Módulo contendo a classe Produto."""
 
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base
 
@@ -22,12 +22,15 @@ class Produto(Base):
     """
     
     __tablename__ = 'produtos'
+    __table_args__ = (
+        Index('ix_produtos_categoria_preco', 'categoria_id', 'preco'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     nome = Column(String(200), nullable=False)
     sku = Column(String(50), unique=True, nullable=False, index=True)
     descricao = Column(Text, nullable=False)
-    preco = Column(Float, nullable=False)
+    preco = Column(Float, nullable=False, index=True)
     estoque = Column(Integer, nullable=False, default=0)
     categoria_id = Column(Integer, ForeignKey('categorias.id'), nullable=False)
     
@@ -1,7 +1,12 @@
 """Módulo contendo a classe base de repositório."""
 
-from typing import TypeVar, Generic, List, Optional
-from sqlalchemy.orm import Session
+import base64
+import json
+from itertools import islice
+from typing import TypeVar, Generic, Dict, Iterable, Iterator, List, Optional, Callable, Tuple
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.orm import Session, Query
+from database import OPCAO_REPLICA
 
 T = TypeVar('T')
 
@@ -10,11 +15,17 @@ class BaseRepository(Generic[T]):
     """
     Repositório base genérico para operações CRUD.
     
+    As variantes em lote (create_many, update_many, delete_many, get_many)
+    gravam ou leem blocos de chunk_size linhas por instrução e fazem um único
+    commit, em vez de uma transação por entidade.
+    
     Attributes:
         model: Classe do modelo SQLAlchemy.
         session: Sessão do banco de dados.
     """
     
+    TAMANHO_LOTE = 500  # linhas por instrução nas operações em lote
+    
     def __init__(self, model: type, session: Session):
         """
         Inicializa o repositório.
@@ -41,6 +52,25 @@ class BaseRepository(Generic[T]):
         self.session.refresh(entity)
         return entity
     
+    def create_many(self, values: Iterable[dict], chunk_size: int = None, commit: bool = True) -> List[T]:
+        """
+        Cria várias entidades com um INSERT em lote (executemany com RETURNING) por bloco.
+        
+        Args:
+            values: Dicionários coluna -> valor, um por entidade.
+            chunk_size: Linhas por instrução (padrão: TAMANHO_LOTE).
+            commit: Se False, deixa a transação aberta para o chamador.
+            
+        Returns:
+            Entidades criadas, com ID atribuído (a ordem pode diferir da dos valores).
+        """
+        entities = []
+        for chunk in self._chunks(values, chunk_size):
+            entities.extend(self.session.scalars(insert(self.model).returning(self.model), chunk))
+        if commit:
+            self.session.commit()
+        return entities
+    
     def get_by_id(self, entity_id: int) -> Optional[T]:
         """
         Busca uma entidade por ID.
@@ -53,6 +83,39 @@ class BaseRepository(Generic[T]):
         """
         return self.session.query(self.model).filter(self.model.id == entity_id).first()
     
+    def exists(self, **criteria) -> bool:
+        """
+        Verifica se existe alguma entidade com os valores informados.
+        
+        Executa SELECT EXISTS(... LIMIT 1): o banco para no primeiro registro
+        encontrado (uma sondagem no índice) em vez de contar todos.
+        
+        Args:
+            criteria: Pares coluna=valor (ex.: email='a@b.com').
+            
+        Returns:
+            True se existe, False caso contrário.
+        """
+        subquery = select(self.model.id).filter_by(**criteria).limit(1)
+        return self.session.scalar(select(subquery.exists()))
+    
+    def get_many(self, ids: Iterable[int], chunk_size: int = None) -> Dict[int, T]:
+        """
+        Busca várias entidades por ID com consultas IN em blocos.
+        
+        Args:
+            ids: IDs das entidades.
+            chunk_size: IDs por consulta (padrão: TAMANHO_LOTE).
+            
+        Returns:
+            Dicionário ID -> entidade (IDs inexistentes ficam de fora).
+        """
+        entities = {}
+        for chunk in self._chunks(ids, chunk_size):
+            for entity in self.session.query(self.model).filter(self.model.id.in_(chunk)):
+                entities[entity.id] = entity
+        return entities
+    
     def get_all(self) -> List[T]:
         """
         Retorna todas as entidades.
@@ -76,6 +139,26 @@ class BaseRepository(Generic[T]):
         self.session.refresh(entity)
         return entity
     
+    def update_many(self, values: Iterable[dict], chunk_size: int = None, commit: bool = True) -> int:
+        """
+        Atualiza várias entidades por chave primária, com um UPDATE executemany por bloco.
+        
+        Args:
+            values: Dicionários com 'id' e as colunas a alterar.
+            chunk_size: Linhas por instrução (padrão: TAMANHO_LOTE).
+            commit: Se False, deixa a transação aberta para o chamador.
+            
+        Returns:
+            Quantidade de linhas enviadas.
+        """
+        total = 0
+        for chunk in self._chunks(values, chunk_size):
+            self.session.execute(update(self.model), chunk)
+            total += len(chunk)
+        if commit:
+            self.session.commit()
+        return total
+    
     def delete(self, entity: T) -> None:
         """
         Remove uma entidade do banco de dados.
@@ -85,3 +168,116 @@ class BaseRepository(Generic[T]):
         """
         self.session.delete(entity)
         self.session.commit()
+    
+    def delete_many(self, ids: Iterable[int], chunk_size: int = None, commit: bool = True) -> int:
+        """
+        Remove várias entidades por ID, com um DELETE ... IN por bloco.
+        
+        As cascatas do ORM (relationship cascade) não são aplicadas; dependentes
+        ficam a cargo das chaves estrangeiras do banco.
+        
+        Args:
+            ids: IDs das entidades.
+            chunk_size: IDs por instrução (padrão: TAMANHO_LOTE).
+            commit: Se False, deixa a transação aberta para o chamador.
+            
+        Returns:
+            Quantidade de linhas removidas.
+        """
+        total = 0
+        for chunk in self._chunks(ids, chunk_size):
+            total += self.session.execute(delete(self.model).where(self.model.id.in_(chunk))).rowcount
+        if commit:
+            self.session.commit()
+        return total
+    
+    def _chunks(self, itens: Iterable, chunk_size: int = None) -> Iterator[list]:
+        """
+        Divide um iterável em listas de até chunk_size itens.
+        
+        Args:
+            itens: Itens a dividir.
+            chunk_size: Tamanho máximo de cada bloco (padrão: TAMANHO_LOTE).
+            
+        Returns:
+            Iterador de blocos.
+        """
+        itens = iter(itens)
+        chunk_size = chunk_size or self.TAMANHO_LOTE
+        while True:
+            chunk = list(islice(itens, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+    
+    @staticmethod
+    def _leitura(query):
+        """
+        Marca uma consulta somente leitura para ser roteada a uma réplica, se houver.
+        
+        Só deve ser usada em leituras que toleram o atraso de replicação (listagens
+        do catálogo e do admin); leituras seguidas de escrita ficam no primário.
+        
+        Args:
+            query: Consulta (Query ou Select) do SQLAlchemy.
+            
+        Returns:
+            A mesma consulta com a opção de execução de réplica.
+        """
+        return query.execution_options(**{OPCAO_REPLICA: True})
+    
+    @staticmethod
+    def encode_cursor(*valores) -> str:
+        """
+        Codifica os valores da chave de ordenação em um cursor opaco.
+        
+        Args:
+            valores: Valores da chave do último registro da página.
+            
+        Returns:
+            Token base64 seguro para URL.
+        """
+        payload = json.dumps(valores, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> list:
+        """
+        Decodifica um cursor gerado por encode_cursor.
+        
+        Args:
+            cursor: Token recebido do cliente.
+            
+        Returns:
+            Lista com os valores da chave.
+            
+        Raises:
+            ValueError: Se o cursor for inválido.
+        """
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            valores = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        except (TypeError, ValueError):
+            raise ValueError("Cursor de paginação inválido")
+        if not isinstance(valores, list):
+            raise ValueError("Cursor de paginação inválido")
+        return valores
+    
+    def _keyset_page(self, query: Query, limit: int, chave: Callable[[T], tuple]) -> Tuple[List[T], Optional[str]]:
+        """
+        Executa uma consulta já ordenada e filtrada pelo cursor, buscando um
+        registro a mais para saber se existe próxima página.
+        
+        Args:
+            query: Consulta ordenada pela chave do cursor.
+            limit: Número máximo de resultados.
+            chave: Função que extrai a chave de ordenação de uma entidade.
+            
+        Returns:
+            Tupla (entidades, cursor da próxima página ou None).
+        """
+        entidades = query.limit(limit + 1).all()
+        if len(entidades) <= limit:
+            return entidades, None
+        entidades = entidades[:limit]
+        return entidades, self.encode_cursor(*chave(entidades[-1]))
@@ -1,11 +1,103 @@
 """Módulo contendo o repositório de Categoria."""
 
-from typing import Optional
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional
 from sqlalchemy.orm import Session
+from cache import cache_paginas
 from models.categoria import Categoria
 from .base_repository import BaseRepository
 
 
+# Cópia imutável de uma categoria, segura para compartilhar entre requisições.
+CategoriaResumo = namedtuple('CategoriaResumo', ['id', 'nome'])
+
+
+class CategoriaCache:
+    """
+    Cache em memória (read-through) da lista de categorias.
+    
+    Cada escrita em categorias incrementa a versão do cache; uma carga iniciada
+    antes de uma invalidação não é armazenada, evitando gravar dados antigos.
+    A invalidação só alcança o processo que fez a escrita, então a lista também
+    expira após ttl segundos: com vários workers, os demais veem a mudança em
+    no máximo esse tempo.
+    
+    Attributes:
+        ttl (float): Tempo de vida da lista em cache, em segundos.
+        versao (int): Versão atual dos dados de categorias.
+        hits (int): Leituras atendidas pelo cache.
+        misses (int): Leituras que precisaram consultar o banco.
+    """
+    
+    def __init__(self, ttl: float = 30.0, relogio: Callable[[], float] = time.monotonic):
+        """
+        Inicializa o cache vazio.
+        
+        Args:
+            ttl: Tempo de vida da lista em cache, em segundos.
+            relogio: Função que retorna o tempo atual (monotônico).
+        """
+        self.ttl = ttl
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._categorias: Optional[List[CategoriaResumo]] = None
+        self._expira_em = 0.0
+        self.versao = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def obter(self, carregar: Callable[[], List[Categoria]]) -> List[CategoriaResumo]:
+        """
+        Retorna as categorias do cache ou as carrega do banco.
+        
+        Args:
+            carregar: Função que consulta as categorias no banco.
+            
+        Returns:
+            Lista de categorias.
+        """
+        with self._lock:
+            if self._categorias is not None and self._relogio() < self._expira_em:
+                self.hits += 1
+                return self._categorias
+            self.misses += 1
+            versao = self.versao
+        
+        categorias = [CategoriaResumo(c.id, c.nome) for c in carregar()]
+        
+        with self._lock:
+            if versao == self.versao:
+                self._categorias = categorias
+                self._expira_em = self._relogio() + self.ttl
+        return categorias
+    
+    def invalidar(self) -> None:
+        """
+        Descarta as categorias em cache e avança a versão.
+        
+        As páginas de catálogo em cache exibem nomes de categorias e também são descartadas.
+        """
+        with self._lock:
+            self.versao += 1
+            self._categorias = None
+        cache_paginas.limpar()
+    
+    def estatisticas(self) -> Dict[str, int]:
+        """
+        Retorna os contadores do cache.
+        
+        Returns:
+            Dicionário com versao, hits e misses.
+        """
+        with self._lock:
+            return {'versao': self.versao, 'hits': self.hits, 'misses': self.misses}
+
+
+categoria_cache = CategoriaCache()
+
+
 class CategoriaRepository(BaseRepository[Categoria]):
     """
     Repositório para operações com Categoria.
@@ -31,3 +123,69 @@ class CategoriaRepository(BaseRepository[Categoria]):
             Categoria encontrada ou None.
         """
         return self.session.query(Categoria).filter(Categoria.nome == nome).first()
+    
+    def get_all(self, primario: bool = False) -> List[Categoria]:
+        """
+        Retorna todas as categorias, lidas de uma réplica se houver.
+        
+        Args:
+            primario: Lê do primário; use quando o resultado orienta uma escrita
+                (ex.: resolver IDs de categoria em uma importação).
+                
+        Returns:
+            Lista de categorias.
+        """
+        query = self.session.query(Categoria)
+        return (query if primario else self._leitura(query)).all()
+    
+    def get_all_cached(self) -> List[CategoriaResumo]:
+        """
+        Retorna todas as categorias, via cache em memória.
+        
+        A carga usa o primário: o cache só é invalidado por escritas, então uma
+        leitura atrasada de réplica ficaria guardada até a próxima escrita.
+        
+        Returns:
+            Lista de categorias (id, nome).
+        """
+        return categoria_cache.obter(
+            lambda: self.session.query(Categoria).order_by(Categoria.id).all()
+        )
+    
+    def create(self, entity: Categoria) -> Categoria:
+        """
+        Cria uma categoria e invalida o cache de categorias.
+        
+        Args:
+            entity: Categoria a ser criada.
+            
+        Returns:
+            Categoria criada.
+        """
+        entity = super().create(entity)
+        categoria_cache.invalidar()
+        return entity
+    
+    def update(self, entity: Categoria) -> Categoria:
+        """
+        Atualiza uma categoria e invalida o cache de categorias.
+        
+        Args:
+            entity: Categoria a ser atualizada.
+            
+        Returns:
+            Categoria atualizada.
+        """
+        entity = super().update(entity)
+        categoria_cache.invalidar()
+        return entity
+    
+    def delete(self, entity: Categoria) -> None:
+        """
+        Remove uma categoria e invalida o cache de categorias.
+        
+        Args:
+            entity: Categoria a ser removida.
+        """
+        super().delete(entity)
+        categoria_cache.invalidar()
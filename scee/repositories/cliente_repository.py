@@ -1,6 +1,7 @@
 """Módulo contendo o repositório de Cliente."""
 
-from typing import Optional
+from typing import Optional, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models.cliente import Cliente
 from .base_repository import BaseRepository
@@ -54,7 +55,7 @@ class ClienteRepository(BaseRepository[Cliente]):
         Returns:
             True se existe, False caso contrário.
         """
-        return self.session.query(Cliente).filter(Cliente.email == email).count() > 0
+        return self.exists(email=email)
     
     def cpf_exists(self, cpf: str) -> bool:
         """
@@ -66,4 +67,20 @@ class ClienteRepository(BaseRepository[Cliente]):
         Returns:
             True se existe, False caso contrário.
         """
-        return self.session.query(Cliente).filter(Cliente.cpf == cpf).count() > 0
+        return self.exists(cpf=cpf)
+    
+    def email_cpf_exists(self, email: str, cpf: str) -> Tuple[bool, bool]:
+        """
+        Verifica e-mail e CPF já cadastrados em uma única consulta.
+        
+        Args:
+            email: E-mail a verificar.
+            cpf: CPF a verificar.
+            
+        Returns:
+            Tupla (e-mail existe, CPF existe).
+        """
+        email_existe = select(Cliente.id).where(Cliente.email == email).limit(1).exists()
+        cpf_existe = select(Cliente.id).where(Cliente.cpf == cpf).limit(1).exists()
+        linha = self.session.execute(select(email_existe, cpf_existe)).one()
+        return bool(linha[0]), bool(linha[1])
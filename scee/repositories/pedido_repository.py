@@ -1,8 +1,11 @@
 """Módulo contendo o repositório de Pedido."""
 
-from typing import List
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session, Query
 from models.pedido import Pedido
+from models.cliente import Cliente
 from .base_repository import BaseRepository
 
 
@@ -20,6 +23,26 @@ class PedidoRepository(BaseRepository[Pedido]):
         """
         super().__init__(Pedido, session)
     
+    def transition_status(self, pedido_id: int, atual: str, novo: str) -> bool:
+        """
+        Troca o status de um pedido apenas se ele ainda estiver no status esperado.
+        
+        O UPDATE condicional evita que duas conclusões concorrentes (ex.: pagamento
+        conciliado e cancelamento pelo admin) apliquem efeitos duas vezes. Não faz commit.
+        
+        Args:
+            pedido_id: ID do pedido.
+            atual: Status esperado.
+            novo: Novo status.
+            
+        Returns:
+            True se o status foi trocado.
+        """
+        resultado = self.session.execute(
+            update(Pedido).where(Pedido.id == pedido_id, Pedido.status == atual).values(status=novo)
+        )
+        return resultado.rowcount == 1
+    
     def get_by_cliente(self, cliente_id: int) -> List[Pedido]:
         """
         Busca todos os pedidos de um cliente.
@@ -44,7 +67,7 @@ class PedidoRepository(BaseRepository[Pedido]):
         Returns:
             Lista de pedidos.
         """
-        return self.session.query(Pedido).filter(Pedido.status == status).order_by(Pedido.data_pedido.desc()).limit(limit).offset(offset).all()
+        return self._leitura(self.session.query(Pedido)).filter(Pedido.status == status).order_by(Pedido.data_pedido.desc(), Pedido.id.desc()).limit(limit).offset(offset).all()
     
     def get_paginated(self, limit: int = 50, offset: int = 0) -> List[Pedido]:
         """
@@ -57,7 +80,88 @@ class PedidoRepository(BaseRepository[Pedido]):
         Returns:
             Lista de pedidos.
         """
-        return self.session.query(Pedido).order_by(Pedido.data_pedido.desc()).limit(limit).offset(offset).all()
+        return self._leitura(self.session.query(Pedido)).order_by(Pedido.data_pedido.desc(), Pedido.id.desc()).limit(limit).offset(offset).all()
+    
+    def get_page_after(self, after: Optional[str] = None, limit: int = 50,
+                       status: Optional[str] = None) -> Tuple[List[Pedido], Optional[str]]:
+        """
+        Retorna pedidos paginados por cursor (keyset), do mais recente ao mais antigo.
+        
+        Args:
+            after: Cursor da página anterior ou None para a primeira página.
+            limit: Número máximo de resultados.
+            status: Filtra pelo status do pedido (opcional).
+            
+        Returns:
+            Tupla (pedidos, cursor da próxima página ou None).
+            
+        Raises:
+            ValueError: Se o cursor for inválido.
+        """
+        query = self._leitura(self.session.query(Pedido))
+        if status:
+            query = query.filter(Pedido.status == status)
+        if after:
+            try:
+                data_str, ultimo_id = self.decode_cursor(after)
+                data = datetime.fromisoformat(data_str)
+                ultimo_id = int(ultimo_id)
+            except (TypeError, ValueError):
+                raise ValueError("Cursor de paginação inválido")
+            query = query.filter(or_(
+                Pedido.data_pedido < data,
+                and_(Pedido.data_pedido == data, Pedido.id < ultimo_id)
+            ))
+        query = query.order_by(Pedido.data_pedido.desc(), Pedido.id.desc())
+        return self._keyset_page(query, limit, self.cursor_key)
+    
+    @staticmethod
+    def cursor_key(pedido: Pedido) -> tuple:
+        """
+        Chave de ordenação usada pelos cursores de pedido.
+        
+        Args:
+            pedido: Pedido.
+            
+        Returns:
+            Tupla (data_pedido em ISO 8601, id).
+        """
+        return (pedido.data_pedido.isoformat(), pedido.id)
+    
+    def get_export_rows(self, data_inicio: Optional[datetime] = None,
+                        data_fim: Optional[datetime] = None, chunk_size: int = 1000) -> Query:
+        """
+        Consulta as colunas exportadas dos pedidos de um período, já com os
+        dados do cliente (JOIN), em ordem cronológica.
+        
+        O filtro de data é aplicado no SQL e usa o índice de pedidos.data_pedido.
+        
+        Args:
+            data_inicio: Data inicial do filtro (opcional).
+            data_fim: Data final do filtro (opcional).
+            chunk_size: Quantidade de linhas buscadas por vez (yield_per).
+            
+        Returns:
+            Consulta iterável de tuplas (id, data_pedido, cliente_nome, cliente_cpf,
+            status, total, metodo_pagamento, endereco_entrega).
+        """
+        query = self._leitura(self.session.query(
+            Pedido.id,
+            Pedido.data_pedido,
+            Cliente.nome,
+            Cliente.cpf,
+            Pedido.status,
+            Pedido.total,
+            Pedido.metodo_pagamento,
+            Pedido.endereco_entrega
+        ).join(Cliente, Pedido.cliente_id == Cliente.id))
+        
+        if data_inicio:
+            query = query.filter(Pedido.data_pedido >= data_inicio)
+        if data_fim:
+            query = query.filter(Pedido.data_pedido <= data_fim)
+        
+        return query.order_by(Pedido.data_pedido, Pedido.id).yield_per(chunk_size)
     
     def count_all(self) -> int:
         """
@@ -66,7 +170,7 @@ class PedidoRepository(BaseRepository[Pedido]):
         Returns:
             Número total de pedidos.
         """
-        return self.session.query(Pedido).count()
+        return self._leitura(self.session.query(Pedido)).count()
     
     def count_by_status(self, status: str) -> int:
         """
@@ -78,4 +182,4 @@ class PedidoRepository(BaseRepository[Pedido]):
         Returns:
             Número de pedidos com o status.
         """
-        return self.session.query(Pedido).filter(Pedido.status == status).count()
+        return self._leitura(self.session.query(Pedido)).filter(Pedido.status == status).count()
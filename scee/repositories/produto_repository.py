@@ -1,12 +1,26 @@
 """Módulo contendo o repositório de Produto."""
 
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, Query, joinedload, selectinload
+from sqlalchemy import or_, update, select, func, table, literal_column, bindparam
 from models.produto import Produto
 from .base_repository import BaseRepository
 
 
+# Perfis de carregamento dos relacionamentos de Produto.
+# 'catalogo': categoria via JOIN e imagens via SELECT ... IN (2 consultas por página).
+# 'admin': apenas a categoria via JOIN (1 consulta por página).
+LOAD_PROFILES = {
+    'catalogo': (joinedload(Produto.categoria), selectinload(Produto.imagens)),
+    'admin': (joinedload(Produto.categoria),),
+}
+
+# Índice FTS5 criado por Database.create_tables (apenas SQLite).
+PRODUTOS_FTS = table('produtos_fts')
+PRODUTOS_FTS_COLUNA = literal_column('produtos_fts')
+
+
 class ProdutoRepository(BaseRepository[Produto]):
     """
     Repositório para operações com Produto.
@@ -21,6 +35,24 @@ class ProdutoRepository(BaseRepository[Produto]):
         """
         super().__init__(Produto, session)
     
+    def _query(self, load: Optional[str] = None) -> Query:
+        """
+        Cria a consulta base das listagens de produtos (roteada a réplicas de
+        leitura) aplicando um perfil de carregamento.
+        
+        Args:
+            load: Nome do perfil em LOAD_PROFILES ou None (carregamento lazy).
+            
+        Returns:
+            Consulta do SQLAlchemy.
+        """
+        query = self._leitura(self.session.query(Produto))
+        if load:
+            if load not in LOAD_PROFILES:
+                raise ValueError(f"Perfil de carregamento desconhecido: {load}")
+            query = query.options(*LOAD_PROFILES[load])
+        return query
+    
     def get_by_sku(self, sku: str) -> Optional[Produto]:
         """
         Busca um produto por SKU.
@@ -33,6 +65,99 @@ class ProdutoRepository(BaseRepository[Produto]):
         """
         return self.session.query(Produto).filter(Produto.sku == sku).first()
     
+    def get_ids_by_skus(self, skus: Iterable[str], chunk_size: int = 500) -> Dict[str, int]:
+        """
+        Resolve os IDs de vários SKUs com consultas IN em blocos.
+        
+        Args:
+            skus: SKUs a resolver.
+            chunk_size: Quantidade máxima de SKUs por consulta.
+            
+        Returns:
+            Dicionário SKU -> ID apenas para os SKUs existentes.
+        """
+        skus = list(skus)
+        ids = {}
+        for inicio in range(0, len(skus), chunk_size):
+            bloco = skus[inicio:inicio + chunk_size]
+            ids.update(
+                self.session.query(Produto.sku, Produto.id).filter(Produto.sku.in_(bloco)).all()
+            )
+        return ids
+    
+    def update_estoque_by_sku(self, estoques: Dict[str, int]) -> set:
+        """
+        Atualiza o estoque de vários produtos em uma única transação.
+        
+        Os SKUs são resolvidos com get_ids_by_skus e o estoque é gravado com
+        um único UPDATE por chave primária executado em executemany.
+        
+        Args:
+            estoques: Dicionário SKU -> novo estoque.
+            
+        Returns:
+            Conjunto de SKUs efetivamente atualizados.
+        """
+        ids = self.get_ids_by_skus(estoques.keys())
+        if ids:
+            self.session.execute(
+                update(Produto),
+                [{'id': ids[sku], 'estoque': estoques[sku]} for sku in ids]
+            )
+        self.session.commit()
+        return set(ids)
+    
+    def decrement_stock(self, quantidades: Dict[int, int]) -> bool:
+        """
+        Dá baixa no estoque de vários produtos de forma atômica e condicional.
+        
+        Cada linha é um UPDATE ... SET estoque = estoque - q WHERE id = :id AND
+        estoque >= q, enviado em um único executemany e conferido pelo rowcount.
+        O próprio UPDATE trava a linha (lock do SQLite ou lock de linha no
+        Postgres), então checkouts concorrentes não vendem além do estoque.
+        Não faz commit: se retornar False, a transação deve ser desfeita.
+        
+        Args:
+            quantidades: Dicionário ID do produto -> quantidade a baixar.
+            
+        Returns:
+            True se todas as linhas foram baixadas, False se algum produto não
+            existe ou não tem estoque suficiente.
+        """
+        produtos = Produto.__table__
+        stmt = update(produtos).where(
+            produtos.c.id == bindparam('b_id'),
+            produtos.c.estoque >= bindparam('b_qtd')
+        ).values(estoque=produtos.c.estoque - bindparam('b_qtd'))
+        
+        # Ordem fixa de ids: transações concorrentes travam as linhas na mesma ordem
+        parametros = [{'b_id': produto_id, 'b_qtd': qtd} for produto_id, qtd in sorted(quantidades.items())]
+        conn = self.session.connection()
+        
+        if conn.dialect.supports_sane_multi_rowcount:
+            return conn.execute(stmt, parametros).rowcount == len(parametros)
+        return all(conn.execute(stmt, p).rowcount == 1 for p in parametros)
+    
+    def increment_stock(self, quantidades: Dict[int, int]) -> None:
+        """
+        Devolve ao estoque as quantidades de vários produtos (ex.: pedido cancelado).
+        
+        Um único UPDATE ... SET estoque = estoque + q em executemany, na mesma
+        ordem de ids de decrement_stock. Não faz commit.
+        
+        Args:
+            quantidades: Dicionário ID do produto -> quantidade a devolver.
+        """
+        if not quantidades:
+            return
+        produtos = Produto.__table__
+        stmt = update(produtos).where(
+            produtos.c.id == bindparam('b_id')
+        ).values(estoque=produtos.c.estoque + bindparam('b_qtd'))
+        
+        parametros = [{'b_id': produto_id, 'b_qtd': qtd} for produto_id, qtd in sorted(quantidades.items())]
+        self.session.connection().execute(stmt, parametros)
+    
     def sku_exists(self, sku: str) -> bool:
         """
         Verifica se um SKU já está cadastrado.
@@ -43,9 +168,10 @@ class ProdutoRepository(BaseRepository[Produto]):
         Returns:
             True se existe, False caso contrário.
         """
-        return self.session.query(Produto).filter(Produto.sku == sku).count() > 0
+        return self.exists(sku=sku)
     
-    def get_by_categoria(self, categoria_id: int, limit: int = 12, offset: int = 0) -> List[Produto]:
+    def get_by_categoria(self, categoria_id: int, limit: int = 12, offset: int = 0,
+                         load: Optional[str] = None) -> List[Produto]:
         """
         Busca produtos por categoria com paginação.
         
@@ -53,35 +179,114 @@ class ProdutoRepository(BaseRepository[Produto]):
             categoria_id: ID da categoria.
             limit: Número máximo de resultados.
             offset: Deslocamento para paginação.
+            load: Perfil de carregamento dos relacionamentos (ver LOAD_PROFILES).
             
         Returns:
             Lista de produtos.
         """
-        return self.session.query(Produto).filter(
+        return self._query(load).filter(
             Produto.categoria_id == categoria_id
         ).limit(limit).offset(offset).all()
     
-    def search(self, query: str, limit: int = 12, offset: int = 0) -> List[Produto]:
+    def _usa_fts(self) -> bool:
         """
-        Busca produtos por texto no nome ou descrição.
+        Indica se a busca textual usa o índice FTS5 (disponível apenas no SQLite).
+        
+        Returns:
+            True se o banco for SQLite.
+        """
+        return self.session.get_bind().dialect.name == 'sqlite'
+    
+    @staticmethod
+    def _fts_query(query: str) -> str:
+        """
+        Converte o texto digitado em uma expressão FTS5 de prefixos.
+        
+        Cada palavra vira um termo entre aspas com '*' (busca por prefixo) e os
+        termos são combinados com AND, neutralizando a sintaxe do FTS5.
+        
+        Args:
+            query: Texto de busca.
+            
+        Returns:
+            Expressão MATCH ou string vazia se não houver palavras.
+        """
+        termos = re.findall(r'\w+', query)
+        return ' '.join(f'"{termo}"*' for termo in termos)
+    
+    def search(self, query: str, limit: int = 12, offset: int = 0, load: Optional[str] = None) -> List[Produto]:
+        """
+        Busca produtos por texto no nome, descrição ou SKU.
+        
+        No SQLite usa o índice FTS5 (produtos_fts), com busca por prefixo e
+        resultados ordenados por relevância (BM25). Nos demais bancos usa ILIKE.
         
         Args:
             query: Texto de busca.
             limit: Número máximo de resultados.
             offset: Deslocamento para paginação.
+            load: Perfil de carregamento dos relacionamentos (ver LOAD_PROFILES).
             
         Returns:
             Lista de produtos.
         """
-        search_pattern = f"%{query}%"
-        return self.session.query(Produto).filter(
-            or_(
-                Produto.nome.ilike(search_pattern),
-                Produto.descricao.ilike(search_pattern)
+        if not self._usa_fts():
+            search_pattern = f"%{query}%"
+            return self._query(load).filter(
+                or_(
+                    Produto.nome.ilike(search_pattern),
+                    Produto.descricao.ilike(search_pattern),
+                    Produto.sku.ilike(search_pattern)
+                )
+            ).limit(limit).offset(offset).all()
+        
+        expressao = self._fts_query(query)
+        if not expressao:
+            return []
+        
+        ranking = select(
+            literal_column('produtos_fts.rowid').label('id'),
+            func.bm25(PRODUTOS_FTS_COLUNA).label('rank')
+        ).select_from(PRODUTOS_FTS).where(
+            PRODUTOS_FTS_COLUNA.op('MATCH')(expressao)
+        ).order_by('rank').limit(limit).offset(offset).subquery()
+        
+        return self._query(load).join(
+            ranking, ranking.c.id == Produto.id
+        ).order_by(ranking.c.rank).all()
+    
+    def count_search(self, query: str) -> int:
+        """
+        Conta os produtos encontrados por search.
+        
+        Args:
+            query: Texto de busca.
+            
+        Returns:
+            Número total de resultados.
+        """
+        if not self._usa_fts():
+            search_pattern = f"%{query}%"
+            return self._leitura(self.session.query(Produto)).filter(
+                or_(
+                    Produto.nome.ilike(search_pattern),
+                    Produto.descricao.ilike(search_pattern),
+                    Produto.sku.ilike(search_pattern)
+                )
+            ).count()
+        
+        expressao = self._fts_query(query)
+        if not expressao:
+            return 0
+        
+        return self.session.execute(self._leitura(
+            select(func.count()).select_from(PRODUTOS_FTS).where(
+                PRODUTOS_FTS_COLUNA.op('MATCH')(expressao)
             )
-        ).limit(limit).offset(offset).all()
+        )).scalar()
     
-    def filter_by_price_range(self, min_price: float, max_price: float, limit: int = 12, offset: int = 0) -> List[Produto]:
+    def filter_by_price_range(self, min_price: float, max_price: float, limit: int = 12, offset: int = 0,
+                              load: Optional[str] = None) -> List[Produto]:
         """
         Filtra produtos por faixa de preço.
         
@@ -90,27 +295,68 @@ class ProdutoRepository(BaseRepository[Produto]):
             max_price: Preço máximo.
             limit: Número máximo de resultados.
             offset: Deslocamento para paginação.
+            load: Perfil de carregamento dos relacionamentos (ver LOAD_PROFILES).
             
         Returns:
             Lista de produtos.
         """
-        return self.session.query(Produto).filter(
+        return self._query(load).filter(
             Produto.preco >= min_price,
             Produto.preco <= max_price
         ).limit(limit).offset(offset).all()
     
-    def get_paginated(self, limit: int = 12, offset: int = 0) -> List[Produto]:
+    def get_paginated(self, limit: int = 12, offset: int = 0, load: Optional[str] = None) -> List[Produto]:
         """
         Retorna produtos paginados.
         
         Args:
             limit: Número máximo de resultados.
             offset: Deslocamento para paginação.
+            load: Perfil de carregamento dos relacionamentos (ver LOAD_PROFILES).
             
         Returns:
             Lista de produtos.
         """
-        return self.session.query(Produto).limit(limit).offset(offset).all()
+        return self._query(load).order_by(Produto.id).limit(limit).offset(offset).all()
+    
+    def get_page_after(self, after: Optional[str] = None, limit: int = 12,
+                       load: Optional[str] = None) -> Tuple[List[Produto], Optional[str]]:
+        """
+        Retorna produtos paginados por cursor (keyset), ordenados por ID.
+        
+        Args:
+            after: Cursor da página anterior ou None para a primeira página.
+            limit: Número máximo de resultados.
+            load: Perfil de carregamento dos relacionamentos (ver LOAD_PROFILES).
+            
+        Returns:
+            Tupla (produtos, cursor da próxima página ou None).
+            
+        Raises:
+            ValueError: Se o cursor for inválido.
+        """
+        query = self._query(load)
+        if after:
+            try:
+                (ultimo_id,) = self.decode_cursor(after)
+                ultimo_id = int(ultimo_id)
+            except (TypeError, ValueError):
+                raise ValueError("Cursor de paginação inválido")
+            query = query.filter(Produto.id > ultimo_id)
+        return self._keyset_page(query.order_by(Produto.id), limit, self.cursor_key)
+    
+    @staticmethod
+    def cursor_key(produto: Produto) -> tuple:
+        """
+        Chave de ordenação usada pelos cursores de produto.
+        
+        Args:
+            produto: Produto.
+            
+        Returns:
+            Tupla (id,).
+        """
+        return (produto.id,)
     
     def count_all(self) -> int:
         """
@@ -119,7 +365,7 @@ class ProdutoRepository(BaseRepository[Produto]):
         Returns:
             Número total de produtos.
         """
-        return self.session.query(Produto).count()
+        return self._leitura(self.session.query(Produto)).count()
     
     def count_by_categoria(self, categoria_id: int) -> int:
         """
@@ -131,10 +377,10 @@ class ProdutoRepository(BaseRepository[Produto]):
         Returns:
             Número de produtos na categoria.
         """
-        return self.session.query(Produto).filter(Produto.categoria_id == categoria_id).count()
+        return self._leitura(self.session.query(Produto)).filter(Produto.categoria_id == categoria_id).count()
     
     def filter_by_categoria_and_price(self, categoria_id: int, min_price: float, max_price: float, 
-                                      limit: int = 12, offset: int = 0) -> List[Produto]:
+                                      limit: int = 12, offset: int = 0, load: Optional[str] = None) -> List[Produto]:
         """
         Filtra produtos por categoria E faixa de preço simultaneamente.
         
@@ -144,11 +390,12 @@ class ProdutoRepository(BaseRepository[Produto]):
             max_price: Preço máximo.
             limit: Número máximo de resultados.
             offset: Deslocamento para paginação.
+            load: Perfil de carregamento dos relacionamentos (ver LOAD_PROFILES).
             
         Returns:
             Lista de produtos que atendem AMBOS os critérios.
         """
-        return self.session.query(Produto).filter(
+        return self._query(load).filter(
             Produto.categoria_id == categoria_id,
             Produto.preco >= min_price,
             Produto.preco <= max_price
@@ -0,0 +1,475 @@
+"""Hash e verificação de senhas Argon2 em um pool de processos com fila limitada.
+
+Os parâmetros Argon2 da aplicação são definidos aqui (parametros_argon2) e
+podem ser calibrados para o hardware com calibrar_argon2.
+"""
+
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, Optional, Tuple
+
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHash, VerificationError
+
+# Hasher de cada processo do pool (criado pelo inicializador do worker).
+_hasher: Optional[PasswordHasher] = None
+
+
+def _env_int(nome: str) -> Optional[int]:
+    """
+    Lê um inteiro de variável de ambiente.
+    
+    Args:
+        nome: Nome da variável.
+        
+    Returns:
+        Valor inteiro ou None se não definida.
+    """
+    valor = os.environ.get(nome)
+    return int(valor) if valor else None
+
+
+def parametros_argon2() -> Dict[str, int]:
+    """
+    Parâmetros Argon2 da aplicação: variáveis SCEE_ARGON2_* ou os padrões do argon2-cffi.
+    
+    Returns:
+        Dicionário com time_cost, memory_cost (KiB) e parallelism.
+    """
+    padrao = PasswordHasher()
+    return {
+        'time_cost': _env_int('SCEE_ARGON2_TIME_COST') or padrao.time_cost,
+        'memory_cost': _env_int('SCEE_ARGON2_MEMORY_COST') or padrao.memory_cost,
+        'parallelism': _env_int('SCEE_ARGON2_PARALLELISM') or padrao.parallelism,
+    }
+
+
+def criar_hasher(parametros: Dict[str, int] = None) -> PasswordHasher:
+    """
+    Cria um PasswordHasher com os parâmetros da aplicação.
+    
+    Args:
+        parametros: Parâmetros Argon2 (padrão: parametros_argon2()).
+        
+    Returns:
+        Hasher configurado.
+    """
+    return PasswordHasher(**(parametros or parametros_argon2()))
+
+
+def calibrar_argon2(alvo_ms: float = 250.0, memory_cost: int = None, parallelism: int = None,
+                    amostras: int = 5) -> Tuple[Dict[str, int], float]:
+    """
+    Escolhe parâmetros Argon2 cuja verificação leve cerca de alvo_ms nesta máquina.
+    
+    Mantém memória e paralelismo e aumenta time_cost até a mediana das
+    verificações atingir o alvo; se nem time_cost=1 couber no alvo, reduz a
+    memória pela metade (até 8 MiB).
+    
+    Args:
+        alvo_ms: Latência alvo de uma verificação, em milissegundos.
+        memory_cost: Memória em KiB (padrão: a atual da aplicação).
+        parallelism: Threads do Argon2 (padrão: o atual da aplicação).
+        amostras: Verificações medidas por combinação de parâmetros.
+        
+    Returns:
+        Tupla (parâmetros escolhidos, mediana medida em ms).
+    """
+    atuais = parametros_argon2()
+    parametros = {
+        'time_cost': 1,
+        'memory_cost': memory_cost or atuais['memory_cost'],
+        'parallelism': parallelism or atuais['parallelism'],
+    }
+    
+    def medir(parametros: Dict[str, int]) -> float:
+        hasher = PasswordHasher(**parametros)
+        senha_hash = hasher.hash('calibracao')
+        duracoes = []
+        for _ in range(amostras):
+            inicio = time.perf_counter()
+            hasher.verify(senha_hash, 'calibracao')
+            duracoes.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(duracoes)
+    
+    medido = medir(parametros)
+    while medido > alvo_ms and parametros['memory_cost'] > 8 * 1024:
+        parametros['memory_cost'] //= 2
+        medido = medir(parametros)
+    
+    while medido < alvo_ms:
+        proximo = dict(parametros, time_cost=parametros['time_cost'] + 1)
+        medido_proximo = medir(proximo)
+        # Fica com o time_cost mais próximo do alvo
+        if medido_proximo - alvo_ms > alvo_ms - medido:
+            break
+        parametros, medido = proximo, medido_proximo
+    
+    return parametros, round(medido, 1)
+
+
+def _iniciar_worker(parametros: Dict[str, int]) -> None:
+    """
+    Inicializa um processo do pool com os parâmetros Argon2.
+    
+    Args:
+        parametros: Argumentos do PasswordHasher (time_cost, memory_cost, parallelism).
+    """
+    global _hasher
+    _hasher = PasswordHasher(**parametros)
+
+
+def _gerar_hash(senha: str) -> tuple:
+    """
+    Gera o hash de uma senha (executado no worker).
+    
+    Args:
+        senha: Senha em texto puro.
+        
+    Returns:
+        Tupla (hash, duração em segundos).
+    """
+    inicio = time.perf_counter()
+    senha_hash = _hasher.hash(senha)
+    return senha_hash, time.perf_counter() - inicio
+
+
+def _verificar(senha_hash: str, senha: str) -> tuple:
+    """
+    Verifica uma senha contra o hash (executado no worker).
+    
+    Args:
+        senha_hash: Hash armazenado.
+        senha: Senha em texto puro.
+        
+    Returns:
+        Tupla ((senha confere, hash precisa ser refeito), duração em segundos).
+    """
+    inicio = time.perf_counter()
+    try:
+        _hasher.verify(senha_hash, senha)
+        resultado = (True, _hasher.check_needs_rehash(senha_hash))
+    except (VerificationError, InvalidHash):
+        resultado = (False, False)
+    return resultado, time.perf_counter() - inicio
+
+
+class PoolSenhasSaturado(Exception):
+    """Fila do pool de senhas cheia (ou espera esgotada); a requisição deve ser recusada (429)."""
+    pass
+
+
+class PoolSenhas:
+    """
+    Pool de processos dedicado ao Argon2, com controle de admissão.
+    
+    O hash é propositalmente caro em CPU e memória; fora da thread da requisição,
+    uma rajada de logins ocupa no máximo `workers` núcleos. Até `workers + fila_max`
+    operações podem estar pendentes; acima disso a chamada falha na hora com
+    PoolSenhasSaturado, em vez de enfileirar sem limite.
+    
+    Attributes:
+        workers (int): Número de processos.
+        fila_max (int): Operações aguardando além das que estão em execução.
+        parametros (dict): Parâmetros Argon2 (time_cost, memory_cost, parallelism).
+        timeout (float): Espera máxima por uma operação, em segundos.
+    """
+    
+    AMOSTRAS_LATENCIA = 1000  # durações mantidas para as estatísticas
+    ESPERA_FICTICIA_PADRAO = 0.3  # segundos, enquanto não houver latências medidas
+    
+    def __init__(self, workers: int = None, fila_max: int = 32, parametros: Dict[str, int] = None,
+                 timeout: float = 30.0):
+        """
+        Inicializa o pool (os processos são criados no primeiro uso).
+        
+        Args:
+            workers: Número de processos (padrão: metade dos núcleos, no mínimo 1).
+            fila_max: Operações aguardando além das que estão em execução.
+            parametros: Parâmetros Argon2 (padrão: parametros_argon2()).
+            timeout: Espera máxima por uma operação, em segundos.
+        """
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.fila_max = fila_max
+        self.parametros = parametros or parametros_argon2()
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._conclusoes = self._criar_executor_conclusoes()
+        self._vagas = threading.BoundedSemaphore(self.workers + fila_max)
+        self._lock = threading.Lock()
+        self._pendentes = 0
+        self._concluidas = 0
+        self._rejeitadas = 0
+        self._latencias_hash = deque(maxlen=self.AMOSTRAS_LATENCIA)
+        self._latencias_total = deque(maxlen=self.AMOSTRAS_LATENCIA)
+    
+    def hash(self, senha: str) -> str:
+        """
+        Gera o hash Argon2 de uma senha.
+        
+        Args:
+            senha: Senha em texto puro.
+            
+        Returns:
+            Hash codificado.
+            
+        Raises:
+            PoolSenhasSaturado: Se o pool estiver saturado.
+        """
+        return self._executar(_gerar_hash, senha)
+    
+    def verificar(self, senha_hash: str, senha: str) -> bool:
+        """
+        Verifica uma senha contra o hash armazenado.
+        
+        Args:
+            senha_hash: Hash armazenado.
+            senha: Senha em texto puro.
+            
+        Returns:
+            True se a senha confere.
+            
+        Raises:
+            PoolSenhasSaturado: Se o pool estiver saturado.
+        """
+        return self.verificar_com_rehash(senha_hash, senha)[0]
+    
+    def verificar_com_rehash(self, senha_hash: str, senha: str) -> Tuple[bool, bool]:
+        """
+        Verifica uma senha e informa se o hash usa parâmetros diferentes dos atuais.
+        
+        Args:
+            senha_hash: Hash armazenado.
+            senha: Senha em texto puro.
+            
+        Returns:
+            Tupla (senha confere, hash precisa ser refeito).
+            
+        Raises:
+            PoolSenhasSaturado: Se o pool estiver saturado.
+        """
+        return self._executar(_verificar, senha_hash, senha)
+    
+    def aguardar_verificacao_ficticia(self) -> None:
+        """
+        Espera o tempo típico de uma verificação real, sem ocupar o pool.
+        
+        Usado quando não há hash a verificar (e-mail desconhecido): a resposta
+        leva o mesmo tempo de uma senha errada, sem custo de CPU nem de fila.
+        """
+        with self._lock:
+            latencias = list(self._latencias_total)
+        time.sleep(statistics.median(latencias) if latencias else self.ESPERA_FICTICIA_PADRAO)
+    
+    def hash_em_segundo_plano(self, senha: str, ao_concluir: Callable[[str], None]) -> bool:
+        """
+        Gera um hash sem esperar o resultado; ao_concluir recebe o hash no fim.
+        
+        Usado para atualizar hashes antigos após o login. Se o pool estiver
+        saturado a operação é descartada (será tentada no próximo login).
+        
+        Args:
+            senha: Senha em texto puro.
+            ao_concluir: Função chamada com o novo hash, em uma thread própria
+                (pode fazer E/S, como gravar no banco).
+            
+        Returns:
+            True se a operação foi aceita.
+        """
+        try:
+            futuro = self._submeter(_gerar_hash, senha)
+        except PoolSenhasSaturado:
+            return False
+        
+        inicio = time.perf_counter()
+        
+        def concluir(futuro: Future) -> None:
+            if futuro.cancelled() or futuro.exception() is not None:
+                return
+            senha_hash, duracao = futuro.result()
+            self._registrar(inicio, duracao)
+            self._conclusoes.submit(ao_concluir, senha_hash)
+        
+        futuro.add_done_callback(concluir)
+        return True
+    
+    def estatisticas(self) -> Dict:
+        """
+        Retorna o estado do pool e as latências recentes.
+        
+        Returns:
+            Dicionário com workers, fila, contadores e latências (ms) de hash e total.
+        """
+        with self._lock:
+            pendentes = self._pendentes
+            latencias_hash = sorted(self._latencias_hash)
+            latencias_total = sorted(self._latencias_total)
+            return {
+                'workers': self.workers,
+                'fila_max': self.fila_max,
+                'parametros': dict(self.parametros),
+                'em_execucao': min(pendentes, self.workers),
+                'na_fila': max(0, pendentes - self.workers),
+                'concluidas': self._concluidas,
+                'rejeitadas': self._rejeitadas,
+                'latencia_hash_ms': self._resumo(latencias_hash),
+                'latencia_total_ms': self._resumo(latencias_total),
+            }
+    
+    def encerrar(self) -> None:
+        """
+        Encerra os processos do pool e espera as conclusões pendentes.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            conclusoes, self._conclusoes = self._conclusoes, self._criar_executor_conclusoes()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        conclusoes.shutdown(wait=True)
+    
+    def _executar(self, funcao, *args):
+        """
+        Submete uma operação ao pool e espera o resultado.
+        
+        Args:
+            funcao: Função do worker (_gerar_hash ou _verificar).
+            args: Argumentos da função.
+            
+        Returns:
+            Resultado da operação.
+            
+        Raises:
+            PoolSenhasSaturado: Se não houver vaga na fila ou a espera se esgotar.
+        """
+        inicio = time.perf_counter()
+        futuro = self._submeter(funcao, *args)
+        
+        try:
+            resultado, duracao = futuro.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            futuro.cancel()
+            with self._lock:
+                self._rejeitadas += 1
+            raise PoolSenhasSaturado("Tempo de espera do pool de senhas esgotado")
+        except BrokenProcessPool:
+            # Um worker morreu (ex.: falta de memória); recria o pool na próxima chamada
+            with self._lock:
+                self._executor = None
+            raise
+        
+        self._registrar(inicio, duracao)
+        return resultado
+    
+    def _submeter(self, funcao, *args) -> Future:
+        """
+        Submete uma operação ao pool, respeitando o limite de pendentes.
+        
+        Args:
+            funcao: Função do worker (_gerar_hash ou _verificar).
+            args: Argumentos da função.
+            
+        Returns:
+            Futuro da operação.
+            
+        Raises:
+            PoolSenhasSaturado: Se não houver vaga na fila.
+        """
+        if not self._vagas.acquire(blocking=False):
+            with self._lock:
+                self._rejeitadas += 1
+            raise PoolSenhasSaturado("Pool de senhas saturado")
+        
+        with self._lock:
+            self._pendentes += 1
+        try:
+            futuro = self._obter_executor().submit(funcao, *args)
+        except BaseException:
+            self._liberar_vaga()
+            raise
+        # A vaga só é liberada quando o worker termina, mesmo que a espera se esgote antes
+        futuro.add_done_callback(self._liberar_vaga)
+        return futuro
+    
+    def _registrar(self, inicio: float, duracao: float) -> None:
+        """
+        Registra uma operação concluída nas estatísticas.
+        
+        Args:
+            inicio: Instante da submissão (time.perf_counter).
+            duracao: Duração do hash no worker, em segundos.
+        """
+        with self._lock:
+            self._concluidas += 1
+            self._latencias_hash.append(duracao)
+            self._latencias_total.append(time.perf_counter() - inicio)
+    
+    def _liberar_vaga(self, futuro=None) -> None:
+        """
+        Libera a vaga de uma operação concluída, cancelada ou não submetida.
+        
+        Args:
+            futuro: Futuro concluído (quando chamado como callback).
+        """
+        with self._lock:
+            self._pendentes -= 1
+        self._vagas.release()
+    
+    @staticmethod
+    def _criar_executor_conclusoes() -> ThreadPoolExecutor:
+        """
+        Cria o executor das conclusões em segundo plano (ex.: gravar o novo hash).
+        
+        Elas não rodam no callback do futuro porque esse roda na thread que
+        entrega todos os resultados do pool: E/S ali atrasaria todo login.
+        
+        Returns:
+            Executor de threads.
+        """
+        return ThreadPoolExecutor(max_workers=2, thread_name_prefix='senhas-conclusao')
+    
+    def _obter_executor(self) -> ProcessPoolExecutor:
+        """
+        Retorna o executor, criando-o no primeiro uso.
+        
+        Returns:
+            Executor de processos.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_iniciar_worker,
+                    initargs=(self.parametros,)
+                )
+            return self._executor
+    
+    @staticmethod
+    def _resumo(latencias: list) -> Dict[str, float]:
+        """
+        Resume uma lista ordenada de durações.
+        
+        Args:
+            latencias: Durações em segundos, ordenadas.
+            
+        Returns:
+            Dicionário com média, p95 e máximo em milissegundos.
+        """
+        if not latencias:
+            return {'media': 0.0, 'p95': 0.0, 'max': 0.0}
+        return {
+            'media': round(sum(latencias) / len(latencias) * 1000, 1),
+            'p95': round(latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] * 1000, 1),
+            'max': round(latencias[-1] * 1000, 1),
+        }
+
+
+# Pool compartilhado pela aplicação; custo e tamanho ajustáveis por variáveis de ambiente.
+pool_senhas = PoolSenhas(
+    workers=_env_int('SCEE_SENHA_WORKERS'),
+    fila_max=_env_int('SCEE_SENHA_FILA') or 32,
+)
@@ -0,0 +1,96 @@
+"""Fixtures compartilhadas pelos testes (banco SQLite temporário e app Flask)."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from models import Categoria, Cliente, Endereco, Produto
+
+
+def popular_loja(session, produtos=30, estoque=50):
+    """
+    Cria uma categoria, produtos, um cliente e um endereço.
+    
+    Args:
+        session: Sessão do banco.
+        produtos: Quantidade de produtos.
+        estoque: Estoque inicial de cada produto.
+        
+    Returns:
+        Dicionário com 'categoria_id', 'produto_ids', 'cliente_id' e 'endereco_id'.
+    """
+    categoria = Categoria(nome='Notebooks')
+    session.add(categoria)
+    session.flush()
+    
+    cliente = Cliente(nome='Cliente Teste', email='cliente@teste.com', cpf='12345678901', senha_hash='x')
+    session.add(cliente)
+    session.flush()
+    
+    endereco = Endereco(cliente_id=cliente.id, rua='Rua A', numero='1', bairro='Centro',
+                        cidade='São Paulo', estado='SP', cep='01000000')
+    itens = [Produto(nome=f'Produto {i}', sku=f'SKU-{i:05d}', descricao='Descrição', preco=10.0 + i,
+                     estoque=estoque, categoria_id=categoria.id) for i in range(produtos)]
+    session.add(endereco)
+    session.add_all(itens)
+    session.commit()
+    
+    return {
+        'categoria_id': categoria.id,
+        'produto_ids': [produto.id for produto in itens],
+        'cliente_id': cliente.id,
+        'endereco_id': endereco.id,
+    }
+
+
+@pytest.fixture
+def popular():
+    """Função popular_loja, para testes que montam o próprio banco."""
+    return popular_loja
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Database em um arquivo SQLite novo, com as tabelas criadas."""
+    db = Database(f'sqlite:///{tmp_path / "teste.db"}', perfil='sqlite-prod')
+    db.create_tables()
+    yield db
+    db.close_session()
+    db.engine.dispose()
+
+
+@pytest.fixture(scope='session')
+def app_scee(tmp_path_factory):
+    """
+    Módulo app importado com banco temporário e carrinhos em memória.
+    
+    O app lê a configuração do ambiente na importação e cria static/uploads no
+    diretório atual, por isso ambos são ajustados antes do import.
+    """
+    diretorio = tmp_path_factory.mktemp('app')
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(diretorio)
+        mp.setenv('SCEE_DATABASE_URL', f'sqlite:///{diretorio / "loja.db"}')
+        mp.setenv('SCEE_CARRINHO_STORE', 'memoria')
+        mp.setenv('SCEE_SECRET_KEY', 'teste')
+        import app
+    
+    app.app.config['TESTING'] = True
+    return app
+
+
+@pytest.fixture(scope='session')
+def loja(app_scee):
+    """Dados mínimos da loja no banco do app."""
+    with app_scee.db.sessao() as session:
+        return popular_loja(session)
+
+
+@pytest.fixture
+def cliente_http(app_scee, loja):
+    """Cliente de teste do Flask, sem sessão autenticada."""
+    return app_scee.app.test_client()
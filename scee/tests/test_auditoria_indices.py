@@ -0,0 +1,13 @@
+"""Auditoria de índices: nenhuma consulta auditada varre tabela inteira sem ser esperada."""
+
+from init_db import CONSULTAS_AUDITADAS, VARREDURAS_ESPERADAS, auditar_indices
+
+
+def test_auditoria_sem_varreduras_inesperadas(tmp_path, capsys):
+    problemas = auditar_indices(f'sqlite:///{tmp_path / "auditoria.db"}')
+
+    assert problemas == 0, capsys.readouterr().out
+
+
+def test_varreduras_esperadas_sao_consultas_auditadas():
+    assert set(VARREDURAS_ESPERADAS) <= {nome for nome, _ in CONSULTAS_AUDITADAS}
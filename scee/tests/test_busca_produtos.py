@@ -0,0 +1,29 @@
+"""Busca textual de produtos: índice FTS5 e fallback com ILIKE encontram os mesmos campos."""
+
+import pytest
+
+from repositories.produto_repository import ProdutoRepository
+
+
+@pytest.mark.parametrize('fts', [True, False])
+def test_busca_por_sku(banco, popular, monkeypatch, fts):
+    monkeypatch.setattr(ProdutoRepository, '_usa_fts', lambda self: fts)
+    with banco.sessao() as session:
+        popular(session, produtos=30)
+        repo = ProdutoRepository(session)
+        
+        encontrados = repo.search('SKU-00012')
+        
+        assert [produto.sku for produto in encontrados] == ['SKU-00012']
+        assert repo.count_search('SKU-00012') == 1
+
+
+@pytest.mark.parametrize('fts', [True, False])
+def test_busca_por_nome(banco, popular, monkeypatch, fts):
+    monkeypatch.setattr(ProdutoRepository, '_usa_fts', lambda self: fts)
+    with banco.sessao() as session:
+        popular(session, produtos=30)
+        repo = ProdutoRepository(session)
+        
+        assert len(repo.search('Produto', limit=50)) == 30
+        assert repo.count_search('Produto') == 30
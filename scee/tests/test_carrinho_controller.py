@@ -0,0 +1,112 @@
+"""Carrinho: totais incrementais conferidos contra a soma dos itens e serialização."""
+
+import random
+
+import pytest
+
+from controllers.carrinho_controller import CarrinhoController, ItemCarrinho
+
+
+def conferir_totais(carrinho):
+    """Compara os totais mantidos pelo carrinho com os recalculados a partir dos itens."""
+    itens = carrinho.obter_itens()
+    assert carrinho.calcular_total() == round(sum(item.subtotal for item in itens), 2)
+    assert carrinho.quantidade_itens() == sum(item.quantidade for item in itens)
+
+
+def test_item_subtotal():
+    item = ItemCarrinho(1, 'Mouse', 49.9, 3)
+    
+    assert item.subtotal == pytest.approx(149.7)
+    item.atualizar_quantidade(1)
+    assert item.subtotal == pytest.approx(49.9)
+
+
+def test_adicionar_atualizar_remover():
+    carrinho = CarrinhoController()
+    
+    assert carrinho.adicionar_item(1, 'Notebook', 3500.0, 1)[0]
+    assert carrinho.adicionar_item(2, 'Mouse', 49.9, 2)[0]
+    assert carrinho.adicionar_item(2, 'Mouse', 49.9, 1)[0]
+    conferir_totais(carrinho)
+    assert carrinho.calcular_total() == 3649.7
+    assert carrinho.quantidade_itens() == 4
+    
+    assert carrinho.atualizar_quantidade(1, 2)[0]
+    conferir_totais(carrinho)
+    assert carrinho.calcular_total() == 7149.7
+    
+    assert carrinho.remover_item(1)[0]
+    conferir_totais(carrinho)
+    assert carrinho.calcular_total() == 149.7
+    assert carrinho.quantidade_itens() == 3
+    
+    assert carrinho.remover_item(2)[0]
+    assert carrinho.calcular_total() == 0
+    assert carrinho.quantidade_itens() == 0
+
+
+def test_operacoes_invalidas_nao_alteram_totais():
+    carrinho = CarrinhoController()
+    carrinho.adicionar_item(1, 'Notebook', 3500.0, 1)
+    
+    assert carrinho.adicionar_item(2, 'Mouse', 49.9, 0) == (False, "Quantidade deve ser maior que zero")
+    assert carrinho.atualizar_quantidade(1, 0) == (False, "Quantidade deve ser maior que zero")
+    assert carrinho.atualizar_quantidade(9, 1) == (False, "Item não encontrado no carrinho")
+    assert carrinho.remover_item(9) == (False, "Item não encontrado no carrinho")
+    
+    assert [item.produto_id for item in carrinho.obter_itens()] == [1]
+    assert carrinho.calcular_total() == 3500.0
+    assert carrinho.quantidade_itens() == 1
+
+
+def test_totais_acompanham_sequencia_aleatoria():
+    aleatorio = random.Random(42)
+    carrinho = CarrinhoController()
+    
+    for _ in range(500):
+        produto_id = aleatorio.randint(1, 10)
+        operacao = aleatorio.choice(['adicionar', 'atualizar', 'remover'])
+        if operacao == 'adicionar':
+            carrinho.adicionar_item(produto_id, f'Produto {produto_id}', 0.1 * produto_id + 0.99,
+                                    aleatorio.randint(1, 5))
+        elif operacao == 'atualizar':
+            carrinho.atualizar_quantidade(produto_id, aleatorio.randint(1, 5))
+        else:
+            carrinho.remover_item(produto_id)
+        conferir_totais(carrinho)
+
+
+def test_limpar():
+    carrinho = CarrinhoController()
+    carrinho.adicionar_item(1, 'Notebook', 3500.0, 2)
+    
+    carrinho.limpar()
+    
+    assert carrinho.obter_itens() == []
+    assert carrinho.calcular_total() == 0
+    assert carrinho.quantidade_itens() == 0
+
+
+def test_serializar_e_desserializar():
+    carrinho = CarrinhoController()
+    carrinho.adicionar_item(1, 'Cadeira ergonômica', 899.9, 1)
+    carrinho.adicionar_item(2, 'Mouse', 49.9, 3)
+    
+    dados = carrinho.serializar()
+    copia = CarrinhoController.desserializar(dados)
+    
+    assert isinstance(dados, bytes)
+    assert 'ergonômica'.encode('utf-8') in dados
+    assert ([(i.produto_id, i.nome, i.preco, i.quantidade) for i in copia.obter_itens()] ==
+            [(i.produto_id, i.nome, i.preco, i.quantidade) for i in carrinho.obter_itens()])
+    assert copia.calcular_total() == carrinho.calcular_total()
+    assert copia.quantidade_itens() == carrinho.quantidade_itens()
+    assert copia.serializar() == dados
+
+
+def test_desserializar_carrinho_vazio():
+    copia = CarrinhoController.desserializar(CarrinhoController().serializar())
+    
+    assert copia.obter_itens() == []
+    assert copia.quantidade_itens() == 0
@@ -0,0 +1,182 @@
+"""Armazenamentos de carrinho: memória, SQLite e Redis (com cliente falso)."""
+
+import sys
+import time
+import types
+
+import pytest
+
+from carrinho_store import (CarrinhoStoreMemoria, CarrinhoStoreRedis, CarrinhoStoreSQLite,
+                            criar_carrinho_store)
+from controllers.carrinho_controller import CarrinhoController
+
+
+class RedisFalso:
+    """Substituto local do cliente redis-py: get/set(ex=)/getex(ex=)/delete com expiração."""
+    
+    def __init__(self):
+        self.agora = 0.0
+        self.dados = {}
+    
+    def _validar_ex(self, ex):
+        # O Redis recusa EX que não seja inteiro positivo
+        if not isinstance(ex, int) or ex <= 0:
+            raise ValueError(f"EX inválido: {ex!r}")
+    
+    def set(self, chave, valor, ex=None):
+        self._validar_ex(ex)
+        self.dados[chave] = (valor, self.agora + ex)
+        return True
+    
+    def get(self, chave):
+        entrada = self.dados.get(chave)
+        if entrada is None or entrada[1] <= self.agora:
+            self.dados.pop(chave, None)
+            return None
+        return entrada[0]
+    
+    def getex(self, chave, ex=None):
+        valor = self.get(chave)
+        if valor is not None:
+            self._validar_ex(ex)
+            self.dados[chave] = (valor, self.agora + ex)
+        return valor
+    
+    def delete(self, chave):
+        return 1 if self.dados.pop(chave, None) is not None else 0
+
+
+def carrinho_exemplo():
+    carrinho = CarrinhoController()
+    carrinho.adicionar_item(1, 'Notebook', 3500.0, 1)
+    carrinho.adicionar_item(2, 'Mouse', 49.9, 3)
+    return carrinho
+
+
+def resumo(carrinho):
+    return [(item.produto_id, item.nome, item.preco, item.quantidade) for item in carrinho.obter_itens()]
+
+
+@pytest.fixture(params=['memoria', 'sqlite', 'redis'])
+def store(request, tmp_path):
+    """Cada armazenamento, com TTL de 1 s."""
+    if request.param == 'memoria':
+        return CarrinhoStoreMemoria(ttl=1.0)
+    if request.param == 'sqlite':
+        return CarrinhoStoreSQLite(str(tmp_path / 'carrinhos.db'), ttl=1.0)
+    return CarrinhoStoreRedis(RedisFalso(), ttl=1.0)
+
+
+def avancar(store, segundos):
+    """Avança o tempo do armazenamento (relógio falso no Redis, espera real nos demais)."""
+    if isinstance(store, CarrinhoStoreRedis):
+        store.cliente.agora += segundos
+    else:
+        time.sleep(segundos)
+
+
+def test_salvar_e_carregar(store):
+    store.salvar('s1', carrinho_exemplo())
+    
+    carregado = store.carregar('s1')
+    
+    assert resumo(carregado) == resumo(carrinho_exemplo())
+    assert carregado.calcular_total() == carrinho_exemplo().calcular_total()
+    assert carregado.quantidade_itens() == 4
+
+
+def test_sessao_inexistente_retorna_carrinho_vazio(store):
+    carrinho = store.carregar('nao-existe')
+    
+    assert carrinho.quantidade_itens() == 0
+    assert carrinho.obter_itens() == []
+
+
+def test_sessoes_isoladas(store):
+    store.salvar('s1', carrinho_exemplo())
+    
+    assert store.carregar('s2').quantidade_itens() == 0
+
+
+def test_remover(store):
+    store.salvar('s1', carrinho_exemplo())
+    
+    store.remover('s1')
+    store.remover('nao-existe')
+    
+    assert store.carregar('s1').quantidade_itens() == 0
+
+
+def test_salvar_carrinho_vazio_remove(store):
+    store.salvar('s1', carrinho_exemplo())
+    
+    store.salvar('s1', CarrinhoController())
+    
+    assert store.carregar('s1').quantidade_itens() == 0
+
+
+def test_expira_apos_ttl(store):
+    store.salvar('s1', carrinho_exemplo())
+    
+    avancar(store, 1.2)
+    
+    assert store.carregar('s1').quantidade_itens() == 0
+
+
+def test_leitura_renova_expiracao(store):
+    store.salvar('s1', carrinho_exemplo())
+    
+    avancar(store, 0.6)
+    assert store.carregar('s1').quantidade_itens() == 4
+    avancar(store, 0.6)
+    
+    assert store.carregar('s1').quantidade_itens() == 4
+
+
+def test_sqlite_compartilhado_entre_instancias_e_expurgo(tmp_path):
+    caminho = str(tmp_path / 'carrinhos.db')
+    CarrinhoStoreSQLite(caminho, ttl=0.2).salvar('s1', carrinho_exemplo())
+    outro = CarrinhoStoreSQLite(caminho, ttl=0.2)
+    
+    assert outro.carregar('s1').quantidade_itens() == 4
+    time.sleep(0.3)
+    assert outro.expurgar() == 1
+
+
+def test_criar_memoria_e_sqlite(tmp_path):
+    assert isinstance(criar_carrinho_store('memoria'), CarrinhoStoreMemoria)
+    
+    store = criar_carrinho_store(f'sqlite:///{tmp_path / "c.db"}')
+    assert isinstance(store, CarrinhoStoreSQLite)
+    assert store.caminho == str(tmp_path / 'c.db')
+
+
+def test_criar_redis_usa_from_url(monkeypatch):
+    urls = []
+    
+    def from_url(url):
+        urls.append(url)
+        return RedisFalso()
+    
+    modulo = types.SimpleNamespace(Redis=types.SimpleNamespace(from_url=from_url))
+    monkeypatch.setitem(sys.modules, 'redis', modulo)
+    
+    store = criar_carrinho_store('redis://localhost:6379/0')
+    
+    assert isinstance(store, CarrinhoStoreRedis)
+    assert urls == ['redis://localhost:6379/0']
+    store.salvar('s1', carrinho_exemplo())
+    assert store.carregar('s1').quantidade_itens() == 4
+    assert list(store.cliente.dados) == ['scee:carrinho:s1']
+
+
+def test_criar_redis_sem_pacote(monkeypatch):
+    monkeypatch.setitem(sys.modules, 'redis', None)
+    
+    with pytest.raises(ValueError, match='redis'):
+        criar_carrinho_store('redis://localhost:6379/0')
+
+
+def test_criar_esquema_desconhecido():
+    with pytest.raises(ValueError):
+        criar_carrinho_store('mongodb://localhost')
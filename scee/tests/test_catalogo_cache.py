@@ -0,0 +1,24 @@
+"""Página de produtos em cache: o HTML depende só dos filtros convertidos da chave."""
+
+from cache import cache_paginas
+
+
+def test_fragmento_usa_filtros_convertidos(cliente_http):
+    cache_paginas.limpar()
+    
+    primeira = cliente_http.get('/produtos?min_preco=010&max_preco=20.00&extra=x').get_data(as_text=True)
+    segunda = cliente_http.get('/produtos?min_preco=10&max_preco=20').get_data(as_text=True)
+    
+    assert 'value="10.0"' in primeira and 'value="20.0"' in primeira
+    assert 'value="010"' not in primeira and 'value="20.00"' not in primeira
+    assert primeira == segunda
+
+
+def test_pagina_invalida_nao_reaproveita_listagem_por_cursor(cliente_http):
+    cache_paginas.limpar()
+    
+    por_cursor = cliente_http.get('/produtos').get_data(as_text=True)
+    por_pagina = cliente_http.get('/produtos?page=abc').get_data(as_text=True)
+    
+    assert 'after=' in por_cursor
+    assert 'after=' not in por_pagina
@@ -0,0 +1,39 @@
+"""Testes do cache de categorias."""
+
+from repositories.categoria_repository import CategoriaCache, CategoriaResumo
+
+
+class Relogio:
+    """Relógio manual para controlar a expiração."""
+    
+    def __init__(self):
+        self.agora = 0.0
+    
+    def __call__(self):
+        return self.agora
+
+
+def test_lista_expira_apos_ttl():
+    relogio = Relogio()
+    cache = CategoriaCache(ttl=30.0, relogio=relogio)
+    banco = [CategoriaResumo(1, 'Notebooks')]
+    
+    assert cache.obter(lambda: banco) == [(1, 'Notebooks')]
+    
+    # Escrita feita por outro processo: a invalidação não chega aqui
+    banco = [CategoriaResumo(1, 'Notebooks'), CategoriaResumo(2, 'Tablets')]
+    relogio.agora = 29.0
+    assert len(cache.obter(lambda: banco)) == 1
+    
+    relogio.agora = 30.0
+    assert len(cache.obter(lambda: banco)) == 2
+    assert cache.estatisticas()['misses'] == 2
+
+
+def test_invalidacao_descarta_na_hora():
+    cache = CategoriaCache(relogio=Relogio())
+    cache.obter(lambda: [CategoriaResumo(1, 'Notebooks')])
+    
+    cache.invalidar()
+    
+    assert cache.obter(lambda: []) == []
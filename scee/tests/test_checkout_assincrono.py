@@ -0,0 +1,215 @@
+"""Testes do checkout assíncrono com gateways falsos (sem rede)."""
+
+import threading
+import time
+
+import pytest
+
+from controllers import pedido_controller
+from controllers.integracao_controller import (CheckoutAssincrono, FreteFixo, IntegracaoController,
+                                               PagamentoPix)
+from models import Pedido, Produto
+
+
+class GatewayFalso(PagamentoPix):
+    """Gateway Pix que demora `atraso` segundos e conta as cobranças."""
+    
+    timeout = 0.2
+    
+    def __init__(self, atraso=0.0, aprovar=True):
+        self.atraso = atraso
+        self.aprovar = aprovar
+        self.cobrancas = 0
+        self._lock = threading.Lock()
+    
+    def processar_pagamento(self, valor, dados_pagamento):
+        time.sleep(self.atraso)
+        with self._lock:
+            self.cobrancas += 1
+        if not self.aprovar:
+            return False, "Pagamento recusado"
+        return True, f"Cobrado {valor:.2f}"
+
+
+DADOS_PIX = {'cpf_pagador': '12345678901'}
+
+
+@pytest.fixture
+def orquestrador():
+    checkout = CheckoutAssincrono()
+    yield checkout
+    checkout.encerrar()
+
+
+def aguardar(orquestrador, job_id, dono=None, fim=('aprovado', 'recusado', 'erro'), limite=5.0):
+    """Consulta o job até chegar a um dos estados em `fim`."""
+    prazo = time.monotonic() + limite
+    while time.monotonic() < prazo:
+        estado = orquestrador.consultar(job_id, dono)
+        if estado and estado['status'] in fim:
+            return estado
+        time.sleep(0.02)
+    raise AssertionError(f'job {job_id} não terminou: {orquestrador.consultar(job_id, dono)}')
+
+
+def test_pagamento_aprovado(orquestrador):
+    gateway = GatewayFalso()
+    job_id = orquestrador.iniciar(IntegracaoController(gateway, FreteFixo()), 100.0, DADOS_PIX, '01000000', 1.0)
+    
+    estado = aguardar(orquestrador, job_id)
+    
+    assert estado['status'] == 'aprovado'
+    assert estado['mensagem'] == 'Cobrado 115.00'
+    assert (estado['valor_frete'], estado['prazo_entrega']) == (15.0, 7)
+    assert gateway.cobrancas == 1
+
+
+def test_pagamento_recusado(orquestrador):
+    gateway = GatewayFalso(aprovar=False)
+    job_id = orquestrador.iniciar(IntegracaoController(gateway, FreteFixo()), 100.0, DADOS_PIX, '01000000', 1.0)
+    
+    assert aguardar(orquestrador, job_id)['status'] == 'recusado'
+
+
+def test_dados_invalidos_nao_cobram(orquestrador):
+    gateway = GatewayFalso()
+    job_id = orquestrador.iniciar(IntegracaoController(gateway, FreteFixo()), 100.0,
+                                  {'cpf_pagador': '123'}, '01000000', 1.0)
+    
+    estado = aguardar(orquestrador, job_id)
+    
+    assert estado['status'] == 'recusado'
+    assert estado['mensagem'] == 'CPF inválido'
+    assert gateway.cobrancas == 0
+
+
+def test_timeout_deixa_pendente_e_concilia(orquestrador):
+    gateway = GatewayFalso(atraso=0.6)
+    job_id = orquestrador.iniciar(IntegracaoController(gateway, FreteFixo()), 100.0, DADOS_PIX, '01000000', 1.0)
+    
+    pendente = aguardar(orquestrador, job_id, fim=('pendente', 'aprovado', 'recusado', 'erro'))
+    assert pendente['status'] == 'pendente'
+    
+    estado = aguardar(orquestrador, job_id)
+    assert estado['status'] == 'aprovado'
+    assert gateway.cobrancas == 1
+
+
+def test_job_de_outro_dono_nao_e_visivel(orquestrador):
+    job_id = orquestrador.iniciar(IntegracaoController(GatewayFalso(), FreteFixo()), 100.0, DADOS_PIX,
+                                  '01000000', 1.0, dono=1)
+    
+    assert aguardar(orquestrador, job_id, dono=1)['status'] == 'aprovado'
+    assert orquestrador.consultar(job_id, dono=2) is None
+    assert orquestrador.consultar(job_id) is None
+    assert orquestrador.consultar('inexistente', dono=1) is None
+
+
+def estoque_e_pedidos(app_scee, produto_id):
+    """Estoque do produto e pedidos (id -> status) gravados no banco."""
+    with app_scee.db.sessao() as session:
+        estoque = session.get(Produto, produto_id).estoque
+        pedidos = dict(session.query(Pedido.id, Pedido.status).all())
+    return estoque, pedidos
+
+
+def pagar_carrinho(cliente_http, loja, produto_id, quantidade, **dados):
+    """Põe o produto no carrinho do cliente e chama POST /checkout/pagamento."""
+    with cliente_http.session_transaction() as sessao:
+        sessao['cliente_id'] = loja['cliente_id']
+    cliente_http.post(f"/carrinho/adicionar/{produto_id}", data={'quantidade': quantidade})
+    
+    formulario = {'endereco_id': loja['endereco_id'], 'metodo_pagamento': 'Pix', 'tipo_frete': 'Fixo',
+                  'cpf_pagador': '123.456.789-01'}
+    formulario.update(dados)
+    return cliente_http.post('/checkout/pagamento', data=formulario)
+
+
+def consultar_ate(cliente_http, status_url, fim=('aprovado', 'recusado', 'erro'), limite=5.0):
+    """Faz polling da rota de andamento até um dos estados em `fim`."""
+    prazo = time.monotonic() + limite
+    while True:
+        estado = cliente_http.get(status_url).get_json()
+        if estado['status'] in fim or time.monotonic() > prazo:
+            return estado
+        time.sleep(0.02)
+
+
+def test_rota_pagamento_aprovado_cria_pedido(app_scee, cliente_http, loja):
+    produto_id = loja['produto_ids'][0]
+    estoque_antes, _ = estoque_e_pedidos(app_scee, produto_id)
+    
+    resposta = pagar_carrinho(cliente_http, loja, produto_id, 2)
+    assert resposta.status_code == 202
+    corpo = resposta.get_json()
+    
+    estado = consultar_ate(cliente_http, corpo['status_url'])
+    assert estado['status'] == 'aprovado'
+    assert estado['pedido_id'] == corpo['pedido_id']
+    assert estado['valor_frete'] == 15.0
+    
+    estoque, pedidos = estoque_e_pedidos(app_scee, produto_id)
+    assert pedidos[corpo['pedido_id']] == 'Processando'
+    assert estoque == estoque_antes - 2
+    with app_scee.db.sessao() as session:
+        pedido = session.get(Pedido, corpo['pedido_id'])
+        assert [(item.produto_id, item.quantidade) for item in pedido.itens] == [(produto_id, 2)]
+        assert pedido.total == 2 * session.get(Produto, produto_id).preco + 15.0
+    
+    # O carrinho foi esvaziado junto com a criação do pedido
+    with cliente_http.session_transaction() as sessao:
+        assert app_scee.carrinhos.carregar(sessao['session_id']).quantidade_itens() == 0
+    
+    with cliente_http.session_transaction() as sessao:
+        sessao['cliente_id'] = loja['cliente_id'] + 1
+    assert cliente_http.get(corpo['status_url']).status_code == 404
+
+
+def test_rota_pagamento_recusado_cancela_e_devolve_estoque(app_scee, cliente_http, loja, monkeypatch):
+    monkeypatch.setitem(pedido_controller.GATEWAYS_PAGAMENTO, 'Pix', lambda: GatewayFalso(aprovar=False))
+    produto_id = loja['produto_ids'][1]
+    estoque_antes, _ = estoque_e_pedidos(app_scee, produto_id)
+    
+    corpo = pagar_carrinho(cliente_http, loja, produto_id, 3).get_json()
+    estado = consultar_ate(cliente_http, corpo['status_url'])
+    
+    assert estado['status'] == 'recusado'
+    estoque, pedidos = estoque_e_pedidos(app_scee, produto_id)
+    assert pedidos[corpo['pedido_id']] == 'Cancelado'
+    assert estoque == estoque_antes
+
+
+def test_rota_pagamento_com_timeout_mantem_pedido_pendente(app_scee, cliente_http, loja, monkeypatch):
+    gateway = GatewayFalso(atraso=0.6)
+    monkeypatch.setitem(pedido_controller.GATEWAYS_PAGAMENTO, 'Pix', lambda: gateway)
+    produto_id = loja['produto_ids'][2]
+    estoque_antes, _ = estoque_e_pedidos(app_scee, produto_id)
+    
+    corpo = pagar_carrinho(cliente_http, loja, produto_id, 1).get_json()
+    
+    assert consultar_ate(cliente_http, corpo['status_url'], fim=('pendente',))['status'] == 'pendente'
+    estoque, pedidos = estoque_e_pedidos(app_scee, produto_id)
+    assert pedidos[corpo['pedido_id']] == 'Pendente'
+    assert estoque == estoque_antes - 1
+    
+    assert consultar_ate(cliente_http, corpo['status_url'])['status'] == 'aprovado'
+    assert estoque_e_pedidos(app_scee, produto_id)[1][corpo['pedido_id']] == 'Processando'
+    assert gateway.cobrancas == 1
+
+
+def test_rota_dados_invalidos_nao_cria_pedido(app_scee, cliente_http, loja):
+    produto_id = loja['produto_ids'][3]
+    estoque_antes, pedidos_antes = estoque_e_pedidos(app_scee, produto_id)
+    
+    resposta = pagar_carrinho(cliente_http, loja, produto_id, 1, cpf_pagador='123')
+    
+    assert resposta.status_code == 400
+    assert resposta.get_json()['message'] == 'CPF inválido'
+    assert estoque_e_pedidos(app_scee, produto_id) == (estoque_antes, pedidos_antes)
+
+
+def test_rota_iniciar_valida_metodo(cliente_http, loja):
+    resposta = pagar_carrinho(cliente_http, loja, loja['produto_ids'][0], 1, metodo_pagamento='Boleto')
+    
+    assert resposta.status_code == 400
+    assert resposta.get_json()['success'] is False
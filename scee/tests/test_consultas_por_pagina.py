@@ -0,0 +1,90 @@
+"""Número de consultas SQL por página: não pode crescer com os itens listados (N+1)."""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from controllers.carrinho_controller import ItemCarrinho
+from controllers.pedido_controller import PedidoController
+from models import ImagemProduto, ItemPedido
+from repositories.categoria_repository import categoria_cache
+
+
+@contextmanager
+def contar_consultas(engine):
+    """Acumula em uma lista os comandos SQL executados no engine dentro do bloco."""
+    comandos = []
+    
+    def registrar(conn, cursor, statement, parameters, context, executemany):
+        comandos.append(statement)
+    
+    event.listen(engine, 'before_cursor_execute', registrar)
+    try:
+        yield comandos
+    finally:
+        event.remove(engine, 'before_cursor_execute', registrar)
+
+
+@pytest.fixture(scope='module')
+def produtos_com_imagens(app_scee, loja):
+    """Duas imagens por produto, para que um carregamento por item apareça na contagem."""
+    with app_scee.db.sessao() as session:
+        session.add_all(ImagemProduto(produto_id=produto_id, caminho=f'uploads/{produto_id}-{ordem}.jpg', ordem=ordem)
+                        for produto_id in loja['produto_ids'] for ordem in range(2))
+        session.commit()
+
+
+# Limites medidos com cache frio (páginas e categorias): listagem, imagens em
+# lote, contagem e, no catálogo, a lista de categorias. A busca (?q=) conta pelo
+# índice FTS5; `marcador` confere que a página passou pelo caminho esperado.
+LIMITES = [
+    ('/', False, 4, None),
+    ('/produtos', False, 4, None),
+    ('/produtos?page=2', False, 4, None),
+    ('/produtos?q=Produto', False, 4, 'produtos_fts MATCH'),
+    ('/admin/produtos', True, 3, None),
+    ('/admin/produtos?page=2', True, 3, None),
+]
+
+
+@pytest.mark.parametrize('url, admin, limite, marcador', LIMITES)
+def test_consultas_por_pagina(app_scee, cliente_http, produtos_com_imagens, url, admin, limite, marcador):
+    if admin:
+        with cliente_http.session_transaction() as sessao:
+            sessao['admin_id'] = 1
+    categoria_cache.invalidar()
+    
+    with contar_consultas(app_scee.db.engine) as comandos:
+        resposta = cliente_http.get(url)
+    
+    assert resposta.status_code == 200
+    if marcador:
+        assert any(marcador in comando for comando in comandos), '\n'.join(comandos)
+    assert len(comandos) <= limite, '\n'.join(comandos)
+
+
+def test_consultas_criar_pedido_independem_do_carrinho(banco, popular):
+    with banco.sessao() as session:
+        dados = popular(session, produtos=20, estoque=50)
+    
+    def comandos_do_pedido(produto_ids):
+        session = banco.get_session()
+        try:
+            itens = [ItemCarrinho(produto_id, 'Produto', 10.0, 1) for produto_id in produto_ids]
+            with contar_consultas(banco.engine) as comandos:
+                sucesso, mensagem, _ = PedidoController(session).criar_pedido(
+                    dados['cliente_id'], itens, dados['endereco_id'], 'Pix')
+            assert sucesso, mensagem
+            return comandos
+        finally:
+            banco.close_session()
+    
+    um_item = comandos_do_pedido(dados['produto_ids'][:1])
+    vinte_itens = comandos_do_pedido(dados['produto_ids'])
+    
+    # Endereço, produtos, baixa de estoque (executemany), pedido e itens em lote
+    assert len(um_item) == 5, '\n'.join(um_item)
+    assert len(vinte_itens) == len(um_item), '\n'.join(vinte_itens)
+    with banco.sessao() as session:
+        assert session.query(ItemPedido).count() == 21
@@ -0,0 +1,120 @@
+"""Cotação de frete em paralelo com calculadoras falsas (sem transportadora real)."""
+
+import threading
+import time
+
+import pytest
+
+from controllers.integracao_controller import CalculadoraFreteBase, CotacaoFrete
+
+
+class CalculadoraFalsa(CalculadoraFreteBase):
+    """Calculadora que demora `atraso` segundos e registra os argumentos recebidos."""
+    
+    timeout = 0.3
+    
+    def __init__(self, valor=10.0, prazo=5, atraso=0.0, erro=None):
+        self.valor = valor
+        self.prazo = prazo
+        self.atraso = atraso
+        self.erro = erro
+        self.chamadas = []
+        self._lock = threading.Lock()
+    
+    def calcular_frete(self, cep_destino, peso_kg, valor_produtos):
+        with self._lock:
+            self.chamadas.append((cep_destino, peso_kg, valor_produtos))
+        time.sleep(self.atraso)
+        if self.erro:
+            raise self.erro
+        return self.valor, self.prazo
+
+
+@pytest.fixture
+def criar_cotacao():
+    """Cria serviços de cotação e encerra os pools de threads ao final."""
+    servicos = []
+    
+    def criar(**calculadoras):
+        servico = CotacaoFrete(calculadoras)
+        servicos.append(servico)
+        return servico
+    
+    yield criar
+    for servico in servicos:
+        servico._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_cota_em_paralelo(criar_cotacao):
+    lentas = {tipo: CalculadoraFalsa(valor=valor, atraso=0.2) for tipo, valor in
+              (('A', 10.0), ('B', 20.0), ('C', 30.0))}
+    for calculadora in lentas.values():
+        calculadora.timeout = 1.0
+    cotacao = criar_cotacao(**lentas)
+    
+    inicio = time.monotonic()
+    resultado = cotacao.cotar('01310-100', 1.0, 50.0)
+    decorrido = time.monotonic() - inicio
+    
+    assert resultado == {'A': (10.0, 5), 'B': (20.0, 5), 'C': (30.0, 5)}
+    # Sequencial levaria 0,6 s; em paralelo, o tempo da mais lenta
+    assert decorrido < 0.45
+
+
+def test_cota_apenas_tipos_pedidos(criar_cotacao):
+    a, b = CalculadoraFalsa(), CalculadoraFalsa()
+    cotacao = criar_cotacao(A=a, B=b)
+    
+    assert cotacao.cotar('01310100', 1.0, 50.0, tipos=['B', 'Inexistente']) == {'B': (10.0, 5)}
+    assert a.chamadas == []
+
+
+def test_timeout_deixa_tipo_de_fora(criar_cotacao):
+    lenta = CalculadoraFalsa(atraso=1.0)
+    cotacao = criar_cotacao(Rapida=CalculadoraFalsa(valor=15.0), Lenta=lenta)
+    
+    inicio = time.monotonic()
+    resultado = cotacao.cotar('01310100', 1.0, 50.0)
+    
+    assert resultado == {'Rapida': (15.0, 5)}
+    assert time.monotonic() - inicio < lenta.timeout + 0.3
+    # A cotação que estourou o timeout não foi para o cache
+    lenta.atraso = 0.0
+    assert cotacao.cotar('01310100', 1.0, 50.0)['Lenta'] == (10.0, 5)
+    assert len(lenta.chamadas) == 2
+
+
+def test_erro_deixa_tipo_de_fora(criar_cotacao):
+    cotacao = criar_cotacao(Ok=CalculadoraFalsa(), Falha=CalculadoraFalsa(erro=RuntimeError('fora do ar')))
+    
+    assert cotacao.cotar('01310100', 1.0, 50.0) == {'Ok': (10.0, 5)}
+
+
+def test_chave_do_cache(criar_cotacao):
+    calculadora = CalculadoraFalsa()
+    cotacao = criar_cotacao(A=calculadora)
+    
+    cotacao.cotar('01310-100', 1.2345, 120.0)
+    # Mesmo prefixo de 5 dígitos do CEP, mesmo peso em gramas e mesma faixa de valor
+    cotacao.cotar('01310-999', 1.2345, 249.99)
+    cotacao.cotar('01310.200', 1.2344, 100.0)
+    assert calculadora.chamadas == [('01310000', 1.234, 100)]
+    
+    # Outro prefixo de CEP, outro peso e outra faixa de valor são cotados de novo
+    cotacao.cotar('01311-100', 1.2345, 120.0)
+    cotacao.cotar('01310-100', 1.235, 120.0)
+    cotacao.cotar('01310-100', 1.2345, 250.0)
+    assert calculadora.chamadas[1:] == [
+        ('01311000', 1.234, 100),
+        ('01310000', 1.235, 100),
+        ('01310000', 1.234, 250),
+    ]
+
+
+def test_registrar_limpa_cache(criar_cotacao):
+    cotacao = criar_cotacao(A=CalculadoraFalsa(valor=10.0))
+    assert cotacao.cotar('01310100', 1.0, 50.0) == {'A': (10.0, 5)}
+    
+    cotacao.registrar('A', CalculadoraFalsa(valor=12.0))
+    
+    assert cotacao.cotar('01310100', 1.0, 50.0) == {'A': (12.0, 5)}
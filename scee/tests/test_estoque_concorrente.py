@@ -0,0 +1,101 @@
+"""Baixa de estoque concorrente: nenhum checkout vende além do estoque."""
+
+import threading
+
+from sqlalchemy import func, select
+
+from controllers.carrinho_controller import ItemCarrinho
+from controllers.pedido_controller import PedidoController
+from models import ItemPedido, Pedido, Produto
+from repositories.produto_repository import ProdutoRepository
+
+
+def test_decrement_stock_sem_oversell(banco, popular):
+    with banco.sessao() as session:
+        produto_id = popular(session, produtos=1, estoque=10)['produto_ids'][0]
+    
+    threads = 40
+    barreira = threading.Barrier(threads)
+    resultados = []
+    lock = threading.Lock()
+    
+    def comprar():
+        session = banco.get_session()
+        try:
+            barreira.wait()
+            baixou = ProdutoRepository(session).decrement_stock({produto_id: 1})
+            if baixou:
+                session.commit()
+            else:
+                session.rollback()
+            with lock:
+                resultados.append(baixou)
+        finally:
+            banco.close_session()
+    
+    trabalhadores = [threading.Thread(target=comprar) for _ in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    
+    with banco.sessao() as session:
+        estoque = session.execute(select(Produto.estoque).where(Produto.id == produto_id)).scalar_one()
+        negativos = session.execute(select(func.count()).where(Produto.estoque < 0)).scalar_one()
+    
+    assert len(resultados) == threads
+    assert resultados.count(True) == 10
+    assert estoque == 0
+    assert negativos == 0
+
+
+def test_decrement_stock_em_lote_e_atomico(banco, popular):
+    with banco.sessao() as session:
+        ids = popular(session, produtos=2, estoque=1)['produto_ids']
+        repo = ProdutoRepository(session)
+        
+        assert repo.decrement_stock({ids[0]: 1, ids[1]: 2}) is False
+        session.rollback()
+        
+        estoques = session.execute(select(Produto.estoque).order_by(Produto.id)).scalars().all()
+    assert estoques == [1, 1]
+
+
+def test_criar_pedido_concorrente_sem_oversell(banco, popular):
+    with banco.sessao() as session:
+        dados = popular(session, produtos=1, estoque=5)
+    produto_id = dados['produto_ids'][0]
+    
+    threads = 20
+    barreira = threading.Barrier(threads)
+    resultados = []
+    lock = threading.Lock()
+    
+    def comprar():
+        session = banco.get_session()
+        try:
+            itens = [ItemCarrinho(produto_id, 'Produto 0', 10.0, 1)]
+            barreira.wait()
+            sucesso, _, _ = PedidoController(session).criar_pedido(dados['cliente_id'], itens,
+                                                                   dados['endereco_id'], 'Pix')
+            with lock:
+                resultados.append(sucesso)
+        finally:
+            banco.close_session()
+    
+    trabalhadores = [threading.Thread(target=comprar) for _ in range(threads)]
+    for trabalhador in trabalhadores:
+        trabalhador.start()
+    for trabalhador in trabalhadores:
+        trabalhador.join()
+    
+    with banco.sessao() as session:
+        estoque = session.execute(select(Produto.estoque).where(Produto.id == produto_id)).scalar_one()
+        pedidos = session.execute(select(func.count()).select_from(Pedido)).scalar_one()
+        itens = session.execute(select(func.count()).select_from(ItemPedido)).scalar_one()
+    
+    assert len(resultados) == threads
+    assert resultados.count(True) == 5
+    assert pedidos == 5
+    assert itens == 5
+    assert estoque == 0
@@ -0,0 +1,46 @@
+"""Benchmark da atualização de estoque em lote (RNF01.3) no SQLite."""
+
+import time
+
+from sqlalchemy import func, insert, select
+
+from controllers.importacao_controller import ImportacaoController
+from models import Categoria, Produto
+
+ATUALIZACOES = 100_000
+# O requisito é 1000 atualizações em < 60 s; o lote inteiro deve caber em segundos.
+LIMITE_SEGUNDOS = 20.0
+
+
+def test_atualizar_estoque_em_lote_100k(banco):
+    with banco.sessao() as session:
+        categoria = Categoria(nome='Notebooks')
+        session.add(categoria)
+        session.flush()
+        session.execute(insert(Produto.__table__), [
+            {'nome': f'Produto {i}', 'sku': f'SKU-{i:06d}', 'descricao': 'Descrição', 'preco': 10.0,
+             'estoque': 0, 'categoria_id': categoria.id}
+            for i in range(ATUALIZACOES)
+        ])
+        session.commit()
+        
+        atualizacoes = [{'sku': f'SKU-{i:06d}', 'estoque': i % 97} for i in range(ATUALIZACOES)]
+        # SKU-000001 também tem uma entrada válida acima; SKU-000002 tem a inválida antes
+        atualizacoes += [{'sku': 'NAO-EXISTE', 'estoque': 1}, {'sku': 'SKU-000001', 'estoque': 'x'}]
+        atualizacoes.insert(0, {'sku': 'SKU-000002', 'estoque': None})
+        
+        inicio = time.perf_counter()
+        sucesso, _, quantidade, resultados = ImportacaoController(session).atualizar_estoque_em_lote(atualizacoes)
+        duracao = time.perf_counter() - inicio
+        
+        total = session.execute(select(func.sum(Produto.estoque))).scalar_one()
+    
+    assert duracao < LIMITE_SEGUNDOS, f'{ATUALIZACOES} atualizações em {duracao:.1f}s'
+    assert quantidade == ATUALIZACOES - 2
+    assert resultados['NAO-EXISTE'] == 'não encontrado'
+    assert resultados['SKU-000000'] == 'atualizado'
+    assert resultados['SKU-000001'] == 'inválido'
+    assert resultados['SKU-000002'] == 'inválido'
+    assert list(resultados.values()).count('atualizado') == ATUALIZACOES - 2
+    # Os SKUs inválidos mantêm o estoque original (0)
+    assert total == sum(i % 97 for i in range(ATUALIZACOES) if i not in (1, 2))
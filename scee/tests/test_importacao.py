@@ -0,0 +1,25 @@
+"""Importação de produtos com réplica de leitura atrasada."""
+
+from database import Database
+from controllers.importacao_controller import ImportacaoController
+from models import Categoria, Produto
+
+
+def test_importacao_resolve_categorias_no_primario(tmp_path):
+    # A réplica tem o esquema, mas ainda não recebeu a categoria criada no primário
+    Database(f'sqlite:///{tmp_path / "replica.db"}').create_tables()
+    db = Database(f'sqlite:///{tmp_path / "primario.db"}', replicas=[f'sqlite:///{tmp_path / "replica.db"}'])
+    db.create_tables()
+    
+    with db.sessao() as session:
+        session.add(Categoria(nome='Notebooks'))
+        session.commit()
+        
+        csv = 'sku,nome,descricao,preco,estoque,categoria_nome\nNB-1,Notebook,Descrição,3500.00,5,Notebooks\n'
+        sucesso, mensagem, estatisticas = ImportacaoController(session).importar_produtos_csv(csv)
+        
+        assert sucesso, mensagem
+        assert estatisticas['criados'] == 1
+        assert session.query(Produto).filter_by(sku='NB-1').one().estoque == 5
+    
+    db.close_session()
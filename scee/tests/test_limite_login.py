@@ -0,0 +1,49 @@
+"""Limite de login por IP: X-Forwarded-For só vale com proxy confiável configurado."""
+
+import pytest
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from controllers import auth_controller
+from limites import LimitadorJanela
+
+
+@pytest.fixture
+def limite_um_por_ip(monkeypatch):
+    """Limite de uma tentativa por IP, isolado do limitador do processo."""
+    monkeypatch.setattr(auth_controller, 'limite_login_ip', LimitadorJanela(limite=1, janela=60.0))
+
+
+def tentar_login(cliente_http, encaminhado_para):
+    return cliente_http.post('/login', data={'email': 'ninguem@teste.com', 'senha': 'errada'},
+                             headers={'X-Forwarded-For': encaminhado_para})
+
+
+def test_x_forwarded_for_ignorado_sem_proxy(cliente_http, limite_um_por_ip):
+    assert tentar_login(cliente_http, '203.0.113.1').status_code == 200
+    
+    # Trocar o cabeçalho não contorna o limite: a chave é o IP da conexão
+    resposta = tentar_login(cliente_http, '203.0.113.2')
+    assert resposta.status_code == 429
+    assert 'Retry-After' in resposta.headers
+
+
+def test_x_forwarded_for_com_proxy_confiavel(app_scee, cliente_http, limite_um_por_ip, monkeypatch):
+    monkeypatch.setattr(app_scee.app, 'wsgi_app', ProxyFix(app_scee.app.wsgi_app, x_for=1))
+    
+    assert tentar_login(cliente_http, '203.0.113.1').status_code == 200
+    assert tentar_login(cliente_http, '203.0.113.2').status_code == 200
+    
+    # Só o último salto (o adicionado pelo proxy) é considerado
+    assert tentar_login(cliente_http, '198.51.100.9, 203.0.113.1').status_code == 429
+
+
+def test_email_alterado_sai_do_cache_negativo(cliente_http, loja):
+    with cliente_http.session_transaction() as sessao:
+        sessao['cliente_id'] = loja['cliente_id']
+    auth_controller.emails_desconhecidos.guardar(('cliente', 'novo@teste.com'), True)
+    
+    resposta = cliente_http.post('/perfil/editar', data={'nome': 'Cliente Teste', 'email': 'novo@teste.com'})
+    assert resposta.status_code == 302
+    assert auth_controller.emails_desconhecidos.obter(('cliente', 'novo@teste.com')) is None
+    
+    cliente_http.post('/perfil/editar', data={'nome': 'Cliente Teste', 'email': 'cliente@teste.com'})
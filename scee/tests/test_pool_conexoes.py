@@ -0,0 +1,41 @@
+"""Toda rota devolve a conexão ao pool ao fim da requisição (detector de vazamento)."""
+
+import re
+
+ID_INEXISTENTE = 999999
+
+
+def rotas(app):
+    """
+    Gera (método, url) para cada rota do app.
+    
+    GETs usam os IDs dos dados de teste; POSTs usam um ID inexistente e
+    formulário vazio, para exercitar o caminho da requisição sem apagar
+    ou alterar os dados compartilhados pelos outros testes.
+    """
+    for regra in app.url_map.iter_rules():
+        if regra.endpoint in ('static', 'logout'):
+            continue
+        for metodo in sorted(regra.methods - {'HEAD', 'OPTIONS'}):
+            valor = '1' if metodo == 'GET' else str(ID_INEXISTENTE)
+            yield metodo, re.sub(r'<(?:\w+:)?\w+>', valor, regra.rule)
+
+
+def test_rotas_devolvem_conexoes(app_scee, cliente_http, monkeypatch):
+    # Erros viram respostas 500: o caminho de erro também precisa devolver a conexão
+    monkeypatch.setitem(app_scee.app.config, 'PROPAGATE_EXCEPTIONS', False)
+    pool = app_scee.db.engine.pool
+    with cliente_http.session_transaction() as sessao:
+        sessao['admin_id'] = 1
+        sessao['cliente_id'] = 1
+    
+    vazamentos = []
+    for metodo, url in rotas(app_scee.app):
+        resposta = cliente_http.open(url, method=metodo, data={})
+        resposta.get_data()  # respostas em stream só terminam ao serem consumidas
+        resposta.close()
+        if pool.checkedout():
+            vazamentos.append(f'{metodo} {url}: {pool.checkedout()} conexão(ões) em uso')
+    
+    assert not vazamentos, '\n'.join(vazamentos)
+